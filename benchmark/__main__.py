@@ -0,0 +1,92 @@
+"""
+运行全部基准测试(无需网络), 结果写入 JSON, 用于不同提交之间对比每个事件的耗时
+
+运行: python -m benchmark [-o result.json] [--compare base.json] [--threshold 0.2] [--only strategies session]
+
+指标命名: *_us_per_* 越小越好, *_per_second 越大越好
+"""
+import argparse
+import importlib
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+SUITES = {
+    "strategies": "benchmark.bench_strategies",
+    "bar_generator": "benchmark.bench_bar_generator",
+    "datafeed_convert": "benchmark.bench_datafeed_convert",
+    "rq_symbol": "benchmark.bench_rq_symbol",
+    "session": "benchmark.bench_session",
+    "startup": "benchmark.bench_startup",
+    "tick_journal": "benchmark.bench_tick_journal",
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run(suites: list[str]) -> dict:
+    results = {}
+    for name in suites:
+        print(f"运行 {name} ...", file=sys.stderr)
+        results[name] = importlib.import_module(SUITES[name]).run()
+    return {
+        "commit": git_commit(),
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(base: dict, current: dict, threshold: float) -> list[str]:
+    """返回变差超过 threshold 比例的指标"""
+    regressions = []
+    for suite, metrics in current["results"].items():
+        for metric, value in metrics.items():
+            old = base.get("results", {}).get(suite, {}).get(metric)
+            if not old or not value:
+                continue
+            # 统一换算为耗时之比, > 1 表示变慢
+            ratio = old / value if metric.endswith("_per_second") else value / old
+            line = f"{suite}.{metric:40} {old:14.3f} -> {value:14.3f} ({ratio:6.2f}x)"
+            print(line)
+            if ratio > 1 + threshold:
+                regressions.append(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="运行基准测试")
+    parser.add_argument("-o", "--output", help="结果 JSON 文件, 默认输出到标准输出")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    parser.add_argument("--threshold", type=float, default=0.2, help="耗时增加超过该比例视为性能回退")
+    parser.add_argument("--only", nargs="+", choices=list(SUITES), default=list(SUITES))
+    args = parser.parse_args()
+
+    current = run(args.only)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, ensure_ascii=False)
+    else:
+        print(json.dumps(current, indent=2, ensure_ascii=False))
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(json.load(f), current, args.threshold)
+        if regressions:
+            print("性能回退:", file=sys.stderr)
+            for line in regressions:
+                print(line, file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+BarGenerator 由 tick 合成1分钟K线、由1分钟K线合成N分钟K线的耗时
+
+运行: python -m benchmark.bench_bar_generator
+"""
+import sys
+
+from vnpy.trader.constant import Interval
+from vnpy.trader.utility import BarGenerator
+
+from benchmark.bench_datafeed_convert import timeit
+from benchmark.bench_strategies import make_bars
+from benchmark.bench_tick_journal import make_ticks
+
+
+def run(rows: int = 200_000) -> dict[str, float]:
+    ticks = make_ticks(rows, symbols=1)
+    bars = make_bars(rows)
+
+    def aggregate_ticks():
+        bg = BarGenerator(on_bar=lambda bar: None)
+        for tick in ticks:
+            bg.update_tick(tick)
+
+    def aggregate_bars():
+        bg = BarGenerator(on_bar=lambda bar: None, window=5, on_window_bar=lambda bar: None,
+                          interval=Interval.MINUTE)
+        for bar in bars:
+            bg.update_bar(bar)
+
+    return {
+        "update_tick_us_per_tick": timeit(aggregate_ticks) / rows * 1e6,
+        "update_bar_5m_us_per_bar": timeit(aggregate_bars) / rows * 1e6,
+    }
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    for name, value in run(rows).items():
+        print(f"{name:40} {value:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
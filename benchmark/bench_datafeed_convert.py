@@ -0,0 +1,122 @@
+"""
+对比米筐 DataFrame 逐行转换(itertuples)与整列转换的耗时, 以及批量查询结果按合约拆分后转换的耗时
+
+运行: python -m benchmark.bench_datafeed_convert
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import cast
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Timestamp
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+from vnpy.trader.utility import ArrayManager, round_to
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../vnpy_other/datafeed"))
+
+from vnpy_rqdata.rqdata_datafeed import CHINA_TZ, columns_to_bars, split_by_symbol, to_bar_columns  # noqa: E402
+
+from ctp.bar_batch import BarBatch  # noqa: E402
+
+
+def make_bar_frame(rows: int, order_book_id: str = "RB2510") -> DataFrame:
+    """构造与 rqdatac.get_price 返回格式相同的1分钟K线"""
+    rng = np.random.default_rng(0)
+    index = pd.MultiIndex.from_arrays(
+        [[order_book_id] * rows, pd.date_range("2025-01-02 09:01", periods=rows, freq="min")],
+        names=["order_book_id", "datetime"],
+    )
+    close = 3500 + rng.standard_normal(rows).cumsum()
+    return DataFrame({
+        "open": close + rng.random(rows),
+        "high": close + 2,
+        "low": close - 2,
+        "close": close,
+        "volume": rng.integers(1, 1000, rows).astype(float),
+        "total_turnover": rng.random(rows) * 1e7,
+        "open_interest": rng.integers(1e5, 2e5, rows).astype(float),
+    }, index=index)
+
+
+def legacy_to_bars(df: DataFrame, adjustment: timedelta, end: datetime) -> list[BarData]:
+    """RqdataDatafeed 原有的逐行转换"""
+    data: list[BarData] = []
+    df.fillna(0, inplace=True)
+    for row in df.itertuples():
+        row_index: tuple[str, Timestamp] = cast(tuple[str, Timestamp], row.Index)
+        dt: datetime = row_index[1].to_pydatetime() - adjustment
+        dt = dt.replace(tzinfo=CHINA_TZ)
+
+        if dt >= end:
+            break
+
+        bar: BarData = BarData(
+            symbol="rb2510",
+            exchange=Exchange.SHFE,
+            interval=Interval.MINUTE,
+            datetime=dt,
+            open_price=round_to(row.open, 0.000001),
+            high_price=round_to(row.high, 0.000001),
+            low_price=round_to(row.low, 0.000001),
+            close_price=round_to(row.close, 0.000001),
+            volume=row.volume,
+            turnover=row.total_turnover,
+            open_interest=getattr(row, "open_interest", 0),
+            gateway_name="RQ"
+        )
+        data.append(bar)
+    return data
+
+
+def timeit(func, repeat: int = 3) -> float:
+    """返回多次运行中的最短耗时(秒)"""
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def run(rows: int = 100_000) -> dict[str, float]:
+    df = make_bar_frame(rows)
+    adjustment = timedelta(minutes=1)
+    end = datetime(2100, 1, 1, tzinfo=CHINA_TZ)
+
+    def vectorized_batch():
+        columns = to_bar_columns(df, adjustment, end)
+        batch = BarBatch("rb2510", Exchange.SHFE, Interval.MINUTE, columns.pop("datetime"), columns)
+        batch.feed(ArrayManager(300))
+
+    # 批量查询返回的多合约 DataFrame, 行数与单合约相同
+    symbols = 10
+    multi_df = pd.concat([make_bar_frame(rows // symbols, f"RB25{i:02d}") for i in range(symbols)])
+
+    def batch_split_columns():
+        for sub in split_by_symbol(multi_df).values():
+            to_bar_columns(sub, adjustment, end)
+
+    results = {
+        "legacy_itertuples": timeit(lambda: legacy_to_bars(df.copy(), adjustment, end)),
+        "vectorized_columns": timeit(lambda: to_bar_columns(df, adjustment, end)),
+        "vectorized_to_bars": timeit(lambda: columns_to_bars(to_bar_columns(df, adjustment, end), "rb2510",
+                                                             Exchange.SHFE, Interval.MINUTE)),
+        "vectorized_feed_am": timeit(vectorized_batch),
+        "batch_split_columns": timeit(batch_split_columns),
+    }
+    return {f"{name}_us_per_row": seconds / rows * 1e6 for name, seconds in results.items()}
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    for name, value in run(rows).items():
+        print(f"{name:40} {value:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+米筐代码转换的耗时: ndarray 线性查找、set 查找、RqdataDatafeed.resolve_symbol 缓存命中,
+all_symbols 的规模与 all_instruments 返回的合约数量相当
+
+运行: python -m benchmark.bench_rq_symbol
+"""
+import os
+import sys
+
+import numpy as np
+
+from vnpy.trader.constant import Exchange
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../vnpy_other/datafeed"))
+
+from vnpy_rqdata.rqdata_datafeed import RqdataDatafeed, to_rq_symbol  # noqa: E402
+
+from benchmark.bench_datafeed_convert import timeit  # noqa: E402
+
+SYMBOLS = [
+    ("rb2510", Exchange.SHFE),
+    ("au2512", Exchange.SHFE),
+    ("i2509", Exchange.DCE),
+    ("IF2509", Exchange.CFFEX),
+    ("SA509", Exchange.CZCE),
+    ("MA601", Exchange.CZCE),
+    ("m2509-C-3000", Exchange.DCE),
+    ("SR509C6000", Exchange.CZCE),
+]
+
+
+def make_all_symbols(count: int = 40_000) -> np.ndarray:
+    products = ["RB", "AU", "I", "IF", "SA", "MA", "M", "SR", "CU", "AL", "ZN", "TA", "CF", "P", "Y", "J"]
+    symbols = [f"{products[i % len(products)]}{1000 + i // len(products)}" for i in range(count)]
+    return np.array(symbols + ["SA2509", "MA2601", "SR2509C6000"])
+
+
+def run(calls: int = 20_000) -> dict[str, float]:
+    all_symbols = make_all_symbols()
+    requests = (SYMBOLS * (calls // len(SYMBOLS) + 1))[:calls]
+
+    symbol_set = set(all_symbols.tolist())
+    datafeed = RqdataDatafeed()
+    datafeed.set_universe(symbol_set)
+
+    def convert():
+        for symbol, exchange in requests:
+            to_rq_symbol(symbol, exchange, all_symbols)
+
+    def convert_set():
+        for symbol, exchange in requests:
+            to_rq_symbol(symbol, exchange, symbol_set)
+
+    def resolve_memoized():
+        for symbol, exchange in requests:
+            datafeed.resolve_symbol(symbol, exchange)
+
+    return {
+        "to_rq_symbol_us_per_call": timeit(convert) / calls * 1e6,
+        "to_rq_symbol_set_us_per_call": timeit(convert_set) / calls * 1e6,
+        "resolve_symbol_memoized_us_per_call": timeit(resolve_memoized) / calls * 1e6,
+    }
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    for name, value in run(calls).items():
+        print(f"{name:40} {value:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
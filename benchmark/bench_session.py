@@ -0,0 +1,73 @@
+"""
+to_string 格式化与 CtpSession 行情回调(_on_tick)的耗时
+
+运行: python -m benchmark.bench_session
+"""
+import logging
+import sys
+import tempfile
+from datetime import datetime
+
+from vnpy.event import Event
+from vnpy.trader.constant import Direction, Exchange, Offset, OrderType, Status
+from vnpy.trader.event import EVENT_TICK
+from vnpy.trader.object import OrderData
+
+from benchmark.bench_datafeed_convert import timeit
+from benchmark.bench_tick_journal import make_ticks
+from ctp.ctp_session import CtpSession
+from ctp.output import to_string
+
+
+def _session_on_tick(events: list[Event], log_dir: str, file_level: int, async_write: bool,
+                     tick_interval: float) -> float:
+    session = CtpSession()
+    session._init_logger(log_dir, file_level, logging.CRITICAL, "utf-8", async_write, tick_interval)
+    try:
+        def on_tick():
+            for event in events:
+                session._on_tick(event)
+        return timeit(on_tick)
+    finally:
+        if session._log_listener is not None:
+            session._log_listener.stop()
+        for handler in list(session.logger().handlers):
+            session.logger().removeHandler(handler)
+            handler.close()
+
+
+def run(rows: int = 20_000) -> dict[str, float]:
+    ticks = make_ticks(rows)
+    events = [Event(EVENT_TICK, tick) for tick in ticks]
+    order = OrderData(symbol="rb2510", exchange=Exchange.SHFE, orderid="1", type=OrderType.LIMIT,
+                      direction=Direction.LONG, offset=Offset.OPEN, price=3500, volume=1, status=Status.NOTTRADED,
+                      datetime=datetime.now(), gateway_name="BENCH")
+
+    def format_ticks():
+        for tick in ticks:
+            to_string(tick)
+
+    def format_orders():
+        for _ in range(rows):
+            to_string(order)
+
+    results = {
+        "to_string_tick": timeit(format_ticks),
+        "to_string_order": timeit(format_orders),
+    }
+    with tempfile.TemporaryDirectory() as log_dir:
+        results["on_tick_info_level"] = _session_on_tick(events, log_dir, logging.INFO, True, 0)
+        results["on_tick_debug_sync"] = _session_on_tick(events, log_dir, logging.DEBUG, False, 0)
+        results["on_tick_debug_async"] = _session_on_tick(events, log_dir, logging.DEBUG, True, 0)
+        results["on_tick_debug_async_sampled"] = _session_on_tick(events, log_dir, logging.DEBUG, True, 1)
+    return {f"{name}_us_per_event": seconds / rows * 1e6 for name, seconds in results.items()}
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    for name, value in run(rows).items():
+        print(f"{name:40} {value:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
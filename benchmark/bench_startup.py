@@ -0,0 +1,74 @@
+"""
+启动耗时: 在新的解释器中用 -X importtime 统计导入 ctp.ctp_session 及各依赖包的累计耗时,
+以及策略清单首次扫描(解析全部文件)与命中缓存时的耗时
+
+运行: python -m benchmark.bench_startup [模块数]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmark.bench_datafeed_convert import timeit
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# 单独统计累计耗时的顶层包
+PACKAGES = ("vnpy", "vnpy_ctastrategy", "vnpy_ctp", "pandas", "talib", "strategy", "rqdatac", "tqsdk")
+
+
+def import_times(module: str = "ctp.ctp_session") -> dict[str, int]:
+    """返回 模块名 -> 累计导入耗时(微秒), 只包含本次导入中首次加载的模块"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT_DIR,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative_us)
+    return times
+
+
+def top_modules(times: dict[str, int], count: int = 15) -> list[tuple[str, int]]:
+    return sorted(times.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+def run(repeat: int = 3) -> dict[str, float]:
+    sys.path.insert(0, ROOT_DIR)
+    from ctp.strategy_manifest import StrategyManifest
+
+    best: dict[str, int] = {}
+    for _ in range(repeat):
+        for name, us in import_times().items():
+            best[name] = min(best.get(name, us), us)
+
+    results = {"import_ctp_session_ms": best.get("ctp.ctp_session", 0) / 1000}
+    for package in PACKAGES:
+        results[f"import_{package}_ms"] = best.get(package, 0) / 1000
+
+    folders = [(os.path.join(ROOT_DIR, "strategy"), "strategy")]
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache_path = os.path.join(cache_dir, "manifest.json")
+
+        def cold_scan():
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+            StrategyManifest(cache_path).scan(folders)
+
+        results["manifest_scan_cold_ms"] = timeit(cold_scan) * 1000
+        results["manifest_scan_cached_ms"] = timeit(lambda: StrategyManifest(cache_path).scan(folders)) * 1000
+    return results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    for name, value in run().items():
+        print(f"{name:40} {value:10.3f}")
+    print("\n导入耗时最多的模块(累计, ms):")
+    for name, us in top_modules(import_times(), count):
+        print(f"{name:60} {us / 1000:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+对比内置策略每根k线的耗时:
+legacy 只计入 am.update_bar 与原有的整段指标重算(ArrayManager + llv/hhv 循环),
+streaming 计入使用流式指标后完整的 on_window_bar, 因此是偏保守的对比;
+计时之前先用同一组数据核对流式指标与 TA-Lib 的结果, 不一致时抛出 AssertionError
+
+运行: python -m benchmark.bench_strategies
+"""
+import logging
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import talib
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+from vnpy.trader.utility import ArrayManager
+
+from benchmark.bench_datafeed_convert import timeit
+from ctp.settings import SETTINGS
+from strategy.C53 import C53
+from strategy.MACD import MACD
+from strategy.haiying6 import HaiYing6
+from strategy.util.indicator import ATR, EMA, MACD as StreamingMACD, WindowedEMA
+from strategy.util.series import RingSeries
+
+
+class StubEngine:
+    """策略运行所需的最小引擎, 策略不处于交易状态, 不会真正发单"""
+
+    class MainEngine:
+        def get_contract(self, vt_symbol: str):
+            return None
+
+    main_engine = MainEngine()
+
+    def get_size(self, strategy) -> int:
+        return 10
+
+    def write_log(self, msg: str, strategy=None) -> None:
+        pass
+
+    def put_strategy_event(self, strategy) -> None:
+        pass
+
+
+def make_bars(rows: int) -> list[BarData]:
+    rng = np.random.default_rng(0)
+    close = 3500 + rng.standard_normal(rows).cumsum()
+    start = datetime(2025, 1, 2, 9)
+    return [
+        BarData(symbol="rb2510", exchange=Exchange.SHFE, interval=Interval.MINUTE,
+                datetime=start + timedelta(minutes=i), open_price=c, high_price=c + 2, low_price=c - 2,
+                close_price=c, volume=100, gateway_name="BENCH")
+        for i, c in enumerate(close.tolist())
+    ]
+
+
+def llv(period: int, array: np.ndarray) -> np.ndarray:
+    """HaiYing6 原有的 llv 实现"""
+    if len(array) < period:
+        return np.full_like(array, np.nan)
+    result = np.zeros_like(array)
+    for i in range(len(array)):
+        result[i] = np.nan if i < period - 1 else np.min(array[i - period + 1:i + 1])
+    return result
+
+
+def hhv(period: int, array: np.ndarray) -> np.ndarray:
+    """HaiYing6 原有的 hhv 实现"""
+    if len(array) < period:
+        return np.full_like(array, np.nan)
+    result = np.zeros_like(array)
+    for i in range(len(array)):
+        result[i] = np.nan if i < period - 1 else np.max(array[i - period + 1:i + 1])
+    return result
+
+
+def legacy_macd(strategy: MACD, am: ArrayManager) -> None:
+    macd, signal, hist = am.macd(12, 26, 9, array=True)
+
+
+def legacy_c53(strategy: C53, am: ArrayManager) -> None:
+    am.atr(strategy.atr_length)
+    am.ema(strategy.ema_length, array=True)[-2]
+    am.high[-strategy.cl_period:].max()
+    am.low[-strategy.cl_period:].min()
+
+
+def legacy_haiying6(strategy: HaiYing6, am: ArrayManager) -> None:
+    am.atr(strategy.atr_length)
+    diff, dea, macd = am.macd(12, 26, 9, array=True)
+    any(diff[i] == llv(120, diff)[i] for i in range(-3, 0))
+    any(diff[i] == hhv(120, diff)[i] for i in range(-3, 0))
+    am.high[-strategy.len_period:].max()
+    am.low[-strategy.len_period:].min()
+
+
+def assert_same(name: str, streaming: list[float], expected: np.ndarray) -> None:
+    """NaN 的位置相同, 其余值的相对误差在 1e-9 内"""
+    if not np.allclose(np.array(streaming), expected, rtol=1e-9, atol=1e-9, equal_nan=True):
+        raise AssertionError(f"流式指标 {name} 与 TA-Lib 的结果不一致")
+
+
+def check_indicators(bars: list[BarData]) -> None:
+    """流式 EMA/MACD/ATR 与 TA-Lib 对整段序列的结果一致, WindowedEMA 及 C53 的 EMA 与按 am 窗口计算的结果一致"""
+    high = np.array([bar.high_price for bar in bars])
+    low = np.array([bar.low_price for bar in bars])
+    close = np.array([bar.close_price for bar in bars])
+
+    ema = EMA(240)
+    assert_same("EMA", [ema.update(x) for x in close], talib.EMA(close, 240))
+    macd = StreamingMACD(12, 26, 9)
+    values = [macd.update(x) for x in close]
+    for i, (name, expected) in enumerate(zip(("macd", "signal", "hist"), talib.MACD(close, 12, 26, 9))):
+        assert_same(f"MACD.{name}", [v[i] for v in values], expected)
+    atr = ATR(26)
+    assert_same("ATR", [atr.update(h, l, c) for h, l, c in zip(high, low, close)], talib.ATR(high, low, close, 26))
+
+    length = 254
+    windowed = WindowedEMA(240, length)
+    assert_same("WindowedEMA", [windowed.update(x) for x in close],
+                np.array([talib.EMA(close[max(0, i + 1 - length):i + 1], 240)[-1] if i >= 239 else np.nan
+                          for i in range(len(close))]))
+
+    # C53 的 EMA 与原来 am.ema(ema_length, array=True)[-2] 相同
+    strategy = new_strategy(C53, [])
+    am = ArrayManager(size=strategy.num_init_bars())
+    mas, expected = [], []
+    for bar in bars:
+        strategy.on_window_bar(bar)
+        am.update_bar(bar)
+        if am.inited:
+            mas.append(strategy.mas_value)
+            expected.append(am.ema(strategy.ema_length, array=True)[-2])
+    assert_same("C53.mas_value", mas, np.array(expected))
+
+
+def new_strategy(cls, bars: list[BarData]):
+    """创建策略并用 bars 完成初始化"""
+    strategy = cls(StubEngine(), cls.__name__, "rb2510.SHFE", {"interval": "1m"})
+    strategy.am = ArrayManager(size=strategy.num_init_bars())
+    for bar in bars:
+        strategy.on_window_bar(bar)
+    return strategy
+
+
+def run(rows: int = 2_000) -> dict[str, float]:
+    SETTINGS["logger"] = logging.getLogger("bench")
+    SETTINGS["logger"].setLevel(logging.CRITICAL)
+
+    check_indicators(make_bars(1_000))
+
+    results = {}
+    for cls, legacy in ((MACD, legacy_macd), (C53, legacy_c53), (HaiYing6, legacy_haiying6)):
+        probe = cls(StubEngine(), cls.__name__, "rb2510.SHFE", {"interval": "1m"})
+        bars = make_bars(probe.num_init_bars() + rows)
+        warmup, measured = bars[:-rows], bars[-rows:]
+        name = cls.__name__.lower()
+
+        def run_legacy():
+            strategy = new_strategy(cls, warmup)
+            am = ArrayManager(size=strategy.num_init_bars())
+            for bar in warmup:
+                am.update_bar(bar)
+            for bar in measured:
+                am.update_bar(bar)
+                legacy(strategy, am)
+
+        def run_streaming():
+            strategy = new_strategy(cls, warmup)
+            for bar in measured:
+                strategy.on_window_bar(bar)
+
+        # 两者都包含 warmup 的固定开销, 相对 rows 根k线可以忽略
+        results[f"{name}_legacy"] = timeit(run_legacy)
+        results[f"{name}_streaming"] = timeit(run_streaming)
+
+    # C53 的CL周期极值历史: 原来只增不减的 list 与定长 RingSeries, 每根k线追加并取 CD+1 周期前的值
+    lag = C53.cd_period + 2
+
+    def run_list():
+        levels = []
+        for i in range(rows):
+            levels.append(float(i))
+            if len(levels) >= lag:
+                levels[-lag]
+
+    def run_ring():
+        levels = RingSeries(lag)
+        for i in range(rows):
+            levels.append(float(i))
+            if len(levels) >= lag:
+                levels[-lag]
+
+    results["levels_list"] = timeit(run_list)
+    results["levels_ring"] = timeit(run_ring)
+    return {f"{name}_us_per_bar": seconds / rows * 1e6 for name, seconds in results.items()}
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    for name, value in run(rows).items():
+        print(f"{name:40} {value:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
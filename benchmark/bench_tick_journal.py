@@ -0,0 +1,51 @@
+"""
+tick 二进制记录的写入与读取速度
+
+运行: python -m benchmark.bench_tick_journal
+"""
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from vnpy.trader.constant import Exchange
+from vnpy.trader.object import TickData
+
+from ctp.bar_batch import CHINA_TZ
+from ctp.tick_journal import TickJournal, read_records
+
+
+def make_ticks(rows: int, symbols: int = 10) -> list[TickData]:
+    start = datetime(2025, 1, 2, 9, tzinfo=CHINA_TZ)
+    return [
+        TickData(symbol=f"rb25{i % symbols:02d}", exchange=Exchange.SHFE, datetime=start + timedelta(milliseconds=50 * i),
+                 last_price=3500 + i % 7, volume=i, bid_price_1=3499, ask_price_1=3501, gateway_name="BENCH")
+        for i in range(rows)
+    ]
+
+
+def run(rows: int = 200_000) -> dict[str, float]:
+    ticks = make_ticks(rows)
+    with tempfile.TemporaryDirectory() as root_dir:
+        journal = TickJournal(root_dir)
+        t = time.perf_counter()
+        for tick in ticks:
+            journal.record(tick)
+        write = time.perf_counter() - t
+        journal.close()
+
+        t = time.perf_counter()
+        records = read_records(root_dir, "rb2500.SHFE")
+        read = time.perf_counter() - t
+        assert len(records) == rows // 10
+    return {"write_ticks_per_second": rows / write, "read_ticks_per_second": len(records) / read}
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    for name, value in run(rows).items():
+        print(f"{name:40} {value:14.0f}")
+
+
+if __name__ == "__main__":
+    main()
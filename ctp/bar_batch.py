@@ -0,0 +1,160 @@
+__all__ = ["BarBatch", "TickBatch", "BAR_FIELDS", "TICK_FIELDS", "to_timestamp", "from_timestamp"]
+
+from collections.abc import Iterator
+from datetime import datetime
+
+import numpy as np
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData, TickData
+from vnpy.trader.utility import ArrayManager, ZoneInfo
+
+CHINA_TZ = ZoneInfo("Asia/Shanghai")
+
+# 列名与 BarData/TickData 的字段同名, datetime 列为纳秒时间戳
+BAR_FIELDS = ("open_price", "high_price", "low_price", "close_price", "volume", "turnover", "open_interest")
+
+TICK_FIELDS = (
+    "volume", "turnover", "open_interest", "last_price", "last_volume", "limit_up", "limit_down",
+    "open_price", "high_price", "low_price", "pre_close",
+    "bid_price_1", "bid_price_2", "bid_price_3", "bid_price_4", "bid_price_5",
+    "ask_price_1", "ask_price_2", "ask_price_3", "ask_price_4", "ask_price_5",
+    "bid_volume_1", "bid_volume_2", "bid_volume_3", "bid_volume_4", "bid_volume_5",
+    "ask_volume_1", "ask_volume_2", "ask_volume_3", "ask_volume_4", "ask_volume_5",
+)
+
+# ArrayManager 中与 BarData 字段对应的数组
+AM_ARRAYS = {
+    "open_price": "open_array",
+    "high_price": "high_array",
+    "low_price": "low_array",
+    "close_price": "close_array",
+    "volume": "volume_array",
+    "turnover": "turnover_array",
+    "open_interest": "open_interest_array",
+}
+
+
+def to_timestamp(dt: datetime) -> int:
+    """datetime 转纳秒时间戳, 不带时区的视为北京时间"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=CHINA_TZ)
+    return int(dt.timestamp()) * 1_000_000_000 + dt.microsecond * 1000
+
+
+def from_timestamp(ts: int) -> datetime:
+    """纳秒时间戳转北京时间 datetime"""
+    seconds, nanos = divmod(ts, 1_000_000_000)
+    return datetime.fromtimestamp(seconds, CHINA_TZ).replace(microsecond=nanos // 1000)
+
+
+class _ColumnBatch:
+    fields: tuple[str, ...] = ()
+
+    def __init__(self, symbol: str, exchange: Exchange, datetime: np.ndarray, columns: dict[str, np.ndarray],
+                 gateway_name: str = ""):
+        self.symbol = symbol
+        self.exchange = exchange
+        self.datetime: np.ndarray = datetime
+        self.columns: dict[str, np.ndarray] = columns
+        self.gateway_name = gateway_name
+
+    @property
+    def vt_symbol(self) -> str:
+        return f"{self.symbol}.{self.exchange.value}"
+
+    def __len__(self) -> int:
+        return len(self.datetime)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.columns[field]
+
+    def _search(self, start: datetime | None, end: datetime | None) -> tuple[int, int]:
+        lo = 0 if start is None else int(np.searchsorted(self.datetime, to_timestamp(start), side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.datetime, to_timestamp(end), side="left"))
+        return lo, hi
+
+    def _rows(self) -> Iterator[tuple[datetime, dict]]:
+        # 数据服务未提供的列(如 last_volume)使用数据类的默认值
+        columns = {f: self.columns[f].tolist() for f in self.fields if f in self.columns}
+        for i, ts in enumerate(self.datetime.tolist()):
+            yield from_timestamp(ts), {f: values[i] for f, values in columns.items()}
+
+
+class BarBatch(_ColumnBatch):
+    """列式K线数据(struct-of-arrays), 只有调用方需要时才逐个构造 BarData"""
+
+    fields = BAR_FIELDS
+
+    def __init__(self, symbol: str, exchange: Exchange, interval: Interval, datetime: np.ndarray,
+                 columns: dict[str, np.ndarray], gateway_name: str = ""):
+        super().__init__(symbol, exchange, datetime, columns, gateway_name)
+        self.interval = interval
+
+    @classmethod
+    def from_bars(cls, symbol: str, exchange: Exchange, interval: Interval, bars: list[BarData],
+                  gateway_name: str = "") -> "BarBatch":
+        datetimes = np.fromiter((to_timestamp(bar.datetime) for bar in bars), dtype=np.int64, count=len(bars))
+        columns = {f: np.fromiter((getattr(bar, f) for bar in bars), dtype=np.float64, count=len(bars))
+                   for f in BAR_FIELDS}
+        return cls(symbol, exchange, interval, datetimes, columns, gateway_name)
+
+    @classmethod
+    def concat(cls, batches: list["BarBatch"]) -> "BarBatch":
+        """按顺序拼接时间上不重叠的多段K线"""
+        first = batches[0]
+        datetimes = np.concatenate([b.datetime for b in batches])
+        columns = {f: np.concatenate([b.columns[f] for b in batches]) for f in BAR_FIELDS}
+        return cls(first.symbol, first.exchange, first.interval, datetimes, columns, first.gateway_name)
+
+    def slice(self, start: datetime | None = None, end: datetime | None = None) -> "BarBatch":
+        """截取 [start, end) 区间, 返回的各列为原数组的视图"""
+        lo, hi = self._search(start, end)
+        return BarBatch(self.symbol, self.exchange, self.interval, self.datetime[lo:hi],
+                        {f: a[lo:hi] for f, a in self.columns.items()}, self.gateway_name)
+
+    def __iter__(self) -> Iterator[BarData]:
+        for dt, values in self._rows():
+            yield BarData(symbol=self.symbol, exchange=self.exchange, interval=self.interval, datetime=dt,
+                          gateway_name=self.gateway_name, **values)
+
+    def to_bars(self) -> list[BarData]:
+        return list(self)
+
+    def feed(self, am: ArrayManager) -> None:
+        """整批写入 ArrayManager, 效果与逐根调用 am.update_bar 相同"""
+        n = min(len(self), am.size)
+        if n:
+            for field, array_name in AM_ARRAYS.items():
+                array: np.ndarray = getattr(am, array_name)
+                array[:-n] = array[n:]
+                array[-n:] = self.columns[field][-n:]
+        am.count += len(self)
+        if not am.inited and am.count >= am.size:
+            am.inited = True
+
+
+class TickBatch(_ColumnBatch):
+    """列式Tick数据(struct-of-arrays), 只有调用方需要时才逐个构造 TickData"""
+
+    fields = TICK_FIELDS
+
+    @classmethod
+    def from_ticks(cls, symbol: str, exchange: Exchange, ticks: list[TickData], gateway_name: str = "") -> "TickBatch":
+        datetimes = np.fromiter((to_timestamp(tick.datetime) for tick in ticks), dtype=np.int64, count=len(ticks))
+        columns = {f: np.fromiter((getattr(tick, f) for tick in ticks), dtype=np.float64, count=len(ticks))
+                   for f in TICK_FIELDS}
+        return cls(symbol, exchange, datetimes, columns, gateway_name)
+
+    def slice(self, start: datetime | None = None, end: datetime | None = None) -> "TickBatch":
+        lo, hi = self._search(start, end)
+        return TickBatch(self.symbol, self.exchange, self.datetime[lo:hi],
+                         {f: a[lo:hi] for f, a in self.columns.items()}, self.gateway_name)
+
+    def __iter__(self) -> Iterator[TickData]:
+        for dt, values in self._rows():
+            yield TickData(symbol=self.symbol, exchange=self.exchange, datetime=dt,
+                           gateway_name=self.gateway_name, **values)
+
+    def to_ticks(self) -> list[TickData]:
+        return list(self)
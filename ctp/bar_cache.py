@@ -0,0 +1,373 @@
+__all__ = ["BarCache", "CachedDatafeed", "ChunkedDownloader", "query_bar_batch", "query_bar_batches",
+           "iter_tick_batches", "month_chunks"]
+
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from vnpy.trader.constant import Interval
+from vnpy.trader.datafeed import BaseDatafeed
+from vnpy.trader.object import BarData, HistoryRequest, TickData
+
+from .bar_batch import BAR_FIELDS, BarBatch, CHINA_TZ, TickBatch, from_timestamp, to_timestamp
+
+INTERVAL_DELTA: dict[Interval, timedelta] = {
+    Interval.MINUTE: timedelta(minutes=1),
+    Interval.HOUR: timedelta(hours=1),
+    Interval.DAILY: timedelta(days=1),
+    Interval.WEEKLY: timedelta(weeks=1),
+}
+
+# 长区间按自然月分段下载, 每段的月数; 段边界对齐到 1970 年起每 N 个月, 与缓存中记录的区间边界一致
+CHUNK_MONTHS: dict[Interval, int] = {
+    Interval.MINUTE: 1,
+    Interval.HOUR: 3,
+    Interval.DAILY: 24,
+    Interval.WEEKLY: 24,
+}
+
+
+def _columns_to_batch(req: HistoryRequest, columns: dict[str, np.ndarray] | None) -> BarBatch:
+    if columns is None:
+        columns = {"datetime": np.empty(0, dtype=np.int64),
+                   **{f: np.empty(0, dtype=np.float64) for f in BAR_FIELDS}}
+    datetimes = columns.pop("datetime")
+    return BarBatch(req.symbol, req.exchange, req.interval, datetimes, columns)
+
+
+def _query_bar_batch(datafeed: BaseDatafeed, req: HistoryRequest, output: Callable) -> BarBatch | None:
+    """与 query_bar_batch 相同, 但数据服务查询失败(返回 None)时返回 None, 与没有数据的空结果区分"""
+    if hasattr(datafeed, "query_bar_batch"):
+        return datafeed.query_bar_batch(req, output)
+    if hasattr(datafeed, "query_bar_columns"):
+        columns = datafeed.query_bar_columns(req, output)
+        return None if columns is None else _columns_to_batch(req, columns)
+    bars = datafeed.query_bar_history(req, output)
+    return None if bars is None else BarBatch.from_bars(req.symbol, req.exchange, req.interval, bars)
+
+
+def _query_bar_batches(datafeed: BaseDatafeed, reqs: list[HistoryRequest],
+                       output: Callable) -> list[BarBatch | None]:
+    """与 query_bar_batches 相同, 查询失败的请求对应 None"""
+    if not reqs:
+        return []
+    if hasattr(datafeed, "query_bar_batches"):
+        return datafeed.query_bar_batches(reqs, output)
+    if hasattr(datafeed, "query_bar_columns_batch"):
+        results = datafeed.query_bar_columns_batch(reqs, output)
+        return [None if columns is None else _columns_to_batch(req, columns) for req, columns in zip(reqs, results)]
+    return [_query_bar_batch(datafeed, req, output) for req in reqs]
+
+
+def query_bar_batch(datafeed: BaseDatafeed, req: HistoryRequest, output: Callable = print) -> BarBatch:
+    """以列式数据查询K线, 数据服务不支持列式查询时退回 query_bar_history"""
+    batch = _query_bar_batch(datafeed, req, output)
+    return _columns_to_batch(req, None) if batch is None else batch
+
+
+def query_bar_batches(datafeed: BaseDatafeed, reqs: list[HistoryRequest],
+                      output: Callable = print) -> list[BarBatch]:
+    """批量查询K线, 返回值与 reqs 一一对应; 数据服务不支持批量查询时逐个调用 query_bar_batch"""
+    return [_columns_to_batch(req, None) if batch is None else batch
+            for req, batch in zip(reqs, _query_bar_batches(datafeed, reqs, output))]
+
+
+def iter_tick_batches(datafeed: BaseDatafeed, req: HistoryRequest, output: Callable = print) -> Iterator[TickBatch]:
+    """
+    按块查询Tick, 数据服务支持流式查询时每个交易日一块, 内存占用不随查询区间增长;
+    否则退回 query_tick_history 一次返回全部数据
+    """
+    # CachedDatafeed/HistoryService 不缓存Tick, 直接使用其下层的数据服务
+    while hasattr(datafeed, "datafeed"):
+        datafeed = datafeed.datafeed
+    if hasattr(datafeed, "iter_tick_columns"):
+        for columns in datafeed.iter_tick_columns(req, output):
+            datetimes = columns.pop("datetime")
+            yield TickBatch(req.symbol, req.exchange, datetimes, columns, gateway_name="DATAFEED")
+        return
+    ticks = datafeed.query_tick_history(req, output) or []
+    if ticks:
+        yield TickBatch.from_ticks(req.symbol, req.exchange, ticks, ticks[0].gateway_name)
+
+
+def month_chunks(start: datetime, end: datetime, months: int) -> list[tuple[datetime, datetime]]:
+    """将 [start, end) 在每 months 个自然月的边界处切分, 边界与 start 的时区相同(无时区时也无时区)"""
+    if (start.tzinfo is None) != (end.tzinfo is None):
+        # 与 bar_batch.to_timestamp 一致, 无时区的时间按北京时间处理
+        start, end = (dt if dt.tzinfo else dt.replace(tzinfo=CHINA_TZ) for dt in (start, end))
+    tzinfo = start.tzinfo
+    chunks = []
+    cursor = start
+    while cursor < end:
+        index = (cursor.year - 1970) * 12 + cursor.month - 1
+        index = (index // months + 1) * months
+        boundary = datetime(1970 + index // 12, index % 12 + 1, 1, tzinfo=tzinfo)
+        chunks.append((cursor, min(boundary, end)))
+        cursor = boundary
+    return chunks
+
+
+class ChunkedDownloader:
+    """
+    将长区间的K线请求按自然月分段, 由线程池并发下载,
+    每段失败后单独重试, 结果按时间顺序返回
+    """
+
+    def __init__(self, datafeed: BaseDatafeed, workers: int = 4, retries: int = 2, retry_interval: float = 1):
+        self.datafeed = datafeed
+        self.retries = retries
+        self.retry_interval = retry_interval
+        self.executor = ThreadPoolExecutor(max(workers, 1), thread_name_prefix="BarChunk")
+
+    @staticmethod
+    def split(req: HistoryRequest) -> list[HistoryRequest]:
+        months = CHUNK_MONTHS.get(req.interval)
+        if months is None:
+            return [req]
+        return [HistoryRequest(symbol=req.symbol, exchange=req.exchange, start=start, end=end, interval=req.interval)
+                for start, end in month_chunks(req.start, req.end, months)]
+
+    def _fetch(self, req: HistoryRequest, output: Callable) -> BarBatch | None:
+        """下载一段K线, 重试后仍失败时返回 None; 没有数据时返回空的 BarBatch"""
+        for attempt in range(self.retries + 1):
+            try:
+                batch = _query_bar_batch(self.datafeed, req, output)
+            except Exception as ex:
+                error = ex
+            else:
+                if batch is not None:
+                    # 数据服务可能返回起始日期前一晚的夜盘, 截掉以保证各段不重叠
+                    return batch.slice(req.start, req.end)
+                error = "数据服务返回查询失败"
+            output(f"K线下载失败({attempt + 1}/{self.retries + 1}): {req.vt_symbol} "
+                   f"{req.start} ~ {req.end}, {error}")
+            if attempt < self.retries:
+                time.sleep(self.retry_interval * (attempt + 1))
+        return None
+
+    def download(self, req: HistoryRequest, output: Callable = print,
+                 on_chunk: Callable[[HistoryRequest, BarBatch | None], None] | None = None) -> list[BarBatch]:
+        """
+        下载 req 区间的K线, 返回按时间排列的各段结果(失败的段为空);
+        on_chunk 在每段下载完成时立即调用(完成顺序), 用于边下载边写缓存, 下载失败的段传入 None
+        """
+        sub_reqs = self.split(req)
+        if len(sub_reqs) == 1:
+            batch = self._fetch(req, output)
+            if on_chunk is not None:
+                on_chunk(req, batch)
+            return [_columns_to_batch(req, None) if batch is None else batch]
+
+        futures = {self.executor.submit(self._fetch, sub_req, output): i for i, sub_req in enumerate(sub_reqs)}
+        batches: list[BarBatch] = [_columns_to_batch(sub_req, None) for sub_req in sub_reqs]
+        for future in as_completed(futures):
+            i = futures[future]
+            batch = future.result()
+            if on_chunk is not None:
+                on_chunk(sub_reqs[i], batch)
+            if batch is not None:
+                batches[i] = batch
+        return batches
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _BarSeries:
+    """单个 (vt_symbol, interval) 的列式K线数据及已缓存的时间区间"""
+
+    def __init__(self):
+        self.datetime: np.ndarray = np.empty(0, dtype=np.int64)
+        self.columns: dict[str, np.ndarray] = {f: np.empty(0, dtype=np.float64) for f in BAR_FIELDS}
+        # 已覆盖的时间区间 [start, end), 按 start 排序且互不重叠, 单位为纳秒
+        self.ranges: np.ndarray = np.empty((0, 2), dtype=np.int64)
+
+    @classmethod
+    def load(cls, filepath: str) -> "_BarSeries":
+        series = cls()
+        with np.load(filepath) as npz:
+            series.datetime = npz["datetime"]
+            series.columns = {f: npz[f] for f in BAR_FIELDS}
+            series.ranges = npz["ranges"]
+        return series
+
+    def save(self, filepath: str) -> None:
+        tmp_filepath = f"{filepath}.tmp"
+        with open(tmp_filepath, "wb") as f:
+            np.savez(f, datetime=self.datetime, ranges=self.ranges, **self.columns)
+        os.replace(tmp_filepath, filepath)
+
+    def missing(self, start: int, end: int) -> list[tuple[int, int]]:
+        """返回 [start, end) 中尚未缓存的区间"""
+        gaps = []
+        cursor = start
+        for s, e in self.ranges:
+            if e <= cursor:
+                continue
+            if s >= end:
+                break
+            if s > cursor:
+                gaps.append((cursor, int(s)))
+            cursor = max(cursor, int(e))
+            if cursor >= end:
+                break
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def merge(self, datetimes: np.ndarray, columns: dict[str, np.ndarray], start: int, end: int) -> None:
+        """合并新下载的K线, 同一时间戳以新数据为准, 并记录 [start, end) 为已缓存"""
+        if len(datetimes):
+            merged_dt = np.concatenate((datetimes, self.datetime))
+            # np.unique 返回每个时间戳首次出现的位置, 新数据在前所以优先保留
+            self.datetime, idx = np.unique(merged_dt, return_index=True)
+            for f in BAR_FIELDS:
+                self.columns[f] = np.concatenate((columns[f], self.columns[f]))[idx]
+
+        if end <= start:
+            return
+        ranges = sorted([(int(s), int(e)) for s, e in self.ranges] + [(start, end)])
+        merged = [list(ranges[0])]
+        for s, e in ranges[1:]:
+            if s <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], e)
+            else:
+                merged.append([s, e])
+        self.ranges = np.array(merged, dtype=np.int64).reshape(-1, 2)
+
+    def slice(self, start: int, end: int) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+        lo = np.searchsorted(self.datetime, start, side="left")
+        hi = np.searchsorted(self.datetime, end, side="left")
+        # 拷贝一份, 避免后续 merge 替换数组时影响调用方
+        return self.datetime[lo:hi].copy(), {f: self.columns[f][lo:hi].copy() for f in BAR_FIELDS}
+
+
+class BarCache:
+    """
+    本地K线缓存, 每个 (vt_symbol, interval) 保存为一个 npz 列式文件,
+    同时记录已经下载过的时间区间, 只需向数据服务请求缺失的部分
+    """
+
+    def __init__(self, cache_dir: str, settle_delay: timedelta = timedelta(days=1)):
+        self.cache_dir = cache_dir
+        # 距今 settle_delay 之内的区间可能尚未在数据服务中落地, 仅按实际收到的最后一根K线记录覆盖范围
+        self.settle_delay = settle_delay
+        self._series: dict[tuple[str, Interval], _BarSeries] = {}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _filepath(self, vt_symbol: str, interval: Interval) -> str:
+        return os.path.join(self.cache_dir, f"{vt_symbol}.{interval.value}.npz")
+
+    def _get_series(self, vt_symbol: str, interval: Interval) -> _BarSeries:
+        key = (vt_symbol, interval)
+        series = self._series.get(key)
+        if series is None:
+            filepath = self._filepath(vt_symbol, interval)
+            series = _BarSeries.load(filepath) if os.path.isfile(filepath) else _BarSeries()
+            self._series[key] = series
+        return series
+
+    def missing(self, req: HistoryRequest) -> list[tuple[datetime, datetime]]:
+        """返回请求区间中尚未缓存的子区间"""
+        with self._lock:
+            series = self._get_series(req.vt_symbol, req.interval)
+            gaps = series.missing(to_timestamp(req.start), to_timestamp(req.end))
+        return [(from_timestamp(s), from_timestamp(e)) for s, e in gaps]
+
+    def update(self, req: HistoryRequest, batch: BarBatch) -> None:
+        """写入 req 区间的下载结果"""
+        start, end = to_timestamp(req.start), to_timestamp(req.end)
+        delta = int(INTERVAL_DELTA[req.interval].total_seconds()) * 1_000_000_000
+
+        covered_end = min(end, to_timestamp(datetime.now(CHINA_TZ) - self.settle_delay))
+        if len(batch):
+            covered_end = max(covered_end, min(end, int(batch.datetime.max()) + delta))
+
+        with self._lock:
+            series = self._get_series(req.vt_symbol, req.interval)
+            series.merge(batch.datetime, batch.columns, start, covered_end)
+            series.save(self._filepath(req.vt_symbol, req.interval))
+
+    def load(self, req: HistoryRequest, gateway_name: str = "CACHE") -> BarBatch:
+        """读取 req 区间内已缓存的K线"""
+        with self._lock:
+            series = self._get_series(req.vt_symbol, req.interval)
+            datetimes, columns = series.slice(to_timestamp(req.start), to_timestamp(req.end))
+        return BarBatch(req.symbol, req.exchange, req.interval, datetimes, columns, gateway_name)
+
+
+class CachedDatafeed(BaseDatafeed):
+    """
+    在数据服务前增加一层本地K线缓存, 仅向数据服务请求缓存中缺失的区间;
+    缺失的长区间按月分段并发下载, 每段完成即写入缓存, 下载中断后再次请求时只下载剩余的段
+    """
+
+    def __init__(self, datafeed: BaseDatafeed, cache_dir: str, workers: int = 4, retries: int = 2):
+        self.datafeed = datafeed
+        self.cache = BarCache(cache_dir)
+        self.downloader = ChunkedDownloader(datafeed, workers, retries)
+
+    def init(self, output: Callable = print) -> bool:
+        return self.datafeed.init(output)
+
+    @staticmethod
+    def cacheable(req: HistoryRequest) -> bool:
+        # 主力连续等不含数字的合约为复权价格, 换月后历史价格会变化, 不做缓存
+        return req.interval in INTERVAL_DELTA and any(c.isdigit() for c in req.symbol)
+
+    def query_bar_history(self, req: HistoryRequest, output: Callable = print) -> list[BarData]:
+        return self.query_bar_batch(req, output).to_bars()
+
+    def query_bar_batch(self, req: HistoryRequest, output: Callable = print) -> BarBatch:
+        """与 query_bar_history 相同, 但返回列式数据, 不构造 BarData 对象"""
+        if not self.cacheable(req):
+            return BarBatch.concat(self.downloader.download(req, output))
+
+        for start, end in self.cache.missing(req):
+            sub_req = HistoryRequest(symbol=req.symbol, exchange=req.exchange, start=start, end=end,
+                                     interval=req.interval)
+            self.downloader.download(sub_req, output, self._update_cache)
+        return self.cache.load(req)
+
+    def _update_cache(self, req: HistoryRequest, batch: BarBatch | None) -> None:
+        # 下载失败时不记录该区间, 下次请求会重新下载; 没有数据(休市、合约上市前)的区间同样记录, 不再重复下载
+        if batch is not None:
+            self.cache.update(req, batch)
+
+    def query_bar_batches(self, reqs: list[HistoryRequest], output: Callable = print) -> list[BarBatch]:
+        """批量查询, 各请求中缓存缺失的区间与不做缓存的请求合并为一次批量下载"""
+        sub_reqs: list[HistoryRequest] = []
+        # 不做缓存的请求: reqs 中的序号 -> sub_reqs 中的序号
+        direct: dict[int, int] = {}
+        for i, req in enumerate(reqs):
+            if not self.cacheable(req):
+                direct[i] = len(sub_reqs)
+                sub_reqs.append(req)
+                continue
+            for start, end in self.cache.missing(req):
+                # 与单个查询相同按月分段, 各合约同一月份的段区间相同, 数据服务可以合并查询
+                sub_reqs.extend(ChunkedDownloader.split(HistoryRequest(
+                    symbol=req.symbol, exchange=req.exchange, start=start, end=end, interval=req.interval)))
+
+        batches = _query_bar_batches(self.datafeed, sub_reqs, output)
+        for sub_req, batch in zip(sub_reqs, batches):
+            if self.cacheable(sub_req):
+                # 与 ChunkedDownloader._fetch 相同, 截掉数据服务返回的区间之外的K线, 只缓存已记录覆盖的区间
+                self._update_cache(sub_req, None if batch is None else batch.slice(sub_req.start, sub_req.end))
+        results = []
+        for i, req in enumerate(reqs):
+            if i not in direct:
+                results.append(self.cache.load(req))
+            else:
+                batch = batches[direct[i]]
+                results.append(_columns_to_batch(req, None) if batch is None else batch)
+        return results
+
+    def query_tick_history(self, req: HistoryRequest, output: Callable = print) -> list[TickData]:
+        return self.datafeed.query_tick_history(req, output)
@@ -0,0 +1,127 @@
+__all__ = ["BarService", "check_window", "history_interval"]
+
+import copy
+import threading
+from collections.abc import Callable
+from datetime import datetime
+
+from vnpy.event import Event, EventEngine
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.event import EVENT_TICK
+from vnpy.trader.object import BarData, TickData
+from vnpy.trader.utility import BarGenerator
+
+from .trading_hours import daily_end_of
+
+# 合成K线的中间状态, 新建合成器时从策略加载历史数据后的合成器复制
+_GENERATOR_STATE = ("window_bar", "hour_bar", "daily_bar", "interval_count")
+
+
+def check_window(window: int, interval: Interval) -> None:
+    """BarGenerator 支持的K线周期: 分钟数须整除 60, 小时数任意, 日K线只支持 1 日, 不支持周K线"""
+    if interval == Interval.MINUTE and 60 % window:
+        raise ValueError(f"分钟K线的周期必须整除60: {window}m")
+    if interval == Interval.DAILY and window != 1:
+        raise ValueError(f"日K线只支持1日周期: {window}d")
+    if interval not in (Interval.MINUTE, Interval.HOUR, Interval.DAILY):
+        raise ValueError(f"不支持由tick合成该周期的K线: {window}{interval.value}")
+
+
+def history_interval(window: int, interval: Interval) -> Interval:
+    """加载历史数据使用的K线周期: 多个周期合成的K线由1分钟K线合成, 与实盘合成方式一致"""
+    return interval if window == 1 else Interval.MINUTE
+
+
+class _SymbolBars:
+    """单个合约的K线合成: tick -> 1分钟K线只合成一次, 再按各 (window, interval) 合成一次"""
+
+    def __init__(self, vt_symbol: str):
+        self.minute = BarGenerator(on_bar=self._on_minute_bar)
+        # 日K线在日盘最后一根1分钟K线完成时推送, 按品种的交易时段确定
+        symbol, exchange = vt_symbol.rsplit(".", 1)
+        self.daily_end = daily_end_of(symbol, Exchange(exchange))
+        self.last_minute: datetime | None = None
+        # (window, interval) -> (合成器, 订阅回调), 1分钟K线没有合成器
+        self.windows: dict[tuple[int, Interval], tuple[BarGenerator | None, tuple[Callable, ...]]] = {}
+
+    def _on_minute_bar(self, bar: BarData) -> None:
+        self.last_minute = bar.datetime
+        for generator, callbacks in list(self.windows.values()):
+            if generator is None:
+                for callback in callbacks:
+                    callback(bar)
+            else:
+                generator.update_bar(bar)
+
+    def fan_out(self, key: tuple[int, Interval], bar: BarData) -> None:
+        _, callbacks = self.windows.get(key, (None, ()))
+        for callback in callbacks:
+            callback(bar)
+
+
+class BarService:
+    """
+    会话级的K线合成服务: 每个订阅的合约只合成一次1分钟K线, 每个策略需要的 (window, interval) 只合成一次,
+    完成的K线分发给所有订阅者; 每个 tick 的处理量与合约数量相关, 与策略数量无关
+    """
+
+    def __init__(self):
+        self._symbols: dict[str, _SymbolBars] = {}
+        self._lock = threading.Lock()
+
+    def register(self, event_engine: EventEngine) -> None:
+        event_engine.register(EVENT_TICK, self._on_tick)
+
+    def _on_tick(self, event: Event) -> None:
+        self.update_tick(event.data)
+
+    def update_tick(self, tick: TickData) -> None:
+        symbol_bars = self._symbols.get(tick.vt_symbol)
+        if symbol_bars is not None:
+            symbol_bars.minute.update_tick(tick)
+
+    def subscribe(self, vt_symbol: str, window: int, interval: Interval, callback: Callable[[BarData], None],
+                  seed: BarGenerator | None = None) -> None:
+        """
+        订阅 vt_symbol 的 window * interval K线; 该周期尚无合成器时新建,
+        并从 seed(策略用历史数据合成K线的 BarGenerator)复制未完成的K线, 第一根K线不缺少订阅前的部分
+        """
+        check_window(window, interval)
+        key = (window, interval)
+        with self._lock:
+            symbol_bars = self._symbols.get(vt_symbol)
+            if symbol_bars is None:
+                symbol_bars = self._symbols[vt_symbol] = _SymbolBars(vt_symbol)
+            generator, callbacks = symbol_bars.windows.get(key, (None, ()))
+            if key != (1, Interval.MINUTE) and generator is None:
+                generator = BarGenerator(on_bar=_ignore, window=window, interval=interval,
+                                         on_window_bar=lambda bar: symbol_bars.fan_out(key, bar),
+                                         daily_end=symbol_bars.daily_end)
+                if seed is not None:
+                    for name in _GENERATOR_STATE:
+                        setattr(generator, name, copy.copy(getattr(seed, name)))
+            # 替换而不是原地修改, 事件引擎线程分发时无需加锁
+            symbol_bars.windows[key] = (generator, callbacks + (callback,))
+
+    def unsubscribe(self, vt_symbol: str, callback: Callable[[BarData], None]) -> None:
+        with self._lock:
+            symbol_bars = self._symbols.get(vt_symbol)
+            if symbol_bars is None:
+                return
+            for key, (generator, callbacks) in list(symbol_bars.windows.items()):
+                callbacks = tuple(c for c in callbacks if c is not callback)
+                if callbacks:
+                    symbol_bars.windows[key] = (generator, callbacks)
+                else:
+                    del symbol_bars.windows[key]
+            if not symbol_bars.windows:
+                del self._symbols[vt_symbol]
+
+    def last_minute(self, vt_symbol: str) -> datetime | None:
+        """vt_symbol 最近一根已完成的1分钟K线的时间"""
+        symbol_bars = self._symbols.get(vt_symbol)
+        return symbol_bars.last_minute if symbol_bars is not None else None
+
+
+def _ignore(bar: BarData) -> None:
+    pass
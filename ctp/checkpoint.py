@@ -0,0 +1,111 @@
+"""
+策略热启动检查点: 每个策略一个 npz 文件, 保存 ArrayManager 的数组、BarGenerator 中未完成的K线、
+策略变量及其他需要历史数据计算的状态, 以及最后一根K线的时间; 重启后据此恢复, 只需补齐之后的K线
+
+CheckpointWriter 在调用线程中复制数组并序列化状态, 压缩与写盘在后台线程完成, 不阻塞事件引擎
+"""
+__all__ = ["CHECKPOINT_VERSION", "AM_ARRAYS", "Checkpoint", "CheckpointWriter", "checkpoint_path",
+           "write_checkpoint", "read_checkpoint"]
+
+import datetime
+import json
+import logging
+import os
+import pickle
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from vnpy.trader.utility import ArrayManager
+
+# 文件格式变化时递增, 旧版本的检查点不再恢复
+CHECKPOINT_VERSION = 3
+
+AM_ARRAYS = ("open_array", "high_array", "low_array", "close_array", "volume_array", "turnover_array",
+             "open_interest_array")
+
+
+class Checkpoint:
+    """检查点内容: meta 为 JSON 可读的基本信息, state 为 pickle 保存的策略状态"""
+
+    def __init__(self, meta: dict, arrays: np.ndarray, state: dict):
+        self.meta = meta
+        self.arrays = arrays
+        self.state = state
+
+    @property
+    def last_bar(self) -> datetime.datetime | None:
+        last_bar = self.meta.get("last_bar")
+        return datetime.datetime.fromisoformat(last_bar) if last_bar else None
+
+    def matches(self, class_name: str, vt_symbol: str, interval: str, size: int) -> bool:
+        meta = self.meta
+        return (meta.get("version") == CHECKPOINT_VERSION and meta.get("class_name") == class_name
+                and meta.get("vt_symbol") == vt_symbol and meta.get("interval") == interval
+                and meta.get("size") == size)
+
+    def restore_am(self, am: ArrayManager) -> None:
+        for name, values in zip(AM_ARRAYS, self.arrays):
+            getattr(am, name)[:] = values
+        am.count = self.meta["count"]
+        am.inited = am.count >= am.size
+
+
+def checkpoint_path(directory: str, strategy_name: str) -> str:
+    return os.path.join(directory, f"{strategy_name}.npz")
+
+
+def _snapshot(meta: dict, am: ArrayManager, state: dict) -> tuple[dict, np.ndarray, bytes]:
+    """复制数组并序列化状态, 之后策略继续更新也不影响写入的内容"""
+    meta = {"version": CHECKPOINT_VERSION, "size": am.size, "count": am.count, **meta}
+    arrays = np.stack([getattr(am, name) for name in AM_ARRAYS])
+    return meta, arrays, pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+
+
+def _write_files(filepath: str, meta: dict, arrays: np.ndarray, state: bytes) -> None:
+    """写入临时文件后替换, 写入中途退出不会损坏已有的检查点"""
+    tmp_filepath = f"{filepath}.tmp"
+    with open(tmp_filepath, "wb") as f:
+        np.savez(f, arrays=arrays,
+                 meta=np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8),
+                 state=np.frombuffer(state, dtype=np.uint8))
+    os.replace(tmp_filepath, filepath)
+
+
+def write_checkpoint(filepath: str, meta: dict, am: ArrayManager, state: dict) -> None:
+    """在当前线程写入检查点"""
+    _write_files(filepath, *_snapshot(meta, am, state))
+
+
+class CheckpointWriter:
+    """后台写入检查点: 同一时刻只有一个写入线程, 同一文件按提交顺序写入"""
+
+    def __init__(self, logger: logging.Logger | None = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+
+    def submit(self, filepath: str, meta: dict, am: ArrayManager, state: dict) -> None:
+        """在调用线程中取快照(须与修改策略状态的回调在同一线程), 由后台线程写入文件"""
+        future = self._executor.submit(_write_files, filepath, *_snapshot(meta, am, state))
+        future.add_done_callback(lambda f: self._on_done(filepath, f))
+
+    def _on_done(self, filepath: str, future: Future) -> None:
+        error = future.exception()
+        if error is not None:
+            self.logger.error(f"写入检查点 {filepath} 出错: {error}")
+
+    def close(self) -> None:
+        """等待已提交的检查点写完"""
+        self._executor.shutdown(wait=True)
+
+
+def read_checkpoint(filepath: str) -> Checkpoint | None:
+    """文件不存在或无法解析(如策略代码中的类已删除)时返回 None"""
+    try:
+        with np.load(filepath) as npz:
+            meta = json.loads(npz["meta"].tobytes().decode("utf-8"))
+            arrays = npz["arrays"]
+            state = pickle.loads(npz["state"].tobytes())
+    except Exception:
+        return None
+    return Checkpoint(meta, arrays, state)
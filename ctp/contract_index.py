@@ -0,0 +1,94 @@
+__all__ = ["ContractIndex"]
+
+import bisect
+import threading
+import time
+
+from vnpy.event import Event, EventEngine
+from vnpy.trader.constant import Exchange, Product
+from vnpy.trader.event import EVENT_CONTRACT
+from vnpy.trader.object import ContractData
+
+
+class ContractIndex:
+    """
+    合约索引: 由 EVENT_CONTRACT 增量更新,
+    按 vt_symbol 查询为 O(1), 并支持按品种类型、交易所、代码前缀查询
+    """
+
+    def __init__(self):
+        self._contracts: dict[str, ContractData] = {}
+        self._by_product: dict[Product, dict[str, ContractData]] = {}
+        self._by_exchange: dict[Exchange, dict[str, ContractData]] = {}
+        # (小写代码, vt_symbol) 有序列表, 前缀查询时二分
+        self._sorted: list[tuple[str, str]] = []
+        self._sorted_dirty = False
+        self._pretty: dict[int, str] = {}
+        self._lock = threading.Lock()
+        # 最近一次加入或更新合约的时刻(time.monotonic())
+        self.updated: float = 0.0
+
+    def register(self, event_engine: EventEngine) -> None:
+        event_engine.register(EVENT_CONTRACT, self._on_contract)
+
+    def _on_contract(self, event: Event) -> None:
+        self.add(event.data)
+
+    def add(self, contract: ContractData) -> None:
+        vt_symbol = contract.vt_symbol
+        with self._lock:
+            old = self._contracts.get(vt_symbol)
+            if old is not None:
+                self._by_product.get(old.product, {}).pop(vt_symbol, None)
+            else:
+                self._sorted.append((contract.symbol.lower(), vt_symbol))
+                self._sorted_dirty = True
+            self._contracts[vt_symbol] = contract
+            self._by_product.setdefault(contract.product, {})[vt_symbol] = contract
+            self._by_exchange.setdefault(contract.exchange, {})[vt_symbol] = contract
+            self._pretty.clear()
+            self.updated = time.monotonic()
+
+    def __contains__(self, vt_symbol: str) -> bool:
+        return vt_symbol in self._contracts
+
+    def __len__(self) -> int:
+        return len(self._contracts)
+
+    def get(self, vt_symbol: str) -> ContractData | None:
+        return self._contracts.get(vt_symbol)
+
+    def all(self) -> list[ContractData]:
+        return list(self._contracts.values())
+
+    def by_product(self, product: Product) -> list[ContractData]:
+        return list(self._by_product.get(product, {}).values())
+
+    def by_exchange(self, exchange: Exchange) -> list[ContractData]:
+        return list(self._by_exchange.get(exchange, {}).values())
+
+    def search(self, prefix: str, limit: int = 0) -> list[ContractData]:
+        """按合约代码前缀查询(不区分大小写), 结果按代码排序, limit > 0 时最多返回 limit 个"""
+        prefix = prefix.lower()
+        with self._lock:
+            if self._sorted_dirty:
+                self._sorted.sort()
+                self._sorted_dirty = False
+            result = []
+            i = bisect.bisect_left(self._sorted, (prefix, ""))
+            while i < len(self._sorted) and self._sorted[i][0].startswith(prefix):
+                result.append(self._contracts[self._sorted[i][1]])
+                if len(result) == limit:
+                    break
+                i += 1
+            return result
+
+    def pretty_str(self, step: int = 5) -> str:
+        """每行 step 个合约的列表, 合约有变化前重复调用直接返回缓存"""
+        with self._lock:
+            if step not in self._pretty:
+                contracts = list(self._contracts.values())
+                lines = ("| ".join(f"{c.vt_symbol:20} {c.product.value:4}" for c in contracts[i:i + step])
+                         for i in range(0, len(contracts), step))
+                self._pretty[step] = "\n".join(lines)
+            return self._pretty[step]
@@ -4,28 +4,46 @@ __all__ = [
 
 import configparser
 import datetime
+import importlib
 import json
 import logging
 import os
 import sys
+import threading
 import time
+from logging.handlers import QueueListener
+from typing import TYPE_CHECKING
 
 from vnpy.event import EventEngine, Event
 from vnpy.trader.event import *
 from vnpy.trader.datafeed import get_datafeed, BaseDatafeed
-from vnpy.trader.engine import MainEngine, OmsEngine
-from vnpy.trader.object import CancelRequest, HistoryRequest, LogData, OrderRequest, PositionData, SubscribeRequest
+from vnpy.trader.object import CancelRequest, HistoryRequest, LogData, OrderRequest, PositionData, SubscribeRequest, TickData
 from vnpy.trader.constant import Exchange, Interval
-from vnpy_ctastrategy import CtaEngine, CtaStrategyApp, CtaTemplate
-from vnpy_ctastrategy.base import EVENT_CTA_STRATEGY
-from vnpy_ctp import CtpGateway
 
-from strategy.util.serializer import StrategyJsonSerializer
-
-from .input import input_int
-from .output import to_string
+from .contract_index import ContractIndex
+from .input import input_int, split_win_interval
+from .log_queue import RateLimiter, start_queue_logging, stop_queue_logging
+from .output import LazyString
 from .settings import SETTINGS
-from .time_manager import sleep_till
+from .strategy_manifest import StrategyManifest
+from .time_manager import Readiness
+
+if TYPE_CHECKING:
+    # 引擎、网关及各可选功能(依赖 numpy/talib 等)在 read_config()/connect() 中按需导入, 不计入启动耗时
+    from vnpy.trader.engine import MainEngine, OmsEngine
+    from vnpy_ctastrategy import CtaEngine, CtaTemplate
+    from vnpy_ctp import CtpGateway
+    from .bar_service import BarService
+    from .checkpoint import CheckpointWriter
+    from .latency import LatencyTracer
+    from .multiproc import StrategyPool
+    from .order_dispatcher import OrderDispatcher
+    from .tick_journal import TickJournal
+
+# CTP 网关收到最后一条合约查询回报后写入的日志, 在其推送的全部合约事件之后
+CONTRACTS_INITED_LOG = "合约信息查询成功"
+# 未收到上述日志(如网关版本改变了日志内容)时, 合约索引不为空且该时间(秒)内没有新合约即视为合约已就绪
+CONTRACTS_SETTLE_SECONDS = 5.0
 
 SETTINGS["log.active"] = True
 SETTINGS["log.level"] = logging.DEBUG
@@ -34,27 +52,67 @@ SETTINGS["log.console"] = False
 
 class CtpSession:
     event_engine: EventEngine
-    main_engine: MainEngine
-    oms_engine: OmsEngine
-    cta_engine: CtaEngine
-    ctp_gateway: CtpGateway
+    main_engine: "MainEngine"
+    oms_engine: "OmsEngine"
+    cta_engine: "CtaEngine"
+    ctp_gateway: "CtpGateway"
     conn_settings: dict
+    readiness: Readiness
+    contract_index: ContractIndex
+    bar_service: "BarService"
     _logger: logging.Logger
+    _log_listener: QueueListener | None = None
+    tick_journal: "TickJournal | None" = None
+    strategy_pool: "StrategyPool | None" = None
+    order_dispatcher: "OrderDispatcher | None" = None
+    latency_tracer: "LatencyTracer | None" = None
+    strategy_manifest: StrategyManifest
+    _strategy_folders: list[tuple[str, str]]
+    _log_handlers: list[logging.Handler]
+    _tick_log_limiter: RateLimiter
+    # 每隔多少秒写入一次策略检查点, 0 表示只在关闭时写入
+    _checkpoint_interval: int = 0
+    _checkpoint_timer: int = 0
+    _checkpoint_writer: "CheckpointWriter | None" = None
+    _contracts_logged: bool = False
 
     def __init__(self):
-        pass
-
-    def _init_engines(self) -> None:
+        # 账户、合约、策略状态的回调中通知, 等待方无需轮询
+        self.readiness = Readiness()
+        self.contract_index = ContractIndex()
+
+    def _init_engines(self, bar_cache_dir: str = "", history_lru_size: int = 64, download_workers: int = 4,
+                      download_retries: int = 2) -> None:
+        from vnpy.trader.engine import MainEngine, OmsEngine
+        from vnpy_ctastrategy import CtaStrategyApp
+        from .bar_service import BarService
+        from .history_service import HistoryService
+
+        self.bar_service = BarService()
         self.event_engine = EventEngine()
         self.main_engine = MainEngine(self.event_engine)
         self.oms_engine = self.main_engine.add_engine(OmsEngine)
         self.cta_engine = self.main_engine.add_app(CtaStrategyApp)
+        if bar_cache_dir:
+            from .bar_cache import CachedDatafeed
+            bar_cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), bar_cache_dir)
+            self.cta_engine.datafeed = CachedDatafeed(self.cta_engine.datafeed, bar_cache_dir, download_workers,
+                                                      download_retries)
+            self.logger().info(f"K线缓存目录: {bar_cache_dir}")
+        # 多个策略同时初始化时共享同一份历史数据, 同一合约只下载一次
+        self.cta_engine.datafeed = HistoryService(self.cta_engine.datafeed, capacity=history_lru_size)
         self.cta_engine.init_datafeed()
-        self.cta_engine.load_strategy_class()
         self.cta_engine.register_event()
         self.cta_engine.sync_strategy_data = lambda x: None
+        # 策略初始化时从 cta_engine 获取, 同一合约、周期的K线只合成一次
+        self.cta_engine.bar_service = self.bar_service
 
     def _register_events(self) -> None:
+        from vnpy_ctastrategy.base import EVENT_CTA_STRATEGY
+        from .hot_reload import EVENT_STRATEGY_RELOAD
+
+        self.contract_index.register(self.event_engine)
+        self.bar_service.register(self.event_engine)
         self.event_engine.register(EVENT_TICK, self._on_tick)
         self.event_engine.register(EVENT_TRADE, self._on_trade)
         self.event_engine.register(EVENT_ORDER, self._on_order)
@@ -62,8 +120,11 @@ class CtpSession:
         self.event_engine.register(EVENT_POSITION, self._on_position)
         self.event_engine.register(EVENT_CTA_STRATEGY, self._on_strategy)
         self.event_engine.register(EVENT_LOG, self._on_log)
+        self.event_engine.register(EVENT_STRATEGY_RELOAD, self._on_strategy_reload)
+        self.event_engine.register(EVENT_TIMER, self._on_timer)
 
-    def _init_logger(self, log_dir: str, file_level: int, console_level: int, encoding: str) -> None:
+    def _init_logger(self, log_dir: str, file_level: int, console_level: int, encoding: str,
+                     async_write: bool = True, tick_interval: float = 0) -> None:
         log_filename = f"ctp-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.log.txt"
         log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), log_dir)
         if not os.path.exists(log_dir):
@@ -75,7 +136,8 @@ class CtpSession:
         log_filepath = os.path.join(log_dir, log_filename)
 
         self._logger = logging.getLogger(__name__)
-        self.logger().setLevel(logging.DEBUG)
+        # 低于所有 handler 等级的日志直接丢弃, 不创建 LogRecord
+        self.logger().setLevel(min(file_level, console_level))
 
         console_handler = logging.StreamHandler()
         console_handler.setLevel(console_level)
@@ -87,31 +149,46 @@ class CtpSession:
         console_handler.setFormatter(formatter)
         file_handler.setFormatter(formatter)
 
-        self.logger().addHandler(console_handler)
-        self.logger().addHandler(file_handler)
+        self._log_handlers = [console_handler, file_handler]
+        if async_write:
+            # 回调线程(包括策略)只负责入队, 格式化与写盘在后台线程完成
+            self._log_listener = start_queue_logging(self.logger(), self._log_handlers)
+        else:
+            self.logger().addHandler(console_handler)
+            self.logger().addHandler(file_handler)
+        # 同一合约的行情日志按时间间隔抽样
+        self._tick_log_limiter = RateLimiter(tick_interval)
 
         SETTINGS["logger"] = self.logger()
 
     def _on_tick(self, event: Event) -> None:
-        self.logger().debug(f"[回调]行情: {to_string(event.data)}")
+        tick: TickData = event.data
+        if self.logger().isEnabledFor(logging.DEBUG) and self._tick_log_limiter.allow(tick.vt_symbol):
+            self.logger().debug("[回调]行情: %s", LazyString(tick))
 
     def _on_trade(self, event: Event) -> None:
-        self.logger().info(f"[回调]成交: {to_string(event.data)}")
+        self.logger().info("[回调]成交: %s", LazyString(event.data))
 
     def _on_order(self, event: Event) -> None:
-        self.logger().info(f"[回调]订单: {to_string(event.data)}")
+        self.logger().info("[回调]订单: %s", LazyString(event.data))
 
     def _on_account(self, event: Event) -> None:
-        self.logger().debug(f"[回调]账户: {to_string(event.data)}")
+        self.logger().debug("[回调]账户: %s", LazyString(event.data))
+        self.readiness.notify()
 
     def _on_position(self, event: Event) -> None:
-        self.logger().debug(f"[回调]持仓: {to_string(event.data)}")
+        self.logger().debug("[回调]持仓: %s", LazyString(event.data))
 
     def _on_strategy(self, event: Event) -> None:
-        self.logger().debug(f"[回调]策略: {to_string(event.data)}")
+        self.logger().debug("[回调]策略: %s", LazyString(event.data))
+        self.readiness.notify()
 
     def _on_log(self, event) -> None:
         data: LogData = event.data
+        if not self._contracts_logged and CONTRACTS_INITED_LOG in data.msg:
+            # 该日志之前推送的合约事件均已加入合约索引
+            self._contracts_logged = True
+            self.readiness.notify()
         if data.level == logging.DEBUG:
             self.logger().debug(data.msg)
         elif data.level == logging.INFO:
@@ -134,26 +211,90 @@ class CtpSession:
         self._init_logger(log_dir=parser.get("log", "output_dir", fallback="../log"),
                           file_level=parser.getint("log", "file_level", fallback=logging.DEBUG),
                           console_level=parser.getint("log", "console_level", fallback=logging.INFO),
-                          encoding=parser.get("log", "encoding", fallback="utf-8"))
+                          encoding=parser.get("log", "encoding", fallback="utf-8"),
+                          async_write=parser.getboolean("log", "async", fallback=True),
+                          tick_interval=parser.getfloat("log", "tick_interval", fallback=0))
         self.logger().info(f"读取配置文件: {abs_filepath}")
         # datafeed is a singleton and will be initialized while constructing self.cta_engine,
         # so _init_datafeed() must be called before _init_engines()
+        bar_cache_dir = ""
+        history_lru_size = parser.getint("datafeed", "history_lru_size", fallback=64)
+        download_workers = parser.getint("datafeed", "download_workers", fallback=4)
+        download_retries = parser.getint("datafeed", "download_retries", fallback=2)
         if not parser.has_section("datafeed"):
             self.logger().warning("配置文件中未找到[datafeed]数据服务,无法提供历史行情")
         else:
+            bar_cache_dir = parser.get("datafeed", "cache_dir", fallback="")
+            if bar_cache_dir:
+                # 数据服务的合约列表也缓存在该目录, 避免每次启动都全量下载
+                universe_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), bar_cache_dir)
+                os.makedirs(universe_dir, exist_ok=True)
+                SETTINGS["datafeed.universe_cache"] = os.path.join(universe_dir, "rqdata_universe.json")
+            # 天勤数据服务保持的连接数量及空闲关闭时间
+            SETTINGS["datafeed.pool_size"] = parser.getint("datafeed", "pool_size", fallback=2)
+            SETTINGS["datafeed.idle_timeout"] = parser.getfloat("datafeed", "idle_timeout", fallback=300)
+            SETTINGS["datafeed.download_workers"] = download_workers
+            # 数据服务查询夜盘数据时由本地交易日历计算下一个交易日, 无需额外请求
+            from .trading_calendar import get_calendar
+            SETTINGS["datafeed.trading_calendar"] = get_calendar()
             if not self._init_datafeed(platform=parser.get("datafeed", "platform", fallback=""),
                                        username=parser.get("datafeed", "username", fallback=""),
                                        password=parser.get("datafeed", "password", fallback="")):
                 self.logger().error(f"datafeed 初始化失败!")
-        self._init_engines()
+        self._init_engines(bar_cache_dir, history_lru_size, download_workers, download_retries)
         self._register_events()
-        # load our own strategy
-        strategy_dir = os.path.join(__file__, "../../strategy/")
-        for strategy_filepath in os.listdir(strategy_dir):
-            if strategy_filepath.endswith(".py"):
-                self.cta_engine.load_strategy_class_from_module(f"strategy.{strategy_filepath.rstrip('.py')}")
+        tick_dir = parser.get("journal", "tick_dir", fallback="")
+        if tick_dir:
+            from .tick_journal import TickJournal
+            tick_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), tick_dir)
+            self.tick_journal = TickJournal(tick_dir)
+            self.tick_journal.register(self.event_engine)
+            self.logger().info(f"tick 行情记录目录: {tick_dir}")
+        # 延迟统计须在委托流控之前(统计网关实际发出委托的时刻)、CTA 引擎及K线服务的 tick 处理函数之后安装
+        if parser.getboolean("latency", "enabled", fallback=False):
+            from .latency import LatencyTracer
+            self.latency_tracer = LatencyTracer(self.cta_engine)
+            self.latency_tracer.install(self.main_engine)
+            self.cta_engine.latency_tracer = self.latency_tracer
+        # 委托流控: 按 CTP 前置的报单频率限制排队发出委托与撤单, 0 表示不限制
+        dispatch_rate = parser.getfloat("dispatch", "rate", fallback=0)
+        if dispatch_rate > 0:
+            from .order_dispatcher import OrderDispatcher
+            self.order_dispatcher = OrderDispatcher(
+                self.main_engine, self.cta_engine, dispatch_rate,
+                burst=parser.getint("dispatch", "burst", fallback=max(1, int(dispatch_rate))),
+                high_watermark=parser.getint("dispatch", "high_watermark", fallback=20), logger=self.logger())
+            self.cta_engine.order_dispatcher = self.order_dispatcher
+            self.order_dispatcher.start()
+            self.logger().info(f"委托流控: 每秒 {dispatch_rate:g} 笔")
+        # 策略类只登记名称与所在模块, 添加策略时才导入
+        import vnpy_ctastrategy
+        from vnpy.trader.utility import get_file_path
+        strategy_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../strategy/")
+        vnpy_strategy_dir = os.path.join(os.path.dirname(vnpy_ctastrategy.__file__), "strategies")
+        self._strategy_folders = [(vnpy_strategy_dir, "vnpy_ctastrategy.strategies"), (strategy_dir, "strategy")]
+        self.strategy_manifest = StrategyManifest(str(get_file_path("strategy_manifest.json")))
+        self.strategy_manifest.scan(self._strategy_folders)
+        checkpoint_dir = parser.get("checkpoint", "dir", fallback="")
+        if checkpoint_dir:
+            from .checkpoint import CheckpointWriter
+            checkpoint_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), checkpoint_dir)
+            os.makedirs(checkpoint_dir, exist_ok=True)
+            SETTINGS["checkpoint.dir"] = checkpoint_dir
+            # 定时写入在事件引擎线程中只取快照, 写盘在后台线程完成
+            self._checkpoint_writer = CheckpointWriter(self.logger())
+            SETTINGS["checkpoint.writer"] = self._checkpoint_writer
+            self._checkpoint_interval = parser.getint("checkpoint", "interval", fallback=0)
+            self.logger().info(f"策略检查点目录: {checkpoint_dir}")
+        # 策略按合约分配到多个子进程中运行, 0 表示全部在主进程中运行
+        workers = parser.getint("multiprocess", "workers", fallback=0)
+        if workers > 0:
+            from .multiproc import StrategyPool
+            self.strategy_pool = StrategyPool(self.main_engine, self.cta_engine, workers, self._log_handlers,
+                                              self.logger().level, checkpoint_dir=checkpoint_dir)
 
     def save_strategy(self, json_filepath) -> None:
+        from strategy.util.serializer import StrategyJsonSerializer
         abs_filepath = os.path.join(os.path.dirname(os.path.abspath(__file__)), json_filepath)
         if os.path.exists(abs_filepath):
             confirm = input(f"策略记录文件 {abs_filepath} 已存在,是否覆盖? (y/n)").strip().lower()
@@ -167,21 +308,23 @@ class CtpSession:
         self.logger().info(f"策略已保存至 {abs_filepath}")
 
     def load_strategy(self, json_filepath) -> None:
+        from strategy.util.serializer import StrategyJsonSerializer
         if not os.path.isfile(json_filepath):
             self._logger.error(f"策略记录文件 {json_filepath} 不存在!")
             return
         with open(json_filepath, "r", encoding="utf-8") as f:
             datas:list[dict] = json.load(f)
-            for data in datas:
-                dct = StrategyJsonSerializer.from_dict(data)
-                self.cta_engine.add_strategy(**dct)
-                strategy_name = dct["strategy_name"]
-                if not self.get_strategy(strategy_name).inited:
-                    self.cta_engine.init_strategy(strategy_name)
-                    while not self.get_strategy(strategy_name).inited:
-                        time.sleep(0.5)
-                if not self.get_strategy(strategy_name).trading:
-                    self.cta_engine.start_strategy(strategy_name)
+            dcts = [StrategyJsonSerializer.from_dict(data) for data in datas]
+            for dct in dcts:
+                self._add_strategy(**dct)
+            strategy_names = [dct["strategy_name"] for dct in dcts
+                              if not self.get_strategy(dct["strategy_name"]).inited]
+            # 有检查点的策略初始化时只加载检查点之后的K线, 无需预先下载
+            self._prefetch_history([name for name in strategy_names if not self._has_checkpoint(name)])
+            for strategy_name in strategy_names:
+                self._init_strategy(strategy_name)
+            for strategy_name in (dct["strategy_name"] for dct in dcts):
+                self._start_when_inited(strategy_name)
         self.logger().info(f"策略记录文件 {json_filepath} 加载完成!")
 
     def _init_datafeed(self, platform, username, password) -> bool:
@@ -213,30 +356,48 @@ class CtpSession:
         return self._logger
 
     def connect(self):
+        from vnpy_ctp import CtpGateway
         self.ctp_gateway = self.main_engine.add_gateway(CtpGateway)
+        if self.latency_tracer is not None:
+            self.latency_tracer.tag_gateway(self.ctp_gateway)
+        if self.order_dispatcher is not None:
+            self.order_dispatcher.attach_gateway(self.ctp_gateway)
         self.logger().info(f"正在连接至CTP, 交易服务器 {self.conn_settings['交易服务器']}, 行情服务器 {self.conn_settings['行情服务器']}")
         self.main_engine.connect(self.conn_settings, "CTP")
 
+    @property
+    def contracts_inited(self) -> bool:
+        """
+        网关已推送全部合约信息且事件线程已将其加入合约索引: 以网关的合约查询完成日志为准,
+        未收到该日志时, 合约索引不为空且一段时间内没有新合约也视为就绪(由定时器唤醒等待方重新检查)
+        """
+        if self._contracts_logged:
+            return True
+        return len(self.contract_index) > 0 and (
+                time.monotonic() - self.contract_index.updated >= CONTRACTS_SETTLE_SECONDS)
+
     def inited(self):
-        return self.oms_engine.get_all_accounts() != []
+        return self.oms_engine.get_all_accounts() != [] and self.contracts_inited
+
+    def wait_inited(self, timeout: float = 60) -> bool:
+        """等待账户与合约信息就绪"""
+        return self.readiness.wait_till(self.inited, timeout)
 
     def get_all_contracts(self):
-        return self.oms_engine.get_all_contracts()
+        return self.contract_index.all()
 
     def get_all_contracts_pretty_str(self, step=5):
-        contracts = self.get_all_contracts()
-        pretty_str = ""
-        for i in range(0, len(contracts), step):
-            pretty_str += "| ".join(
-                f"{f'{c.symbol}.{c.exchange.value}':20} {c.product.value:4}" for c in contracts[i:i + step])
-            pretty_str += "\n"
-        return pretty_str.strip()
+        return self.contract_index.pretty_str(step)
+
+    def search_contracts(self, prefix: str, limit: int = 50):
+        return self.contract_index.search(prefix, limit)
 
     def send_order(self, req: OrderRequest):
         self.logger().info(f"[执行]下单:{vars(req)}")
-        if not self.is_existed_vt_symbol(req.vt_symbol):
+        contract = self.contract_index.get(req.vt_symbol)
+        if contract is None:
             self.logger().warning(f"合约{req.vt_symbol}不在交易列表中!")
-        return self.main_engine.send_order(req, "CTP")
+        return self.main_engine.send_order(req, contract.gateway_name if contract else "CTP")
 
     def cancel_order(self, req: CancelRequest):
         self.logger().info(f"[执行]撤单:{vars(req)}")
@@ -244,33 +405,87 @@ class CtpSession:
 
     def get_all_exchanges(self):
         result = self.main_engine.get_all_exchanges()
-        self.logger().debug(f"[执行]查询交易所: {to_string(result)}")
+        self.logger().debug("[执行]查询交易所: %s", LazyString(result))
         return result
 
     def get_all_accounts(self):
         result = self.oms_engine.get_all_accounts()
-        self.logger().debug(f"[执行]查询账户: {to_string(result)}")
+        self.logger().debug("[执行]查询账户: %s", LazyString(result))
         return result
 
     def get_all_positions(self):
         result = self.oms_engine.get_all_positions()
-        self.logger().debug(f"[执行]查询持仓: {to_string(result)}")
+        self.logger().debug("[执行]查询持仓: %s", LazyString(result))
         return result
 
     def get_tick(self, vt_symbol: str):
         result = self.oms_engine.get_tick(vt_symbol)
-        self.logger().debug(f"[执行]查询合约: {vt_symbol}: {to_string(result)}")
+        self.logger().debug("[执行]查询合约: %s: %s", vt_symbol, LazyString(result))
         return result
 
     def close(self):
+        if self.strategy_pool is not None:
+            # 子进程按顺序处理消息, 退出前写完检查点
+            self.save_checkpoints()
+            self.strategy_pool.close()
+        if self.order_dispatcher is not None:
+            self.order_dispatcher.close()
         if self.main_engine is not None:
             self.logger().info("关闭连接！")
             self.main_engine.close()
+        if self.strategy_pool is None:
+            # 事件引擎已停止, 不会与行情回调同时修改策略状态
+            self.save_checkpoints()
+        if self._checkpoint_writer is not None:
+            # 等待后台线程写完检查点
+            self._checkpoint_writer.close()
+        if self.tick_journal is not None:
+            self.tick_journal.close()
         self.save_strategy("../config/strategies.json")
+        if self._log_listener is not None:
+            # 写完队列中剩余的日志
+            stop_queue_logging(self._log_listener)
+
+    def save_checkpoints(self) -> None:
+        """将各策略的K线数组、变量等状态写入检查点, 重启后初始化时只需补齐之后的K线"""
+        if not SETTINGS.get("checkpoint.dir"):
+            return
+        if self.strategy_pool is not None:
+            self.strategy_pool.save_checkpoints()
+            return
+        saved = 0
+        for strategy in self.get_all_strategies():
+            save_checkpoint = getattr(strategy, "save_checkpoint", None)
+            if save_checkpoint is None:
+                continue
+            try:
+                saved += save_checkpoint()
+            except Exception as e:
+                self.logger().exception(f"策略 {strategy.strategy_name} 写入检查点出错: {e}")
+        self.logger().debug(f"已提交 {saved} 个策略检查点")
+
+    def _has_checkpoint(self, strategy_name: str) -> bool:
+        checkpoint_dir = SETTINGS.get("checkpoint.dir")
+        if not checkpoint_dir:
+            return False
+        from .checkpoint import checkpoint_path
+        return os.path.isfile(checkpoint_path(checkpoint_dir, strategy_name))
+
+    def _on_timer(self, event: Event) -> None:
+        if not self._contracts_logged and len(self.contract_index):
+            # 未收到合约查询完成日志时, 每秒重新检查合约是否已不再更新
+            self.readiness.notify()
+        # 在事件引擎线程中取快照, 与 on_tick/on_bar 等回调串行执行, 写盘由后台线程完成
+        if self._checkpoint_interval <= 0:
+            return
+        self._checkpoint_timer += 1
+        if self._checkpoint_timer >= self._checkpoint_interval:
+            self._checkpoint_timer = 0
+            self.save_checkpoints()
 
     def get_history_orders(self):
         result = self.oms_engine.get_all_orders()
-        self.logger().debug(f"[执行]查询历史订单: {to_string(result)}")
+        self.logger().debug("[执行]查询历史订单: %s", LazyString(result))
         return result
 
     def subscribe(self, symbol: str, exchange: Exchange):
@@ -278,7 +493,7 @@ class CtpSession:
         return self.main_engine.subscribe(SubscribeRequest(symbol=symbol, exchange=exchange), "CTP")
 
     def is_existed_vt_symbol(self, vt_symbol: str) -> bool:
-        return vt_symbol in {c.vt_symbol for c in self.get_all_contracts()}
+        return vt_symbol in self.contract_index
 
     def input_strategy_class_name(self) -> str:
         vnpy_strategy_class_names = {
@@ -292,7 +507,7 @@ class CtpSession:
             "TestStrategy",
             "TurtleSignalStrategy",
         }
-        our_strategy_class_names = list(set(self.cta_engine.get_all_strategy_class_names()) - vnpy_strategy_class_names)
+        our_strategy_class_names = list(set(self.get_all_strategy_class_names()) - vnpy_strategy_class_names)
         our_strategy_class_names.sort()
         strategy_dict = {i: name for i, name in enumerate(our_strategy_class_names)}
         for i, strategy_class_name in strategy_dict.items():
@@ -301,9 +516,9 @@ class CtpSession:
         return strategy_dict[idx]
 
     def add_strategy(self, strategy_class_name: str, vt_symbols: str | list, interval: str) -> None:
-        if strategy_class_name not in self.cta_engine.get_all_strategy_class_names():
+        if not self._ensure_strategy_class(strategy_class_name):
             self.logger().critical(
-                f"目标策略 {strategy_class_name} 不在策略列表中:{self.cta_engine.get_all_strategy_class_names()}")
+                f"目标策略 {strategy_class_name} 不在策略列表中:{self.get_all_strategy_class_names()}")
             return
         if not isinstance(vt_symbols, list):
             assert isinstance(vt_symbols, str)
@@ -318,21 +533,132 @@ class CtpSession:
                 self.logger().warning(f"已存在同名策略 {strategy_name}, 无法重复添加")
                 continue
             self.logger().debug(f"[执行]添加策略 {strategy_name}")
-            self.cta_engine.add_strategy(strategy_class_name, strategy_name, vt_symbol, {"interval": interval})
-            self.cta_engine.init_strategy(strategy_name)
+            self._add_strategy(strategy_class_name, strategy_name, vt_symbol, {"interval": interval})
             strategy_names.append(strategy_name)
+        self._prefetch_history(strategy_names)
         for strategy_name in strategy_names:
-            if sleep_till(lambda : self.get_strategy(strategy_name).inited, timeout=30):
-                self.cta_engine.start_strategy(strategy_name)
-            else:
-                self.logger().error(f"等待策略 {strategy_name} 初始化超时")
+            self._init_strategy(strategy_name)
+        for strategy_name in strategy_names:
+            self._start_when_inited(strategy_name)
 
-    def get_all_strategies(self) -> list[CtaTemplate]:
+    def get_all_strategy_class_names(self) -> list[str]:
+        names = dict.fromkeys(self.strategy_manifest.class_names())
+        names.update(dict.fromkeys(self.cta_engine.get_all_strategy_class_names()))
+        return list(names)
+
+    def _ensure_strategy_class(self, class_name: str) -> bool:
+        """按清单导入策略类并登记到 CTA 引擎, 找不到时返回 False"""
+        if class_name in self.cta_engine.classes:
+            return True
+        module_name = self.strategy_manifest.module_of(class_name)
+        if module_name is None:
+            return False
+        try:
+            self.cta_engine.classes[class_name] = getattr(importlib.import_module(module_name), class_name)
+        except Exception as e:
+            self.logger().error(f"策略类 {class_name} 导入失败({module_name}): {e}")
+            return False
+        return True
+
+    def _add_strategy(self, class_name: str, strategy_name: str, vt_symbol: str, setting: dict) -> None:
+        self._ensure_strategy_class(class_name)
+        if self.strategy_pool is not None:
+            self.strategy_pool.add_strategy(class_name, strategy_name, vt_symbol, setting)
+        else:
+            self.cta_engine.add_strategy(class_name, strategy_name, vt_symbol, setting)
+
+    def _init_strategy(self, strategy_name: str) -> None:
+        if self.strategy_pool is not None:
+            self.strategy_pool.init_strategy(strategy_name)
+        else:
+            self.cta_engine.init_strategy(strategy_name)
+
+    def _prefetch_history(self, strategy_names: list[str]) -> None:
+        """批量下载各策略初始化所需的历史K线, 避免逐个策略请求数据服务"""
+        from vnpy.trader.database import DB_TZ
+        from .bar_service import history_interval
+        from .history_service import HistoryService
+
+        now = datetime.datetime.now(DB_TZ)
+        reqs = []
+        for strategy_name in strategy_names:
+            strategy = self.cta_engine.strategies[strategy_name]
+            # 子进程中的策略在主进程只有 StrategyProxy, 加载天数由子进程按 num_init_bars() 计算,
+            # 主进程无法得到相同的区间, 不预先下载; 其 load_bar 请求仍经 HistoryService 复用已下载的数据
+            if not hasattr(strategy, "init_history_days"):
+                continue
+            days = strategy.init_history_days()
+            interval = getattr(strategy, "interval", None)
+            if interval is None:
+                continue
+            symbol, exchange = strategy.vt_symbol.rsplit(".", 1)
+            reqs.append(HistoryRequest(symbol=symbol, exchange=Exchange(exchange),
+                                       interval=history_interval(*split_win_interval(interval)),
+                                       start=now - datetime.timedelta(days), end=now))
+        if len(reqs) > 1 and isinstance(self.cta_engine.datafeed, HistoryService):
+            self.logger().info(f"批量下载 {len(reqs)} 个策略的历史K线")
+            self.cta_engine.datafeed.prefetch(reqs, self.logger().debug)
+
+    def _start_when_inited(self, strategy_name: str, timeout: float = 30) -> None:
+        strategy = self.get_strategy(strategy_name)
+        if self.readiness.wait_till(lambda: strategy.inited, timeout):
+            if not strategy.trading:
+                self.cta_engine.start_strategy(strategy_name)
+        else:
+            self.logger().error(f"等待策略 {strategy_name} 初始化超时")
+
+    def reload_strategies(self) -> list[str]:
+        """
+        重新加载有修改的策略模块(及继承了其中策略类的模块), 已有的策略实例原地切换为新类,
+        保留K线缓存、持仓与变量, 不重新初始化; 未受影响的策略与CTP连接不受影响. 返回重新加载的模块
+        """
+        self.strategy_manifest.scan(self._strategy_folders)
+        modules = [m for m in self.strategy_manifest.affected_modules(self.strategy_manifest.changed)
+                   if m in sys.modules]
+        if not modules:
+            self.logger().info("没有需要重新加载的策略模块")
+            return []
+        self.logger().info(f"[执行]重新加载策略模块: {modules}")
+        from .hot_reload import reload_modules
+        try:
+            reloaded = reload_modules(modules)
+        except Exception as e:
+            # 下次扫描时仍视为有修改, 修正后可再次重新加载
+            self.strategy_manifest.invalidate(modules)
+            self.logger().exception(f"策略模块重新加载失败, 策略继续使用原有代码: {e}")
+            return []
+        for class_name in list(self.cta_engine.classes):
+            module = reloaded.get(self.strategy_manifest.module_of(class_name))
+            if module is not None and hasattr(module, class_name):
+                self.cta_engine.classes[class_name] = getattr(module, class_name)
+
+        if self.strategy_pool is not None:
+            self.strategy_pool.reload(modules)
+        else:
+            # 在事件引擎线程中替换, 不与正在执行的行情回调交错
+            done = threading.Event()
+            self.event_engine.put(Event(EVENT_STRATEGY_RELOAD, (reloaded, done)))
+            if not done.wait(10):
+                self.logger().error("等待策略类替换超时")
+        return modules
+
+    def _on_strategy_reload(self, event: Event) -> None:
+        from .hot_reload import swap_strategies
+        reloaded, done = event.data
+        try:
+            for strategy in swap_strategies(list(self.cta_engine.strategies.values()), reloaded):
+                self.logger().info(f"策略 {strategy.strategy_name} 已切换为新代码")
+        except Exception as e:
+            self.logger().exception(f"策略类替换出错: {e}")
+        finally:
+            done.set()
+
+    def get_all_strategies(self) -> list["CtaTemplate"]:
         strategies = list(self.cta_engine.strategies.values())
         strategies.sort(key=lambda s:s.strategy_name)
         return strategies
 
-    def get_strategy(self, strategy_name: str) -> CtaTemplate:
+    def get_strategy(self, strategy_name: str) -> "CtaTemplate":
         if strategy_name not in self.cta_engine.strategies:
             self.logger().critical(f"{strategy_name} not found in strategies")
             exit(0)
@@ -0,0 +1,149 @@
+__all__ = ["HistoryService"]
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from datetime import datetime
+
+from vnpy.trader.constant import Interval
+from vnpy.trader.datafeed import BaseDatafeed
+from vnpy.trader.object import BarData, HistoryRequest, TickData
+
+from .bar_batch import BarBatch, to_timestamp
+from .bar_cache import INTERVAL_DELTA, query_bar_batch, query_bar_batches
+
+
+class _Entry:
+    """已下载的连续区间 [start, end) 及其K线"""
+
+    def __init__(self, start: datetime, end: datetime, batch: BarBatch):
+        self.start = start
+        self.end = end
+        self.batch = batch
+
+
+class HistoryService(BaseDatafeed):
+    """
+    CTA引擎与数据服务之间的共享历史数据层:
+    同一 (vt_symbol, interval) 的请求串行执行, 后到的请求直接复用先到请求的结果;
+    下载结果按 (vt_symbol, interval) 保存在 LRU 中, 子区间直接从已有的超集中截取,
+    部分重叠时只下载缺失的首尾部分
+    """
+
+    def __init__(self, datafeed: BaseDatafeed, capacity: int = 64):
+        self.datafeed = datafeed
+        self.capacity = capacity
+        self._entries: OrderedDict[tuple[str, Interval], _Entry] = OrderedDict()
+        self._entries_lock = threading.Lock()
+        self._key_locks: dict[tuple[str, Interval], threading.Lock] = {}
+
+    def init(self, output: Callable = print) -> bool:
+        return self.datafeed.init(output)
+
+    def _key_lock(self, key: tuple[str, Interval]) -> threading.Lock:
+        with self._entries_lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _get_entry(self, key: tuple[str, Interval]) -> _Entry | None:
+        with self._entries_lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put_entry(self, key: tuple[str, Interval], entry: _Entry) -> None:
+        with self._entries_lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def _fetch(self, req: HistoryRequest, start: datetime, end: datetime, output: Callable) -> BarBatch:
+        sub_req = HistoryRequest(symbol=req.symbol, exchange=req.exchange, start=start, end=end, interval=req.interval)
+        # 部分数据服务会返回请求区间之外的K线, 截掉以保证各段不重叠
+        return query_bar_batch(self.datafeed, sub_req, output).slice(start, end)
+
+    def _same_bar(self, interval: Interval, t1: datetime, t2: datetime) -> bool:
+        """t1 与 t2 之间没有新的K线开始"""
+        delta = INTERVAL_DELTA.get(interval)
+        if delta is None:
+            return t1 == t2
+        step = int(delta.total_seconds()) * 1_000_000_000
+        return to_timestamp(t1) // step == to_timestamp(t2) // step
+
+    def query_bar_batch(self, req: HistoryRequest, output: Callable = print) -> BarBatch:
+        """与 query_bar_history 相同, 但返回列式数据"""
+        key = (req.vt_symbol, req.interval)
+        with self._key_lock(key):
+            entry = self._get_entry(key)
+            if entry is None or req.end <= entry.start or req.start >= entry.end:
+                batch = self._fetch(req, req.start, req.end, output)
+                # 下载失败或没有数据时不保存, 否则之后的请求会一直得到空结果
+                if len(batch):
+                    self._put_entry(key, _Entry(req.start, req.end, batch))
+                return batch.slice(req.start, req.end)
+            batches = []
+            start, end = entry.start, entry.end
+            batch = entry.batch
+            if req.start < entry.start:
+                head = self._fetch(req, req.start, entry.start, output)
+                # 只有下载到数据时才扩大已覆盖的区间
+                if len(head):
+                    batches.append(head)
+                    start = req.start
+            if req.end > entry.end and not self._same_bar(req.interval, entry.end, req.end):
+                # 区间末尾的K线下载时可能尚未走完, 从其开始时点起重新下载
+                delta = INTERVAL_DELTA.get(req.interval)
+                tail_start = entry.end - delta if delta else entry.end
+                tail = self._fetch(req, tail_start, req.end, output)
+                if len(tail):
+                    batches.append(batch.slice(None, tail_start))
+                    batches.append(tail)
+                    end = req.end
+                else:
+                    batches.append(batch)
+            else:
+                batches.append(batch)
+            if len(batches) > 1:
+                entry = _Entry(start, end, BarBatch.concat(batches))
+            self._put_entry(key, entry)
+        return entry.batch.slice(req.start, req.end)
+
+    def prefetch(self, reqs: list[HistoryRequest], output: Callable = print) -> None:
+        """
+        将尚未下载的请求合并为一次批量查询并保存结果,
+        之后各策略初始化时的 query_bar_history 直接从内存中截取
+        """
+        pending: dict[tuple[str, Interval], HistoryRequest] = {}
+        for req in reqs:
+            key = (req.vt_symbol, req.interval)
+            entry = self._get_entry(key)
+            if entry is not None and entry.start <= req.start and (
+                    req.end <= entry.end or self._same_bar(req.interval, entry.end, req.end)):
+                continue
+            # 同一合约与周期只下载一次, 区间取并集
+            other = pending.get(key)
+            if other is not None:
+                req = HistoryRequest(symbol=req.symbol, exchange=req.exchange, interval=req.interval,
+                                     start=min(req.start, other.start), end=max(req.end, other.end))
+            pending[key] = req
+
+        fetch_reqs = list(pending.values())
+        for req, batch in zip(fetch_reqs, query_bar_batches(self.datafeed, fetch_reqs, output)):
+            if not len(batch):
+                # 下载失败时不保存, 由各策略各自重新请求
+                continue
+            key = (req.vt_symbol, req.interval)
+            with self._key_lock(key):
+                self._put_entry(key, _Entry(req.start, req.end, batch.slice(req.start, req.end)))
+
+    def query_bar_batches(self, reqs: list[HistoryRequest], output: Callable = print) -> list[BarBatch]:
+        """批量查询, 结果与 reqs 一一对应"""
+        self.prefetch(reqs, output)
+        return [self.query_bar_batch(req, output) for req in reqs]
+
+    def query_bar_history(self, req: HistoryRequest, output: Callable = print) -> list[BarData]:
+        return self.query_bar_batch(req, output).to_bars()
+
+    def query_tick_history(self, req: HistoryRequest, output: Callable = print) -> list[TickData]:
+        return self.datafeed.query_tick_history(req, output)
@@ -0,0 +1,56 @@
+__all__ = ["EVENT_STRATEGY_RELOAD", "reload_modules", "swap_class", "swap_strategies"]
+
+import importlib
+import inspect
+import sys
+from collections.abc import Iterable
+from types import ModuleType
+
+from vnpy_ctastrategy import CtaTemplate
+
+# 在事件引擎线程中替换策略类, 与 on_tick/on_bar 等回调串行执行
+EVENT_STRATEGY_RELOAD = "eStrategyReload"
+
+
+def reload_modules(module_names: list[str]) -> dict[str, ModuleType]:
+    """按顺序重新加载已导入的模块(基类所在模块应排在前面), 未导入的模块跳过"""
+    reloaded = {}
+    for name in module_names:
+        module = sys.modules.get(name)
+        if module is not None:
+            reloaded[name] = importlib.reload(module)
+    return reloaded
+
+
+def swap_class(strategy: CtaTemplate, new_class: type) -> None:
+    """
+    将策略实例切换为新类: 实例属性(ArrayManager、BarGenerator、持仓、变量等)原样保留,
+    BarGenerator 等对象中保存的策略旧方法重新绑定为新类的方法, 最后调用新类的 on_reload(旧类)
+    """
+    old_class = strategy.__class__
+    strategy.__class__ = new_class
+    for obj in (strategy, *vars(strategy).values()):
+        attrs = getattr(obj, "__dict__", None)
+        if not attrs:
+            continue
+        for name, value in list(attrs.items()):
+            if inspect.ismethod(value) and value.__self__ is strategy:
+                setattr(obj, name, getattr(strategy, value.__func__.__name__))
+    on_reload = getattr(strategy, "on_reload", None)
+    if on_reload is not None:
+        on_reload(old_class)
+
+
+def swap_strategies(strategies: Iterable[CtaTemplate], reloaded: dict[str, ModuleType]) -> list[CtaTemplate]:
+    """替换类定义在 reloaded 模块中的策略实例, 返回被替换的策略"""
+    swapped = []
+    for strategy in strategies:
+        module = reloaded.get(strategy.__class__.__module__)
+        if module is None:
+            continue
+        new_class = getattr(module, strategy.__class__.__name__, None)
+        if new_class is None:
+            continue
+        swap_class(strategy, new_class)
+        swapped.append(strategy)
+    return swapped
@@ -0,0 +1,246 @@
+"""
+行情到下单的延迟统计: 在网关回调、事件分发、on_window_bar 进出、send_order 及委托/成交回报处记录
+time.monotonic_ns(), 各阶段的耗时按策略和合约累计到以 2 为底的对数直方图中, 每次记录只是几次整数运算
+"""
+__all__ = ["LatencyTracer", "Histogram", "STAGES", "EVENT_LATENCY_TICK", "EVENT_LATENCY_ORDER", "EVENT_LATENCY_TRADE"]
+
+import threading
+import time
+from collections.abc import Callable
+
+from vnpy.event import Event, EventEngine
+from vnpy.trader.constant import Status
+from vnpy.trader.engine import MainEngine
+from vnpy.trader.event import EVENT_TICK
+from vnpy.trader.gateway import BaseGateway
+from vnpy.trader.object import OrderRequest
+from vnpy_ctastrategy import CtaEngine
+
+# 阶段 -> 说明, 按处理顺序排列
+STAGES: dict[str, str] = {
+    "tick_event": "行情回调→事件分发",
+    "bar_entry": "行情回调→on_window_bar",
+    "bar_run": "on_window_bar 耗时",
+    "tick_to_order": "行情回调→send_order",
+    "send": "网关 send_order 耗时",
+    "order_event": "委托回报→事件分发",
+    "send_ack": "发出→委托回报",
+    "trade_event": "成交回报→事件分发",
+    "send_trade": "发出→首次成交",
+}
+
+_BUCKETS = 64
+
+# 网关推送 tick、委托和成交回报之前先推送的标记事件, 数据为 (网关回调时刻, 原数据)
+EVENT_LATENCY_TICK = "eLatencyTick"
+EVENT_LATENCY_ORDER = "eLatencyOrder"
+EVENT_LATENCY_TRADE = "eLatencyTrade"
+
+# 发出后超过该时间(纳秒)仍未结束的委托不再统计回报与成交延迟
+ORDER_TTL = 60 * 1_000_000_000
+
+
+class Histogram:
+    """纳秒耗时的对数直方图: 第 k 个桶统计 [2^(k-1), 2^k) 纳秒的样本"""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, ns: int) -> None:
+        if ns < 0:
+            ns = 0
+        self.buckets[min(ns.bit_length(), _BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def copy(self) -> "Histogram":
+        histogram = Histogram()
+        histogram.buckets = self.buckets.copy()
+        histogram.count, histogram.total, histogram.max = self.count, self.total, self.max
+        return histogram
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> int:
+        """第 q 分位数所在桶的上界(纳秒), 不超过最大值"""
+        if not self.count:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for k, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(1 << k, self.max)
+        return self.max
+
+
+class LatencyTracer:
+    """
+    按策略和合约统计各阶段延迟: install() 包装 main_engine.send_order 和 cta_engine.send_order,
+    须在委托流控(OrderDispatcher)之前安装; 网关添加后由 tag_gateway() 包装其回调
+
+    网关回调先推送标记事件再推送原事件, 事件引擎按先后顺序处理, 标记事件的处理函数在该 tick/委托/成交的
+    所有处理函数之前执行, 记录事件分发时刻; tick 分发结束由最后注册的 tick 处理函数记录,
+    须在其他 tick 处理函数注册之后安装. 行情到下单、行情到 on_window_bar 只统计 tick 分发期间的调用,
+    委托回报中或其他线程的下单不计入
+
+    事件引擎线程与委托流控线程都会记录耗时, 命令行线程读取统计结果, 直方图的读写都在 _lock 内
+    """
+
+    def __init__(self, cta_engine: CtaEngine):
+        self.cta_engine = cta_engine
+        self.strategies: dict[str, dict[str, Histogram]] = {}
+        self.symbols: dict[str, dict[str, Histogram]] = {}
+        self._lock = threading.Lock()
+        # 正在分发的 tick 的网关回调时刻, 分发结束时删除; 策略在行情回调中下单时据此计算行情到下单的延迟
+        self._tick_time: dict[str, int] = {}
+        # vt_orderid -> [发出时刻, 是否已收到回报], 按发出顺序排列
+        self._orders: dict[str, list] = {}
+        self._orders_lock = threading.Lock()
+
+    def install(self, main_engine: MainEngine) -> None:
+        event_engine: EventEngine = main_engine.event_engine
+        send_order = main_engine.send_order
+
+        def traced_send_order(req: OrderRequest, gateway_name: str) -> str:
+            start = time.monotonic_ns()
+            vt_orderid = send_order(req, gateway_name)
+            end = time.monotonic_ns()
+            if vt_orderid:
+                with self._orders_lock:
+                    orders = self._orders
+                    # 删除一直没有回报或未成交的委托
+                    while orders:
+                        oldest = next(iter(orders))
+                        if end - orders[oldest][0] < ORDER_TTL:
+                            break
+                        del orders[oldest]
+                    orders[vt_orderid] = [end, False]
+                self.record("send", end - start, vt_symbol=req.vt_symbol)
+            return vt_orderid
+
+        main_engine.send_order = traced_send_order
+        cta_send_order = self.cta_engine.send_order
+
+        def traced_cta_send_order(strategy, direction, offset, price, volume, stop, lock, net):
+            if not stop:
+                received = self._tick_time.get(strategy.vt_symbol)
+                if received is not None:
+                    self.record("tick_to_order", time.monotonic_ns() - received,
+                                strategy.strategy_name, strategy.vt_symbol)
+            return cta_send_order(strategy, direction, offset, price, volume, stop, lock, net)
+
+        self.cta_engine.send_order = traced_cta_send_order
+        event_engine.register(EVENT_LATENCY_TICK, self._on_tick)
+        event_engine.register(EVENT_LATENCY_ORDER, self._on_order)
+        event_engine.register(EVENT_LATENCY_TRADE, self._on_trade)
+        # 排在已注册的 tick 处理函数之后, 标记 tick 分发结束
+        event_engine.register(EVENT_TICK, self._after_tick)
+
+    def tag_gateway(self, gateway: BaseGateway) -> None:
+        """记录网关推送 tick、委托和成交回报的时刻"""
+        for name, marker in (("on_tick", EVENT_LATENCY_TICK), ("on_order", EVENT_LATENCY_ORDER),
+                             ("on_trade", EVENT_LATENCY_TRADE)):
+            setattr(gateway, name, self._tag(gateway, marker, getattr(gateway, name)))
+
+    @staticmethod
+    def _tag(gateway: BaseGateway, marker: str, callback: Callable) -> Callable:
+        def tagged(data) -> None:
+            # 同一回调线程中先推送标记事件, 经 gateway.on_event 与原事件走相同的路径, 保持先后顺序
+            gateway.on_event(marker, (time.monotonic_ns(), data))
+            callback(data)
+
+        return tagged
+
+    def record(self, stage: str, ns: int, strategy_name: str = "", vt_symbol: str = "") -> None:
+        with self._lock:
+            if strategy_name:
+                stages = self.strategies.get(strategy_name)
+                if stages is None:
+                    stages = self.strategies[strategy_name] = {}
+                histogram = stages.get(stage)
+                if histogram is None:
+                    histogram = stages[stage] = Histogram()
+                histogram.add(ns)
+            if vt_symbol:
+                stages = self.symbols.get(vt_symbol)
+                if stages is None:
+                    stages = self.symbols[vt_symbol] = {}
+                histogram = stages.get(stage)
+                if histogram is None:
+                    histogram = stages[stage] = Histogram()
+                histogram.add(ns)
+
+    def trace_bar(self, strategy_name: str, vt_symbol: str, start: int, end: int) -> None:
+        """策略 on_window_bar 的进入与退出时刻"""
+        received = self._tick_time.get(vt_symbol)
+        if received is not None:
+            self.record("bar_entry", start - received, strategy_name, vt_symbol)
+        self.record("bar_run", end - start, strategy_name, vt_symbol)
+
+    def _on_tick(self, event: Event) -> None:
+        received, tick = event.data
+        self._tick_time[tick.vt_symbol] = received
+        self.record("tick_event", time.monotonic_ns() - received, vt_symbol=tick.vt_symbol)
+
+    def _after_tick(self, event: Event) -> None:
+        self._tick_time.pop(event.data.vt_symbol, None)
+
+    def _strategy_name(self, vt_orderid: str) -> str:
+        strategy = self.cta_engine.orderid_strategy_map.get(vt_orderid)
+        return strategy.strategy_name if strategy is not None else ""
+
+    def _on_order(self, event: Event) -> None:
+        now = time.monotonic_ns()
+        received, order = event.data
+        strategy_name = self._strategy_name(order.vt_orderid)
+        self.record("order_event", now - received, strategy_name, order.vt_symbol)
+        # 委托流控线程发出委托时会在锁内删除过期的委托并登记新委托, 查找、标记与删除都在锁内完成
+        acked = None
+        with self._orders_lock:
+            sent = self._orders.get(order.vt_orderid)
+            if sent is None:
+                return
+            if not sent[1] and order.status != Status.SUBMITTING:
+                sent[1] = True
+                acked = sent[0]
+            if not order.is_active() and not order.traded:
+                del self._orders[order.vt_orderid]
+        if acked is not None:
+            self.record("send_ack", received - acked, strategy_name, order.vt_symbol)
+
+    def _on_trade(self, event: Event) -> None:
+        now = time.monotonic_ns()
+        received, trade = event.data
+        strategy_name = self._strategy_name(trade.vt_orderid)
+        self.record("trade_event", now - received, strategy_name, trade.vt_symbol)
+        with self._orders_lock:
+            sent = self._orders.pop(trade.vt_orderid, None)
+        if sent is not None:
+            self.record("send_trade", received - sent[0], strategy_name, trade.vt_symbol)
+
+    def rows(self) -> list[tuple[str, str, Histogram]]:
+        """(策略或合约, 阶段, 直方图的副本), 策略在前, 阶段按处理顺序"""
+        result = []
+        with self._lock:
+            for groups in (self.strategies, self.symbols):
+                for name in sorted(groups):
+                    stages = groups[name]
+                    result.extend((name, stage, stages[stage].copy()) for stage in STAGES if stage in stages)
+        return result
+
+    def pretty_str(self) -> str:
+        lines = [f"{'策略/合约':20} {'阶段':24} {'次数':>8} {'平均us':>10} {'p50us':>10} {'p99us':>10} {'最大us':>10}"]
+        for name, stage, h in self.rows():
+            lines.append(f"{name:20} {STAGES[stage]:24} {h.count:8d} {h.mean / 1000:10.1f} "
+                         f"{h.percentile(0.5) / 1000:10.1f} {h.percentile(0.99) / 1000:10.1f} {h.max / 1000:10.1f}")
+        return "\n".join(lines)
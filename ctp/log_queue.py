@@ -0,0 +1,54 @@
+__all__ = ["DeferredQueueHandler", "RateLimiter", "start_queue_logging", "stop_queue_logging"]
+
+import atexit
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    只把日志记录放入队列, 不在调用方线程格式化;
+    消息的格式化与写盘都由 QueueListener 的后台线程完成
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class RateLimiter:
+    """按 key 限频: 同一 key 在 interval 秒内最多放行一次, interval <= 0 时全部放行"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._last: dict[str, float] = {}
+
+    def allow(self, key: str) -> bool:
+        if self.interval <= 0:
+            return True
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            return False
+        self._last[key] = now
+        return True
+
+
+def start_queue_logging(logger: logging.Logger, handlers: list[logging.Handler]) -> QueueListener:
+    """将 handlers 移到后台线程, logger 只保留一个入队的 handler, 返回已启动的 QueueListener"""
+    level = min(handler.level for handler in handlers)
+    queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+    queue_handler.setLevel(level)
+    logger.addHandler(queue_handler)
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # 后台线程是守护线程, 未调用 close() 直接 exit() 时队列中的日志(如退出原因)会丢失, 退出前写完
+    atexit.register(stop_queue_logging, listener)
+    return listener
+
+
+def stop_queue_logging(listener: QueueListener) -> None:
+    """写完队列中剩余的日志后停止后台线程, 可重复调用"""
+    if listener._thread is not None:
+        listener.stop()
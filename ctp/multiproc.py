@@ -0,0 +1,559 @@
+"""
+多进程策略执行: 主进程持有CTP网关与CTA引擎, 策略按 vt_symbol 分配到多个子进程中运行
+
+- tick 通过共享内存环形缓冲区(TickRing)发送给对应的子进程
+- 子进程的委托、撤单、加载历史数据通过 Pipe 请求主进程, 委托/成交回报同样经 Pipe 发回;
+  委托与撤单转到事件引擎线程执行, 与 CtaEngine 处理委托/成交回报串行, 回报到达前委托号已登记
+- 主进程中每个子进程策略对应一个 StrategyProxy, 放入 cta_engine 的策略表,
+  委托路由、持仓计算、停止策略等直接复用 CtaEngine 原有的逻辑
+- 策略代码仍是 BaseStrategy 子类, 无需修改
+"""
+__all__ = ["TickRing", "StrategyProxy", "StrategyPool"]
+
+import importlib
+import logging
+import multiprocessing
+import queue
+import threading
+import zlib
+from logging.handlers import QueueHandler, QueueListener
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from vnpy.event import Event
+from vnpy.trader.constant import Direction, Exchange, Interval, Offset
+from vnpy.trader.engine import MainEngine
+from vnpy.trader.event import EVENT_TICK
+from vnpy.trader.object import BarData, ContractData, OrderData, SubscribeRequest, TickData, TradeData
+from vnpy_ctastrategy import CtaEngine, CtaTemplate, StopOrder
+from vnpy_ctastrategy.base import EngineType
+
+from .bar_batch import TICK_FIELDS, from_timestamp, to_timestamp
+from .bar_service import BarService
+from .checkpoint import CheckpointWriter
+from .hot_reload import reload_modules, swap_strategies
+from .settings import SETTINGS
+from .tick_journal import TICK_DTYPE
+
+# 子进程的委托与撤单请求, 在事件引擎线程中执行
+EVENT_WORKER_ORDER = "eWorkerOrder"
+
+RING_DTYPE = np.dtype([("symbol_id", "<i8")] + TICK_DTYPE.descr)
+RING_HEADER_SIZE = 64
+
+
+class TickRing:
+    """
+    共享内存中的 tick 环形缓冲区, 单个写入方(主进程), 读取方各自维护读取位置;
+    文件头的第一个 int64 为已写入的 tick 总数, 写入方先写记录再更新总数
+    """
+
+    def __init__(self, shm: SharedMemory, capacity: int, owner: bool):
+        self.shm = shm
+        self.capacity = capacity
+        self.owner = owner
+        self.header = np.ndarray((RING_HEADER_SIZE // 8,), dtype=np.int64, buffer=shm.buf)
+        self.records = np.ndarray((capacity,), dtype=RING_DTYPE, buffer=shm.buf, offset=RING_HEADER_SIZE)
+
+    @classmethod
+    def create(cls, capacity: int = 1 << 16) -> "TickRing":
+        shm = SharedMemory(create=True, size=RING_HEADER_SIZE + capacity * RING_DTYPE.itemsize)
+        ring = cls(shm, capacity, owner=True)
+        ring.header[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str, capacity: int) -> "TickRing":
+        try:
+            shm = SharedMemory(name=name, track=False)
+        except TypeError:
+            # python < 3.13 没有 track 参数; spawn 启动的子进程与主进程共用同一个 resource_tracker, 重复登记无影响
+            shm = SharedMemory(name=name)
+        return cls(shm, capacity, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, symbol_id: int, tick: TickData) -> None:
+        seq = int(self.header[0])
+        self.records[seq % self.capacity] = (symbol_id, to_timestamp(tick.datetime),
+                                             *(getattr(tick, f) for f in TICK_FIELDS))
+        self.header[0] = seq + 1
+
+    def reader(self) -> "TickRingReader":
+        return TickRingReader(self)
+
+    def close(self) -> None:
+        del self.header, self.records
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class TickRingReader:
+    def __init__(self, ring: TickRing):
+        self.ring = ring
+        self.seq = int(ring.header[0])
+        self.dropped = 0
+
+    def read(self) -> np.ndarray:
+        """读取所有新写入的 tick; 读取过慢被覆盖的部分计入 dropped"""
+        ring = self.ring
+        write_seq = int(ring.header[0])
+        start = max(self.seq, write_seq - ring.capacity)
+        records = ring.records[np.arange(start, write_seq) % ring.capacity]
+        # 复制期间写入方可能已开始覆盖最早的记录, 序号 <= 当前总数 - 容量 的记录不可信
+        valid = max(start, int(ring.header[0]) - ring.capacity + 1)
+        self.dropped += valid - self.seq
+        self.seq = write_seq
+        return records[valid - start:]
+
+
+class StrategyProxy:
+    """主进程中代表子进程策略的对象, 由 CtaEngine 调用的回调都转发给子进程"""
+
+    def __init__(self, worker: "_WorkerHandle", class_name: str, strategy_name: str, vt_symbol: str,
+                 setting: dict):
+        self.worker = worker
+        self.class_name = class_name
+        self.strategy_name = strategy_name
+        self.vt_symbol = vt_symbol
+        self.setting = setting
+        self.interval = setting.get("interval")
+        self.inited = False
+        self.trading = False
+        self.pos = setting.get("pos", 0)
+        self.variables_data: dict = {}
+
+    def on_start(self) -> None:
+        self.worker.post(("start", self.strategy_name))
+
+    def on_stop(self) -> None:
+        self.worker.post(("stop", self.strategy_name))
+
+    def on_order(self, order: OrderData) -> None:
+        self.worker.post(("order", self.strategy_name, order))
+
+    def on_trade(self, trade: TradeData) -> None:
+        # 持仓以主进程 CtaEngine 的计算结果为准
+        self.worker.post(("trade", self.strategy_name, trade, self.pos))
+
+    def on_stop_order(self, stop_order: StopOrder) -> None:
+        self.worker.post(("stop_order", self.strategy_name, stop_order))
+
+    def get_parameters(self) -> dict:
+        return self.setting
+
+    def get_variables(self) -> dict:
+        return {"inited": self.inited, "trading": self.trading, "pos": self.pos, **self.variables_data}
+
+    def get_data(self) -> dict:
+        return {
+            "strategy_name": self.strategy_name,
+            "vt_symbol": self.vt_symbol,
+            "class_name": self.class_name,
+            "author": "",
+            "parameters": self.get_parameters(),
+            "variables": self.get_variables(),
+        }
+
+
+class _WorkerHandle:
+    """
+    主进程中的子进程句柄: 发给子进程的消息先放入队列, 由发送线程写入 Pipe;
+    子进程处理过慢、Pipe 写满时只阻塞发送线程, 不阻塞调用 post 的事件引擎线程
+    """
+
+    def __init__(self, index: int, process, conn: Connection, wakeup, ring: TickRing):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.wakeup = wakeup
+        self.ring = ring
+        self.symbol_ids: dict[str, int] = {}
+        self._outbox: queue.SimpleQueue[tuple | None] = queue.SimpleQueue()
+        self._sender = threading.Thread(target=self._send_loop, name=f"strategy-worker-{index}-send", daemon=True)
+        self._sender.start()
+
+    def post(self, message: tuple) -> None:
+        self._outbox.put(message)
+
+    def _send_loop(self) -> None:
+        while True:
+            message = self._outbox.get()
+            if message is None:
+                break
+            try:
+                self.conn.send(message)
+            except (BrokenPipeError, OSError):
+                # 子进程已退出, 之后的消息直接丢弃
+                break
+            self.wakeup.set()
+
+    def flush(self, timeout: float | None = None) -> None:
+        """发送队列中已有的消息后结束发送线程"""
+        self._outbox.put(None)
+        self._sender.join(timeout)
+
+
+class StrategyPool:
+    """按 vt_symbol 把策略分配到 workers 个子进程中运行"""
+
+    def __init__(self, main_engine: MainEngine, cta_engine: CtaEngine, workers: int,
+                 log_handlers: list[logging.Handler], log_level: int = logging.DEBUG, ring_capacity: int = 1 << 16,
+                 checkpoint_dir: str = ""):
+        self.main_engine = main_engine
+        self.cta_engine = cta_engine
+        self.logger: logging.Logger = SETTINGS["logger"]
+        self.proxies: dict[str, StrategyProxy] = {}
+        self._workers: list[_WorkerHandle] = []
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+
+        context = multiprocessing.get_context("spawn")
+        # 子进程的日志通过队列交给主进程的 handler 输出
+        self._log_queue = context.Queue()
+        self._log_listener = QueueListener(self._log_queue, *log_handlers, respect_handler_level=True)
+        self._log_listener.start()
+
+        for index in range(workers):
+            ring = TickRing.create(ring_capacity)
+            parent_conn, child_conn = context.Pipe()
+            wakeup = context.Event()
+            process = context.Process(
+                target=_worker_main, name=f"strategy-worker-{index}", daemon=True,
+                args=(index, ring.name, ring_capacity, child_conn, wakeup, self._log_queue, log_level,
+                      checkpoint_dir))
+            process.start()
+            worker = _WorkerHandle(index, process, parent_conn, wakeup, ring)
+            self._workers.append(worker)
+            thread = threading.Thread(target=self._serve, args=(worker,), name=f"strategy-worker-{index}-rpc",
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        self.main_engine.event_engine.register(EVENT_TICK, self._on_tick)
+        self.main_engine.event_engine.register(EVENT_WORKER_ORDER, self._on_order_request)
+        self.logger.info(f"策略子进程已启动: {workers} 个")
+
+    def _worker_of(self, vt_symbol: str) -> _WorkerHandle:
+        return self._workers[zlib.crc32(vt_symbol.encode()) % len(self._workers)]
+
+    def _on_tick(self, event: Event) -> None:
+        tick: TickData = event.data
+        worker = self._worker_of(tick.vt_symbol)
+        symbol_id = worker.symbol_ids.get(tick.vt_symbol)
+        if symbol_id is not None:
+            worker.ring.write(symbol_id, tick)
+            worker.wakeup.set()
+
+    def add_strategy(self, class_name: str, strategy_name: str, vt_symbol: str, setting: dict) -> bool:
+        """与 CtaEngine.add_strategy 相同, 但策略在子进程中创建"""
+        if strategy_name in self.cta_engine.strategies:
+            self.logger.error(f"创建策略失败, 存在重名: {strategy_name}")
+            return False
+        strategy_class = self.cta_engine.classes.get(class_name)
+        if strategy_class is None:
+            self.logger.error(f"创建策略失败, 找不到策略类: {class_name}")
+            return False
+        contract = self.main_engine.get_contract(vt_symbol)
+        worker = self._worker_of(vt_symbol)
+        with self._lock:
+            if vt_symbol not in worker.symbol_ids:
+                worker.symbol_ids[vt_symbol] = len(worker.symbol_ids)
+                worker.post(("symbol", worker.symbol_ids[vt_symbol], vt_symbol, contract))
+        proxy = StrategyProxy(worker, class_name, strategy_name, vt_symbol, setting)
+        self.proxies[strategy_name] = proxy
+        # 只登记到策略表与委托映射, 不登记 symbol_strategy_map, 主进程不向代理推送 tick
+        self.cta_engine.strategies[strategy_name] = proxy
+        self.cta_engine.strategy_orderid_map.setdefault(strategy_name, set())
+        worker.post(("add", strategy_class.__module__, strategy_class.__name__, strategy_name, vt_symbol, setting))
+        self.logger.info(f"策略 {strategy_name} 分配至子进程 {worker.index}")
+        return True
+
+    def init_strategy(self, strategy_name: str) -> None:
+        """初始化在子进程中异步进行, 完成后 proxy.inited 变为 True 并推送 EVENT_CTA_STRATEGY"""
+        proxy = self.proxies[strategy_name]
+        contract = self.main_engine.get_contract(proxy.vt_symbol)
+        if contract:
+            self.main_engine.subscribe(SubscribeRequest(symbol=contract.symbol, exchange=contract.exchange),
+                                       contract.gateway_name)
+        else:
+            self.logger.error(f"行情订阅失败, 找不到合约: {proxy.vt_symbol}")
+        proxy.worker.post(("init", strategy_name))
+
+    def reload(self, module_names: list[str]) -> None:
+        """各子进程重新加载模块并替换其中的策略实例的类"""
+        for worker in self._workers:
+            worker.post(("reload", module_names))
+
+    def save_checkpoints(self) -> None:
+        """各子进程写入其中策略的检查点"""
+        for worker in self._workers:
+            worker.post(("checkpoint",))
+
+    def _serve(self, worker: _WorkerHandle) -> None:
+        """处理子进程发来的请求"""
+        cta_engine = self.cta_engine
+        event_engine = self.main_engine.event_engine
+        while True:
+            try:
+                message = worker.conn.recv()
+            except (EOFError, OSError):
+                break
+            try:
+                kind = message[0]
+                if kind in ("send_order", "cancel_order", "cancel_all"):
+                    # CtaEngine 的委托映射、开平转换器只在事件引擎线程中读写
+                    event_engine.put(Event(EVENT_WORKER_ORDER, (worker, message)))
+                elif kind == "load_bar":
+                    _, request_id, vt_symbol, days, interval, use_database = message
+                    bars = cta_engine.load_bar(vt_symbol, days, interval, None, use_database)
+                    worker.post(("reply", request_id, bars))
+                elif kind == "status":
+                    _, strategy_name, inited, trading, variables = message
+                    proxy = self.proxies[strategy_name]
+                    proxy.inited, proxy.trading, proxy.variables_data = inited, trading, variables
+                    cta_engine.put_strategy_event(proxy)
+            except Exception as e:
+                self.logger.exception(f"处理子进程 {worker.index} 请求出错: {message[0]}, 错误: {e}")
+
+    def _on_order_request(self, event: Event) -> None:
+        """事件引擎线程中执行子进程的委托与撤单, 之后的委托/成交回报由 CtaEngine 按已登记的委托号推送给策略"""
+        worker, message = event.data
+        cta_engine = self.cta_engine
+        kind = message[0]
+        try:
+            if kind == "send_order":
+                _, request_id, strategy_name, direction, offset, price, volume, stop, lock, net = message
+                vt_orderids = []
+                try:
+                    vt_orderids = cta_engine.send_order(self.proxies[strategy_name], direction, offset, price,
+                                                        volume, stop, lock, net)
+                finally:
+                    # 出错时也须回复, 子进程在等待
+                    worker.post(("reply", request_id, vt_orderids))
+            elif kind == "cancel_order":
+                cta_engine.cancel_order(self.proxies[message[1]], message[2])
+            elif kind == "cancel_all":
+                cta_engine.cancel_all(self.proxies[message[1]])
+        except Exception as e:
+            self.logger.exception(f"处理子进程 {worker.index} 请求出错: {kind}, 错误: {e}")
+
+    def close(self) -> None:
+        self.main_engine.event_engine.unregister(EVENT_TICK, self._on_tick)
+        self.main_engine.event_engine.unregister(EVENT_WORKER_ORDER, self._on_order_request)
+        for worker in self._workers:
+            worker.post(("close",))
+            worker.flush(timeout=5)
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+            worker.ring.close()
+        self._log_listener.stop()
+        self.logger.info("策略子进程已退出")
+
+
+class _WorkerCtaEngine:
+    """子进程中的CTA引擎替身, 供 CtaTemplate 调用, 需要主进程处理的请求经 Pipe 发送"""
+
+    class _MainEngine:
+        def __init__(self):
+            self.contracts: dict[str, ContractData] = {}
+
+        def get_contract(self, vt_symbol: str) -> ContractData | None:
+            return self.contracts.get(vt_symbol)
+
+    def __init__(self, conn: Connection, logger: logging.Logger):
+        self.conn = conn
+        self.logger = logger
+        self.main_engine = self._MainEngine()
+        # 子进程内的策略共用K线合成, 每个 tick 只合成一次
+        self.bar_service = BarService()
+        self.strategies: dict[str, CtaTemplate] = {}
+        self.symbol_strategies: dict[str, list[CtaTemplate]] = {}
+        self.symbols: list[str] = []
+        self.active = True
+        self._request_id = 0
+        self._backlog: list[tuple] = []
+
+    def _request(self, message: tuple):
+        """发送请求并等待主进程回复, 等待期间收到的其他消息稍后处理"""
+        self._request_id += 1
+        self.conn.send((message[0], self._request_id, *message[1:]))
+        while True:
+            reply = self.conn.recv()
+            if reply[0] == "reply" and reply[1] == self._request_id:
+                return reply[2]
+            self._backlog.append(reply)
+
+    def send_order(self, strategy: CtaTemplate, direction: Direction, offset: Offset, price: float, volume: float,
+                   stop: bool, lock: bool, net: bool) -> list[str]:
+        return self._request(("send_order", strategy.strategy_name, direction, offset, price, volume, stop, lock,
+                              net))
+
+    def cancel_order(self, strategy: CtaTemplate, vt_orderid: str) -> None:
+        self.conn.send(("cancel_order", strategy.strategy_name, vt_orderid))
+
+    def cancel_all(self, strategy: CtaTemplate) -> None:
+        self.conn.send(("cancel_all", strategy.strategy_name))
+
+    def load_bar(self, vt_symbol: str, days: int, interval: Interval, callback, use_database: bool) -> list[BarData]:
+        return self._request(("load_bar", vt_symbol, days, interval, use_database))
+
+    def load_tick(self, vt_symbol: str, days: int, callback) -> list[TickData]:
+        return []
+
+    def get_engine_type(self) -> EngineType:
+        return EngineType.LIVE
+
+    def get_pricetick(self, strategy: CtaTemplate) -> float | None:
+        contract = self.main_engine.get_contract(strategy.vt_symbol)
+        return contract.pricetick if contract else None
+
+    def get_size(self, strategy: CtaTemplate) -> int | None:
+        contract = self.main_engine.get_contract(strategy.vt_symbol)
+        return contract.size if contract else None
+
+    def write_log(self, msg: str, strategy: CtaTemplate | None = None) -> None:
+        self.logger.info(f"{strategy.strategy_name}: {msg}" if strategy else msg)
+
+    def put_strategy_event(self, strategy: CtaTemplate) -> None:
+        self.conn.send(("status", strategy.strategy_name, strategy.inited, strategy.trading, strategy.get_variables()))
+
+    def send_email(self, msg: str, strategy: CtaTemplate | None = None) -> None:
+        pass
+
+    def sync_strategy_data(self, strategy: CtaTemplate) -> None:
+        pass
+
+    def _call(self, strategy: CtaTemplate, func, *args) -> None:
+        """与 CtaEngine.call_strategy_func 相同: 策略出错时停止该策略, 不影响同进程的其他策略"""
+        try:
+            func(*args)
+        except Exception:
+            strategy.trading = False
+            strategy.inited = False
+            self.logger.exception(f"策略 {strategy.strategy_name} 触发异常已停止")
+            self.put_strategy_event(strategy)
+
+    def call_strategy_func(self, strategy: CtaTemplate, func, params=None) -> None:
+        """与 CtaEngine.call_strategy_func 的参数相同, 供K线合成服务推送K线时使用"""
+        if params:
+            self._call(strategy, func, params)
+        else:
+            self._call(strategy, func)
+
+    def handle(self, message: tuple) -> None:
+        kind = message[0]
+        if kind == "close":
+            self.active = False
+        elif kind == "symbol":
+            _, symbol_id, vt_symbol, contract = message
+            self.symbols.append(vt_symbol)
+            assert len(self.symbols) == symbol_id + 1
+            if contract:
+                self.main_engine.contracts[vt_symbol] = contract
+        elif kind == "add":
+            _, module_name, class_name, strategy_name, vt_symbol, setting = message
+            strategy_class = getattr(importlib.import_module(module_name), class_name)
+            strategy = strategy_class(self, strategy_name, vt_symbol, setting)
+            self.strategies[strategy_name] = strategy
+            self.symbol_strategies.setdefault(vt_symbol, []).append(strategy)
+        elif kind == "reload":
+            try:
+                for strategy in swap_strategies(list(self.strategies.values()), reload_modules(message[1])):
+                    self.logger.info(f"策略 {strategy.strategy_name} 已切换为新代码")
+            except Exception:
+                self.logger.exception("策略模块重新加载失败, 策略继续使用原有代码")
+        elif kind == "checkpoint":
+            for strategy in self.strategies.values():
+                save_checkpoint = getattr(strategy, "save_checkpoint", None)
+                if save_checkpoint is None:
+                    continue
+                try:
+                    save_checkpoint()
+                except Exception:
+                    self.logger.exception(f"策略 {strategy.strategy_name} 写入检查点出错")
+        else:
+            strategy = self.strategies[message[1]]
+            if kind == "init":
+                self._call(strategy, strategy.on_init)
+                strategy.inited = True
+                self.put_strategy_event(strategy)
+            elif kind == "start":
+                self._call(strategy, strategy.on_start)
+                strategy.trading = True
+                self.put_strategy_event(strategy)
+            elif kind == "stop":
+                self._call(strategy, strategy.on_stop)
+                strategy.trading = False
+                self.put_strategy_event(strategy)
+            elif kind == "order":
+                self._call(strategy, strategy.on_order, message[2])
+            elif kind == "trade":
+                strategy.pos = message[3]
+                self._call(strategy, strategy.on_trade, message[2])
+                self.put_strategy_event(strategy)
+            elif kind == "stop_order":
+                self._call(strategy, strategy.on_stop_order, message[2])
+
+    def process_messages(self) -> None:
+        while self._backlog:
+            self.handle(self._backlog.pop(0))
+        while self.active and self.conn.poll():
+            self.handle(self.conn.recv())
+            while self._backlog:
+                self.handle(self._backlog.pop(0))
+
+    def process_ticks(self, records: np.ndarray) -> None:
+        for symbol_id, timestamp, *values in records.tolist():
+            vt_symbol = self.symbols[symbol_id]
+            strategies = self.symbol_strategies.get(vt_symbol)
+            if not strategies:
+                continue
+            symbol, exchange = vt_symbol.rsplit(".", 1)
+            tick = TickData(symbol=symbol, exchange=Exchange(exchange), datetime=from_timestamp(timestamp),
+                            gateway_name="CTP", **dict(zip(TICK_FIELDS, values)))
+            for strategy in strategies:
+                if strategy.inited:
+                    self._call(strategy, strategy.on_tick, tick)
+            self.bar_service.update_tick(tick)
+
+
+def _worker_main(index: int, ring_name: str, ring_capacity: int, conn: Connection, wakeup, log_queue,
+                 log_level: int, checkpoint_dir: str = "") -> None:
+    logger = logging.getLogger(f"{__name__}.worker{index}")
+    logger.setLevel(log_level)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.propagate = False
+    SETTINGS["logger"] = logger
+    SETTINGS["checkpoint.dir"] = checkpoint_dir
+    # 检查点在后台线程写盘, 不阻塞 tick 处理
+    checkpoint_writer = CheckpointWriter(logger) if checkpoint_dir else None
+    SETTINGS["checkpoint.writer"] = checkpoint_writer
+
+    engine = _WorkerCtaEngine(conn, logger)
+    ring = TickRing.attach(ring_name, ring_capacity)
+    reader = ring.reader()
+    try:
+        while engine.active:
+            wakeup.wait(timeout=1)
+            # 先清除再处理, 处理期间到达的通知不会丢失
+            wakeup.clear()
+            engine.process_messages()
+            engine.process_ticks(reader.read())
+            if reader.dropped:
+                logger.warning(f"子进程 {index} 处理过慢, 丢弃 {reader.dropped} 个 tick")
+                reader.dropped = 0
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        ring.close()
+        if checkpoint_writer is not None:
+            checkpoint_writer.close()
@@ -0,0 +1,384 @@
+"""
+委托流控: CTP 前置对每秒报单/撤单次数有限制, 超出的请求会被拒绝;
+所有委托与撤单经令牌桶按配置的速率发出, 超出速率的请求排队, 撤单优先于平仓, 平仓优先于开仓
+
+- 排队的委托先返回占位委托号(<网关>.DISPATCH-n), 并推送"提交中"状态, 策略可照常撤单
+- 实际发出期间网关推送的委托/成交事件先暂存, 取得真实委托号后先推送替换委托号的事件, 再推送暂存的事件;
+  事件引擎按先后顺序处理, CTA 引擎收到该委托的回报之前占位委托号已换成真实委托号,
+  占位委托从 OmsEngine 与开平转换器中删除, 不推送撤销回报
+- 正在发出的委托收到撤单时, 取得真实委托号后再撤单
+- 排队长度超过警戒值时记录警告, 策略可通过预计等待时间(estimated_delay)减少下单
+"""
+__all__ = ["OrderDispatcher", "TokenBucket", "Priority", "DISPATCH_PREFIX", "EVENT_DISPATCH_SWAP", "order_priority",
+           "is_provisional"]
+
+import copy
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from enum import IntEnum
+from typing import Any
+
+from vnpy.event import Event, EventEngine
+from vnpy.trader.constant import Offset, Status
+from vnpy.trader.engine import MainEngine, OmsEngine
+from vnpy.trader.event import EVENT_ORDER, EVENT_TRADE
+from vnpy.trader.gateway import BaseGateway
+from vnpy.trader.object import CancelRequest, OrderData, OrderRequest
+from vnpy_ctastrategy import CtaEngine
+
+from .latency import EVENT_LATENCY_ORDER, EVENT_LATENCY_TRADE
+
+# 占位委托的 orderid 前缀; vt_orderid 中只能有一个 "."(OffsetConverter 按 "." 拆分)
+DISPATCH_PREFIX = "DISPATCH-"
+
+# 排队的委托发出后, 在事件引擎线程中把 CTA 引擎的占位委托号换成真实委托号, 数据为 (占位委托号, 真实委托号, 占位委托)
+EVENT_DISPATCH_SWAP = "eDispatchSwap"
+
+# 发出委托期间暂存的网关事件(包括 EVENT_ORDER + vt_orderid 等), 延迟统计的标记事件须与原事件保持先后顺序
+HELD_EVENT_PREFIXES = (EVENT_ORDER, EVENT_TRADE, EVENT_LATENCY_ORDER, EVENT_LATENCY_TRADE)
+
+
+class Priority(IntEnum):
+    CANCEL = 0
+    CLOSE = 1
+    OPEN = 2
+
+
+def order_priority(req: OrderRequest) -> Priority:
+    return Priority.OPEN if req.offset in (Offset.OPEN, Offset.NONE) else Priority.CLOSE
+
+
+def is_provisional(vt_orderid: str) -> bool:
+    return vt_orderid.partition(".")[2].startswith(DISPATCH_PREFIX)
+
+
+class TokenBucket:
+    """令牌桶: 每秒补充 rate 个令牌, 最多积累 burst 个, 每次请求消耗一个"""
+
+    def __init__(self, rate: float, burst: int):
+        assert rate > 0 and burst >= 1
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float | None = None) -> bool:
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now: float | None = None) -> float:
+        """距离下一个令牌的秒数, 已有令牌时为 0"""
+        self._refill(time.monotonic() if now is None else now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class _Pending:
+    """排队中的委托或撤单, 按 (优先级, 序号) 出队"""
+
+    __slots__ = ("priority", "seq", "req", "gateway_name", "vt_orderid", "enqueued")
+
+    def __init__(self, priority: Priority, seq: int, req: OrderRequest | CancelRequest, gateway_name: str,
+                 vt_orderid: str = ""):
+        self.priority = priority
+        self.seq = seq
+        self.req = req
+        self.gateway_name = gateway_name
+        self.vt_orderid = vt_orderid
+        self.enqueued = time.monotonic()
+
+    def __lt__(self, other: "_Pending") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class OrderDispatcher:
+    """
+    替换 main_engine 的 send_order/cancel_order: 有令牌且没有排队时直接发出,
+    否则排队由后台线程按令牌桶速率发出; 网关添加后由 attach_gateway() 包装其 on_event
+
+    CtaEngine 在 send_order 返回后登记占位委托号, 其委托须在事件引擎线程中发出(策略回调、多进程模式下
+    子进程的委托请求均如此), 登记先于替换委托号的事件处理; 其他线程中发出的委托不做替换
+    """
+
+    def __init__(self, main_engine: MainEngine, cta_engine: CtaEngine, rate: float = 6, burst: int = 6,
+                 high_watermark: int = 20, logger: logging.Logger | None = None):
+        self.main_engine = main_engine
+        self.cta_engine = cta_engine
+        self.event_engine: EventEngine = main_engine.event_engine
+        self.bucket = TokenBucket(rate, burst)
+        self.high_watermark = high_watermark
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._send_order = main_engine.send_order
+        self._cancel_order = main_engine.cancel_order
+        self._heap: list[_Pending] = []
+        self._condition = threading.Condition()
+        # 后台线程发出委托期间, 网关推送的事件暂存在 _held 中, 取得真实委托号后按原顺序推送
+        self._hold_lock = threading.Lock()
+        self._holding = False
+        self._held: list[tuple[Callable, str, Any]] = []
+        self._seq = itertools.count(1)
+        self._queued: dict[str, _Pending] = {}
+        self._in_flight: dict[str, _Pending] = {}  # 已出队、尚未取得真实委托号
+        self._pending_cancels: dict[str, CancelRequest] = {}  # 发出期间收到的撤单
+        self._placeholders: dict[str, OrderData] = {}
+        self._sent: dict[str, str] = {}  # 占位委托号 -> 真实委托号, 供之后的撤单使用, 委托结束后删除
+        self._sent_real: dict[str, str] = {}  # 真实委托号 -> 占位委托号
+        self._overloaded = False
+
+        # 等待时间与数量统计, 在 self._condition 内读写
+        self.waits: deque[float] = deque(maxlen=1000)
+        self.counts: dict[str, int] = {"sent": 0, "queued": 0, "cancelled": 0, "rejected": 0, "max_backlog": 0}
+
+        self._active = True
+        self._thread = threading.Thread(target=self._run, name="order-dispatcher", daemon=True)
+
+    def start(self) -> None:
+        self.main_engine.send_order = self.send_order
+        self.main_engine.cancel_order = self.cancel_order
+        self.event_engine.register(EVENT_DISPATCH_SWAP, self._on_swap)
+        self.event_engine.register(EVENT_ORDER, self._on_order)
+        self._thread.start()
+
+    def attach_gateway(self, gateway: BaseGateway) -> None:
+        """包装网关的 on_event: 后台线程发出委托期间推送的委托/成交事件暂存, 取得真实委托号后再推送"""
+        on_event = gateway.on_event
+
+        def held_on_event(type: str, data: Any = None) -> None:
+            # tick 等其他事件直接推送, 不加锁
+            if not type.startswith(HELD_EVENT_PREFIXES):
+                on_event(type, data)
+                return
+            # 在锁内推送, 与释放暂存事件的顺序一致
+            with self._hold_lock:
+                if self._holding:
+                    self._held.append((on_event, type, data))
+                else:
+                    on_event(type, data)
+
+        gateway.on_event = held_on_event
+
+    def close(self) -> None:
+        with self._condition:
+            self._active = False
+            self._condition.notify_all()
+        self._thread.join(timeout=5)
+        with self._condition:
+            queued = list(self._queued)
+            self._queued.clear()
+            self._heap.clear()
+        backlog = len(queued)
+        # 未发出的委托推送"已撤销", OmsEngine 与策略中不会残留"提交中"的占位委托
+        for vt_orderid in queued:
+            self._close_placeholder(vt_orderid, Status.CANCELLED)
+        self.main_engine.send_order = self._send_order
+        self.main_engine.cancel_order = self._cancel_order
+        self.event_engine.unregister(EVENT_DISPATCH_SWAP, self._on_swap)
+        self.event_engine.unregister(EVENT_ORDER, self._on_order)
+        if backlog:
+            self.logger.warning(f"委托流控关闭, {backlog} 个排队中的请求未发出")
+
+    def backlog(self) -> int:
+        return len(self._heap)
+
+    def estimated_delay(self) -> float:
+        """新的请求大约需要等待的秒数"""
+        with self._condition:
+            return len(self._heap) / self.bucket.rate + self.bucket.wait_time()
+
+    def send_order(self, req: OrderRequest, gateway_name: str) -> str:
+        with self._condition:
+            if not self._heap and self.bucket.take():
+                item = None
+                self.waits.append(0.0)
+                self.counts["sent"] += 1
+            else:
+                seq = next(self._seq)
+                vt_orderid = f"{gateway_name}.{DISPATCH_PREFIX}{seq}"
+                item = _Pending(order_priority(req), seq, req, gateway_name, vt_orderid)
+                self._enqueue(item)
+                self._queued[vt_orderid] = item
+                placeholder = req.create_order_data(f"{DISPATCH_PREFIX}{seq}", gateway_name)
+                self._placeholders[vt_orderid] = placeholder
+        if item is None:
+            return self._send_order(req, gateway_name)
+        # 与网关发出委托时一样推送"提交中", OmsEngine 中可以查到该委托, 策略可以撤单
+        self.event_engine.put(Event(EVENT_ORDER, copy.copy(placeholder)))
+        return item.vt_orderid
+
+    def cancel_order(self, req: CancelRequest, gateway_name: str) -> None:
+        vt_orderid = f"{gateway_name}.{req.orderid}"
+        if req.orderid.startswith(DISPATCH_PREFIX):
+            with self._condition:
+                item = self._queued.pop(vt_orderid, None)
+                if item is not None:
+                    # 尚未发出, 直接从队列中删除
+                    self._heap.remove(item)
+                    heapq.heapify(self._heap)
+                    self.counts["cancelled"] += 1
+                elif vt_orderid in self._in_flight:
+                    # 正在发出, 取得真实委托号后再撤单
+                    self._pending_cancels[vt_orderid] = req
+                    return
+                real = self._sent.get(vt_orderid)
+            if item is not None:
+                self._close_placeholder(vt_orderid, Status.CANCELLED)
+                return
+            if real is None:
+                self.logger.warning(f"撤单失败, 找不到委托 {vt_orderid}")
+                return
+            gateway_name, orderid = real.split(".", 1)
+            req = CancelRequest(orderid=orderid, symbol=req.symbol, exchange=req.exchange)
+        with self._condition:
+            if not self._heap and self.bucket.take():
+                item = None
+            else:
+                item = _Pending(Priority.CANCEL, next(self._seq), req, gateway_name)
+                self._enqueue(item)
+        if item is None:
+            self._cancel_order(req, gateway_name)
+
+    def _enqueue(self, item: _Pending) -> None:
+        """调用方持有 self._condition"""
+        heapq.heappush(self._heap, item)
+        self.counts["queued"] += 1
+        backlog = len(self._heap)
+        self.counts["max_backlog"] = max(self.counts["max_backlog"], backlog)
+        if backlog >= self.high_watermark and not self._overloaded:
+            self._overloaded = True
+            self.logger.warning(f"委托排队数量达到 {backlog}, 预计等待 {backlog / self.bucket.rate:.1f}s")
+        self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._active and not self._heap:
+                    self._condition.wait()
+                if not self._active:
+                    return
+                delay = self.bucket.wait_time()
+                if delay > 0:
+                    # 等待期间可能有优先级更高的请求入队, 醒来后重新选择
+                    self._condition.wait(delay)
+                    continue
+                self.bucket.take()
+                item = heapq.heappop(self._heap)
+                self.waits.append(time.monotonic() - item.enqueued)
+                if isinstance(item.req, OrderRequest):
+                    self._queued.pop(item.vt_orderid, None)
+                    self._in_flight[item.vt_orderid] = item
+                if len(self._heap) < self.high_watermark // 2:
+                    self._overloaded = False
+            try:
+                self._dispatch(item)
+            except Exception:
+                self.logger.exception("委托流控发出请求出错")
+
+    def _dispatch(self, item: _Pending) -> None:
+        if isinstance(item.req, CancelRequest):
+            self._cancel_order(item.req, item.gateway_name)
+            return
+        # 网关可能在 send_order 返回之前(包括在 send_order 中)推送该委托的回报, 此时还不知道真实委托号
+        with self._hold_lock:
+            self._holding = True
+        real = ""
+        try:
+            real = self._send_order(item.req, item.gateway_name)
+        except Exception:
+            self.logger.exception(f"委托流控发出委托出错: {item.vt_orderid}")
+        finally:
+            with self._hold_lock:
+                if real:
+                    placeholder = self._placeholders.pop(item.vt_orderid, None)
+                    self.event_engine.put(Event(EVENT_DISPATCH_SWAP, (item.vt_orderid, real, placeholder)))
+                for on_event, type, data in self._held:
+                    on_event(type, data)
+                self._held.clear()
+                self._holding = False
+        with self._condition:
+            self._in_flight.pop(item.vt_orderid, None)
+            cancel = self._pending_cancels.pop(item.vt_orderid, None)
+            if real:
+                self._sent[item.vt_orderid] = real
+                self._sent_real[real] = item.vt_orderid
+                self.counts["sent"] += 1
+            else:
+                self.counts["rejected"] += 1
+        if not real:
+            self._close_placeholder(item.vt_orderid, Status.REJECTED)
+            return
+        self.main_engine.update_order_request(item.req, real, item.gateway_name)
+        if cancel is not None:
+            gateway_name, orderid = real.split(".", 1)
+            self.cancel_order(CancelRequest(orderid=orderid, symbol=cancel.symbol, exchange=cancel.exchange),
+                              gateway_name)
+
+    def _close_placeholder(self, vt_orderid: str, status: Status) -> None:
+        """未发出的委托结束: 推送撤销或拒单回报"""
+        placeholder = self._placeholders.pop(vt_orderid, None)
+        if placeholder is None:
+            return
+        order = copy.copy(placeholder)
+        order.status = status
+        self.event_engine.put(Event(EVENT_ORDER, order))
+
+    def _on_order(self, event: Event) -> None:
+        """委托结束后不再需要由占位委托号撤单"""
+        order: OrderData = event.data
+        if not order.is_active() and order.vt_orderid in self._sent_real:
+            with self._condition:
+                self._sent.pop(self._sent_real.pop(order.vt_orderid, ""), None)
+
+    def _on_swap(self, event: Event) -> None:
+        """事件引擎线程中, 在 CtaEngine 处理该委托的回报之前把占位委托号换成真实委托号"""
+        provisional, real, placeholder = event.data
+        if placeholder is not None:
+            self._drop_placeholder(placeholder)
+        cta_engine = self.cta_engine
+        strategy = cta_engine.orderid_strategy_map.pop(provisional, None)
+        if strategy is not None:
+            cta_engine.orderid_strategy_map[real] = strategy
+            vt_orderids = cta_engine.strategy_orderid_map.get(strategy.strategy_name)
+            if vt_orderids is not None and provisional in vt_orderids:
+                vt_orderids.discard(provisional)
+                vt_orderids.add(real)
+
+    def _drop_placeholder(self, placeholder: OrderData) -> None:
+        """
+        已发出的占位委托由真实委托代替: 从 OmsEngine 中删除, 开平转换器不再冻结其仓位;
+        不推送委托事件, 否则 OmsEngine、日志与界面中会多出一笔并未发生的撤单
+        """
+        oms_engine: OmsEngine = self.main_engine.get_engine("oms")
+        oms_engine.orders.pop(placeholder.vt_orderid, None)
+        oms_engine.active_orders.pop(placeholder.vt_orderid, None)
+        converter = self.main_engine.get_converter(placeholder.gateway_name)
+        if converter is not None:
+            order = copy.copy(placeholder)
+            order.status = Status.CANCELLED
+            converter.update_order(order)
+
+    def stats(self) -> dict[str, float]:
+        with self._condition:
+            waits = sorted(self.waits)
+            result: dict[str, float] = dict(self.counts)
+            result["backlog"] = len(self._heap)
+        result["rate"] = self.bucket.rate
+        if waits:
+            result["wait_p50_ms"] = waits[len(waits) // 2] * 1000
+            result["wait_p95_ms"] = waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000
+            result["wait_max_ms"] = waits[-1] * 1000
+        return result
+
+    def pretty_str(self) -> str:
+        return "\n".join(f"{name:16} {value:g}" for name, value in self.stats().items())
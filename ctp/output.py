@@ -42,3 +42,14 @@ def to_string(obj) -> str:
                f"卖:{obj.bid_price}x{obj.bid_volume}-{obj.bid_offset.value} 买:{obj.ask_price}x{obj.ask_volume}-{obj.ask_offset.value}}}"
     else:
         return obj.__str__()
+
+
+class LazyString:
+    """延迟调用 to_string, 作为日志参数时只有日志真正输出才会格式化"""
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __str__(self) -> str:
+        return to_string(self.obj)
@@ -0,0 +1,208 @@
+"""
+离线回放: 不连接CTP, 将记录的 tick 或 K线按 on_tick -> BarGenerator -> on_window_bar 的路径
+全速推送给策略, 统计每个策略的 ticks/s、bars/s
+
+运行: python -m ctp.replay <tick记录目录> <vt_symbol> [--start 20250102] [--end 20250110] [--strategy MACD.MACD C53.C53]
+"""
+__all__ = ["ReplayEngine", "ReplayResult", "replay"]
+
+import argparse
+import importlib
+import logging
+import time
+from collections.abc import Iterable
+from datetime import datetime
+
+from vnpy.trader.constant import Direction, Exchange, Interval, Offset, OrderType, Product, Status
+from vnpy.trader.object import BarData, ContractData, OrderData, TickData, TradeData
+from vnpy_ctastrategy import CtaTemplate
+from vnpy_ctastrategy.base import EngineType
+
+from .settings import SETTINGS
+from .tick_journal import read_batch
+
+
+class _ReplayMainEngine:
+    def __init__(self):
+        self.contracts: dict[str, ContractData] = {}
+
+    def get_contract(self, vt_symbol: str) -> ContractData | None:
+        return self.contracts.get(vt_symbol)
+
+
+class ReplayEngine:
+    """
+    CTA引擎的离线替身: 记录策略的 buy/sell/short/cover 委托,
+    在下一个 tick/K线到来前按委托价全部成交, 并回调 on_order/on_trade
+    """
+
+    gateway_name = "REPLAY"
+
+    def __init__(self, size: int = 10, pricetick: float = 1, history: list[BarData] | None = None):
+        self.main_engine = _ReplayMainEngine()
+        self.size = size
+        self.pricetick = pricetick
+        self.history: list[BarData] = history or []
+        self.datetime: datetime | None = None
+        self.orders: list[OrderData] = []
+        self.trades: list[TradeData] = []
+        self._pending: dict[str, tuple[CtaTemplate, OrderData]] = {}
+
+    def add_contract(self, vt_symbol: str) -> None:
+        symbol, exchange = vt_symbol.rsplit(".", 1)
+        self.main_engine.contracts[vt_symbol] = ContractData(
+            symbol=symbol, exchange=Exchange(exchange), name=symbol, product=Product.FUTURES, size=self.size,
+            pricetick=self.pricetick, gateway_name=self.gateway_name)
+
+    def send_order(self, strategy: CtaTemplate, direction: Direction, offset: Offset, price: float, volume: float,
+                   stop: bool, lock: bool, net: bool) -> list[str]:
+        symbol, exchange = strategy.vt_symbol.rsplit(".", 1)
+        order = OrderData(symbol=symbol, exchange=Exchange(exchange), orderid=str(len(self.orders) + 1),
+                          type=OrderType.LIMIT, direction=direction, offset=offset, price=price, volume=volume,
+                          status=Status.NOTTRADED, datetime=self.datetime, gateway_name=self.gateway_name)
+        self.orders.append(order)
+        self._pending[order.vt_orderid] = (strategy, order)
+        return [order.vt_orderid]
+
+    def cancel_order(self, strategy: CtaTemplate, vt_orderid: str) -> None:
+        item = self._pending.pop(vt_orderid, None)
+        if item is not None:
+            item[1].status = Status.CANCELLED
+            strategy.on_order(item[1])
+
+    def cancel_all(self, strategy: CtaTemplate) -> None:
+        for vt_orderid in [k for k, (s, _) in self._pending.items() if s is strategy]:
+            self.cancel_order(strategy, vt_orderid)
+
+    def fill_pending(self) -> None:
+        """成交所有挂单"""
+        pending, self._pending = self._pending, {}
+        for strategy, order in pending.values():
+            order.traded = order.volume
+            order.status = Status.ALLTRADED
+            trade = TradeData(symbol=order.symbol, exchange=order.exchange, orderid=order.orderid,
+                              tradeid=order.orderid, direction=order.direction, offset=order.offset,
+                              price=order.price, volume=order.volume, datetime=self.datetime,
+                              gateway_name=self.gateway_name)
+            self.trades.append(trade)
+            strategy.pos += trade.volume if trade.direction == Direction.LONG else -trade.volume
+            strategy.on_order(order)
+            strategy.on_trade(trade)
+
+    def load_bar(self, vt_symbol: str, days: int, interval: Interval, callback, use_database: bool) -> list[BarData]:
+        return self.history
+
+    def load_tick(self, vt_symbol: str, days: int, callback) -> list[TickData]:
+        return []
+
+    def get_engine_type(self) -> EngineType:
+        return EngineType.BACKTESTING
+
+    def get_pricetick(self, strategy: CtaTemplate) -> float:
+        return self.pricetick
+
+    def get_size(self, strategy: CtaTemplate) -> int:
+        return self.size
+
+    def write_log(self, msg: str, strategy: CtaTemplate | None = None) -> None:
+        pass
+
+    def put_strategy_event(self, strategy: CtaTemplate) -> None:
+        pass
+
+    def send_email(self, msg: str, strategy: CtaTemplate | None = None) -> None:
+        pass
+
+    def sync_strategy_data(self, strategy: CtaTemplate) -> None:
+        pass
+
+
+class ReplayResult:
+    def __init__(self, strategy: CtaTemplate, engine: ReplayEngine, ticks: int, bars: int, seconds: float):
+        self.strategy = strategy
+        self.engine = engine
+        self.ticks = ticks
+        self.bars = bars
+        self.seconds = seconds
+
+    @property
+    def ticks_per_second(self) -> float:
+        return self.ticks / self.seconds if self.seconds else 0.0
+
+    @property
+    def bars_per_second(self) -> float:
+        return self.bars / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.strategy.strategy_name:24} ticks: {self.ticks:>9} ({self.ticks_per_second:>12,.0f}/s) " \
+               f"bars: {self.bars:>7} ({self.bars_per_second:>10,.0f}/s) " \
+               f"委托: {len(self.engine.orders):>5} 成交: {len(self.engine.trades):>5} 持仓: {self.strategy.pos}"
+
+
+def replay(strategy_class: type, vt_symbol: str, ticks: Iterable[TickData] = (), bars: Iterable[BarData] = (),
+           setting: dict | None = None, history: list[BarData] | None = None) -> ReplayResult:
+    """
+    用 ReplayEngine 初始化并启动策略, 依次推送 ticks (经 on_tick) 与 bars (经 on_bar);
+    history 为初始化时 load_bar 返回的历史K线
+    """
+    engine = ReplayEngine(history=history)
+    engine.add_contract(vt_symbol)
+    strategy = strategy_class(engine, f"{strategy_class.__name__}-{vt_symbol}", vt_symbol,
+                              setting or {"interval": "1m"})
+    strategy.on_init()
+    strategy.inited = True
+    strategy.on_start()
+    strategy.trading = True
+
+    # 统计 BarGenerator 合成后推送给 on_window_bar 的K线数量
+    bar_count = 0
+    on_window_bar = strategy.bg.on_window_bar
+
+    def counting_on_window_bar(bar: BarData) -> None:
+        nonlocal bar_count
+        bar_count += 1
+        on_window_bar(bar)
+
+    strategy.bg.on_window_bar = counting_on_window_bar
+
+    tick_count = 0
+    start = time.perf_counter()
+    for tick in ticks:
+        engine.fill_pending()
+        engine.datetime = tick.datetime
+        strategy.on_tick(tick)
+        tick_count += 1
+    for bar in bars:
+        engine.fill_pending()
+        engine.datetime = bar.datetime
+        strategy.on_bar(bar)
+    seconds = time.perf_counter() - start
+    engine.fill_pending()
+    return ReplayResult(strategy, engine, tick_count, bar_count, seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线回放 tick 记录, 统计各策略吞吐")
+    parser.add_argument("journal_dir")
+    parser.add_argument("vt_symbol")
+    parser.add_argument("--start", type=lambda s: datetime.strptime(s, "%Y%m%d"))
+    parser.add_argument("--end", type=lambda s: datetime.strptime(s, "%Y%m%d"))
+    parser.add_argument("--strategy", nargs="+", default=["MACD.MACD", "C53.C53", "haiying6.HaiYing6",
+                                                          "simple_test.SimpleTest"],
+                        help="strategy 包下的 模块.类名")
+    args = parser.parse_args()
+
+    logger = logging.getLogger(__name__)
+    logger.setLevel(logging.WARNING)
+    SETTINGS["logger"] = logger
+
+    batch = read_batch(args.journal_dir, args.vt_symbol, args.start, args.end)
+    ticks = batch.to_ticks()
+    for name in args.strategy:
+        module_name, class_name = name.rsplit(".", 1)
+        strategy_class = getattr(importlib.import_module(f"strategy.{module_name}"), class_name)
+        print(replay(strategy_class, args.vt_symbol, ticks=ticks))
+
+
+if __name__ == "__main__":
+    main()
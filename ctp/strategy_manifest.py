@@ -0,0 +1,150 @@
+__all__ = ["StrategyManifest", "scan_classes"]
+
+import ast
+import json
+import os
+import threading
+from collections.abc import Iterable
+
+# 策略基类, 本身不作为策略登记, 与 CtaEngine.load_strategy_class_from_module 一致
+TEMPLATE_CLASSES = {"CtaTemplate", "TargetPosTemplate"}
+
+
+def scan_classes(filepath: str) -> dict[str, list[str]]:
+    """不导入模块, 用 AST 读取文件中定义的类及其基类名(只保留最后一段, 如 vnpy_ctastrategy.CtaTemplate -> CtaTemplate)"""
+    with open(filepath, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filepath)
+    classes = {}
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            bases = []
+            for base in node.bases:
+                if isinstance(base, ast.Name):
+                    bases.append(base.id)
+                elif isinstance(base, ast.Attribute):
+                    bases.append(base.attr)
+            classes[node.name] = bases
+    return classes
+
+
+class StrategyManifest:
+    """
+    策略类清单: 扫描策略目录得到 策略类名 -> 模块名, 启动时无需导入任何策略模块;
+    扫描结果按文件的修改时间与大小缓存在 JSON 中, 只有变化的文件才重新解析
+    """
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        self.modules: dict[str, str] = {}
+        # 最近一次扫描中新增或有修改的模块
+        self.changed: set[str] = set()
+        self._bases: dict[str, list[str]] = {}
+        self._defined: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _load_cache(self) -> dict:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self, files: dict) -> None:
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(files, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.cache_path)
+
+    def scan(self, folders: list[tuple[str, str]]) -> dict[str, str]:
+        """扫描 (目录, 包名) 列表中的 .py 文件, 返回并保存 策略类名 -> 模块名"""
+        cached: dict = self._load_cache()
+        files: dict = {}
+        changed_modules: set[str] = set()
+        for folder, package in folders:
+            if not os.path.isdir(folder):
+                continue
+            for filename in sorted(os.listdir(folder)):
+                if not filename.endswith(".py") or filename.startswith("__"):
+                    continue
+                filepath = os.path.join(folder, filename)
+                stat = os.stat(filepath)
+                entry = cached.get(filepath)
+                if entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                    try:
+                        classes = scan_classes(filepath)
+                    except (OSError, SyntaxError, UnicodeDecodeError):
+                        classes = {}
+                    entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                             "module": f"{package}.{filename[:-3]}", "classes": classes}
+                    changed_modules.add(entry["module"])
+                files[filepath] = entry
+        if files != cached:
+            try:
+                self._save_cache(files)
+            except OSError:
+                pass
+
+        # 基类可能定义在其他文件中(如 BaseStrategy), 反复传播直到不再有新的策略类
+        bases: dict[str, list[str]] = {}
+        defined: dict[str, str] = {}
+        for entry in files.values():
+            for name, class_bases in entry["classes"].items():
+                bases[name] = class_bases
+                defined[name] = entry["module"]
+        strategies: set[str] = set()
+        changed = True
+        while changed:
+            changed = False
+            for name, class_bases in bases.items():
+                if name not in strategies and any(b in TEMPLATE_CLASSES or b in strategies for b in class_bases):
+                    strategies.add(name)
+                    changed = True
+
+        with self._lock:
+            self.modules = {name: defined[name] for name in sorted(strategies)}
+            self.changed = changed_modules
+            self._bases = bases
+            self._defined = defined
+            return dict(self.modules)
+
+    def invalidate(self, module_names: Iterable[str]) -> None:
+        """从缓存中删除这些模块, 下次扫描时视为有修改(如重新加载失败后)"""
+        module_names = set(module_names)
+        files = {path: entry for path, entry in self._load_cache().items() if entry["module"] not in module_names}
+        try:
+            self._save_cache(files)
+        except OSError:
+            pass
+
+    def affected_modules(self, module_names: Iterable[str]) -> list[str]:
+        """这些模块及继承了其中的类的模块, 基类所在的模块排在前面"""
+        with self._lock:
+            bases, defined = self._bases, self._defined
+        affected = set(module_names)
+        changed = True
+        while changed:
+            changed = False
+            for name, class_bases in bases.items():
+                if defined[name] not in affected and any(defined.get(b) in affected for b in class_bases):
+                    affected.add(defined[name])
+                    changed = True
+
+        depths: dict[str, int] = {}
+
+        def depth(name: str) -> int:
+            if name not in depths:
+                depths[name] = 0
+                depths[name] = 1 + max((depth(b) for b in bases.get(name, []) if b in bases), default=-1)
+            return depths[name]
+
+        module_depth: dict[str, int] = {module: 0 for module in affected}
+        for name, module in defined.items():
+            if module in affected:
+                module_depth[module] = max(module_depth[module], depth(name))
+        return sorted(affected, key=lambda module: (module_depth[module], module))
+
+    def class_names(self) -> list[str]:
+        return list(self.modules)
+
+    def module_of(self, class_name: str) -> str | None:
+        return self.modules.get(class_name)
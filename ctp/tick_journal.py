@@ -0,0 +1,191 @@
+__all__ = ["TickJournal", "TICK_DTYPE", "trading_day", "read_records", "read_batch", "iter_ticks"]
+
+import os
+import threading
+from collections.abc import Iterator
+from datetime import date, datetime
+from operator import attrgetter
+
+import numpy as np
+
+from vnpy.event import Event, EventEngine
+from vnpy.trader.constant import Exchange
+from vnpy.trader.event import EVENT_TICK
+from vnpy.trader.object import TickData
+
+from .bar_batch import TICK_FIELDS, TickBatch, to_timestamp
+from .trading_calendar import get_calendar
+
+# 文件布局: 64 字节文件头 + 定长记录, 记录数量保存在文件头中, 读取方可以与写入同时进行
+TICK_DTYPE = np.dtype([("datetime", "<i8")] + [(f, "<f8") for f in TICK_FIELDS])
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("version", "<i8"), ("count", "<i8"), ("record_size", "<i8"),
+                         ("reserved", "S32")])
+INDEX_DTYPE = np.dtype([("datetime", "<i8"), ("position", "<i8")])
+
+MAGIC = b"CTPTICK1"
+VERSION = 1
+INDEX_STEP = 1024  # 每 INDEX_STEP 条记录写一条时间索引
+INITIAL_CAPACITY = 1 << 14
+
+_tick_values = attrgetter(*TICK_FIELDS)
+
+
+def trading_day(dt: datetime) -> date:
+    """夜盘及凌晨的行情归属下一个交易日(按本地交易日历, 跳过周末与节假日)"""
+    return get_calendar().trading_day_of(dt)
+
+
+def _paths(root_dir: str, day: date, vt_symbol: str) -> tuple[str, str]:
+    base = os.path.join(root_dir, day.strftime("%Y%m%d"), vt_symbol)
+    return base + ".tick", base + ".idx"
+
+
+class _JournalFile:
+    """单个交易日单个合约的 tick 文件, 通过 memmap 追加写入, 写满后容量翻倍"""
+
+    def __init__(self, path: str, index_path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                header = np.zeros(1, HEADER_DTYPE)
+                header["magic"], header["version"], header["record_size"] = MAGIC, VERSION, TICK_DTYPE.itemsize
+                f.write(header.tobytes())
+                f.truncate(HEADER_DTYPE.itemsize + INITIAL_CAPACITY * TICK_DTYPE.itemsize)
+        self.header = np.memmap(path, dtype=HEADER_DTYPE, mode="r+", shape=(1,))
+        if self.header["magic"][0] != MAGIC or self.header["record_size"][0] != TICK_DTYPE.itemsize:
+            raise ValueError(f"tick 文件格式不匹配: {path}")
+        self.count = int(self.header["count"][0])
+        self.records = self._map(max((os.path.getsize(path) - HEADER_DTYPE.itemsize) // TICK_DTYPE.itemsize,
+                                     INITIAL_CAPACITY))
+        self.index_file = open(index_path, "ab")
+
+    def _map(self, capacity: int) -> np.memmap:
+        self.capacity = capacity
+        return np.memmap(self.path, dtype=TICK_DTYPE, mode="r+", offset=HEADER_DTYPE.itemsize, shape=(capacity,))
+
+    def append(self, record: tuple) -> None:
+        if self.count == self.capacity:
+            self.records.flush()
+            self.records = self._map(self.capacity * 2)
+        self.records[self.count] = record
+        if self.count % INDEX_STEP == 0:
+            self.index_file.write(np.array([(record[0], self.count)], INDEX_DTYPE).tobytes())
+        self.count += 1
+        self.header["count"] = self.count
+
+    def flush(self) -> None:
+        self.records.flush()
+        self.header.flush()
+        self.index_file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.index_file.close()
+        del self.records, self.header
+        # 去掉预分配但未使用的部分
+        with open(self.path, "r+b") as f:
+            f.truncate(HEADER_DTYPE.itemsize + self.count * TICK_DTYPE.itemsize)
+
+
+class TickJournal:
+    """
+    tick 二进制记录: 订阅 EVENT_TICK, 每个 tick 写为一条定长记录,
+    按 <root_dir>/<交易日>/<vt_symbol>.tick 分文件, 并附带稀疏时间索引 <vt_symbol>.idx
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self._files: dict[str, tuple[date, _JournalFile]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, event_engine: EventEngine) -> None:
+        event_engine.register(EVENT_TICK, self._on_tick)
+
+    def unregister(self, event_engine: EventEngine) -> None:
+        event_engine.unregister(EVENT_TICK, self._on_tick)
+
+    def _on_tick(self, event: Event) -> None:
+        self.record(event.data)
+
+    def record(self, tick: TickData) -> None:
+        day = trading_day(tick.datetime)
+        with self._lock:
+            item = self._files.get(tick.vt_symbol)
+            if item is None or item[0] != day:
+                if item is not None:
+                    item[1].close()
+                item = (day, _JournalFile(*_paths(self.root_dir, day, tick.vt_symbol)))
+                self._files[tick.vt_symbol] = item
+            item[1].append((to_timestamp(tick.datetime), *_tick_values(tick)))
+
+    def flush(self) -> None:
+        with self._lock:
+            for _, file in self._files.values():
+                file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            for _, file in self._files.values():
+                file.close()
+            self._files.clear()
+
+
+def _read_file(path: str, index_path: str, start: int | None, end: int | None) -> np.ndarray:
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    count = int(header["count"][0])
+    if header["magic"][0] != MAGIC or count == 0:
+        return np.empty(0, TICK_DTYPE)
+    records = np.memmap(path, dtype=TICK_DTYPE, mode="r", offset=HEADER_DTYPE.itemsize, shape=(count,))
+    # 先用稀疏索引缩小范围, 避免读入整个文件
+    lo, hi = 0, count
+    if os.path.exists(index_path):
+        index = np.fromfile(index_path, dtype=INDEX_DTYPE)
+        index = index[index["position"] < count]
+        if start is not None and len(index):
+            # 从最后一个早于 start 的索引项开始, 与 start 相同时刻的记录可能在同时刻的索引项之前
+            i = int(np.searchsorted(index["datetime"], start, side="left")) - 1
+            lo = int(index["position"][i]) if i >= 0 else 0
+        if end is not None and len(index):
+            i = int(np.searchsorted(index["datetime"], end, side="left"))
+            hi = int(index["position"][i]) if i < len(index) else count
+    datetimes = records["datetime"][lo:hi]
+    if start is not None:
+        lo += int(np.searchsorted(datetimes, start, side="left"))
+        datetimes = records["datetime"][lo:hi]
+    if end is not None:
+        hi = lo + int(np.searchsorted(datetimes, end, side="left"))
+    return np.array(records[lo:hi])
+
+
+def read_records(root_dir: str, vt_symbol: str, start: datetime | None = None,
+                 end: datetime | None = None) -> np.ndarray:
+    """读取 [start, end) 区间的 tick, 返回 TICK_DTYPE 结构化数组"""
+    if not os.path.isdir(root_dir):
+        return np.empty(0, TICK_DTYPE)
+    first = trading_day(start).strftime("%Y%m%d") if start else ""
+    last = trading_day(end).strftime("%Y%m%d") if end else "99999999"
+    start_ts = to_timestamp(start) if start else None
+    end_ts = to_timestamp(end) if end else None
+    parts = []
+    for day in sorted(os.listdir(root_dir)):
+        if not (first <= day <= last):
+            continue
+        path = os.path.join(root_dir, day, vt_symbol + ".tick")
+        if os.path.exists(path):
+            parts.append(_read_file(path, os.path.join(root_dir, day, vt_symbol + ".idx"), start_ts, end_ts))
+    return np.concatenate(parts) if parts else np.empty(0, TICK_DTYPE)
+
+
+def read_batch(root_dir: str, vt_symbol: str, start: datetime | None = None,
+               end: datetime | None = None) -> TickBatch:
+    """与 read_records 相同, 但返回列式的 TickBatch"""
+    records = read_records(root_dir, vt_symbol, start, end)
+    symbol, exchange = vt_symbol.rsplit(".", 1)
+    return TickBatch(symbol, Exchange(exchange), records["datetime"], {f: records[f] for f in TICK_FIELDS},
+                     gateway_name="JOURNAL")
+
+
+def iter_ticks(root_dir: str, vt_symbol: str, start: datetime | None = None,
+               end: datetime | None = None) -> Iterator[TickData]:
+    yield from read_batch(root_dir, vt_symbol, start, end)
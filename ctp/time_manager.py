@@ -1,12 +1,23 @@
-__all__=["sleep_till"]
-
-import time
-
-def sleep_till(func, timeout=60):
-    count = 0
-    while not func():
-        time.sleep(1)
-        count += 1
-        if count > timeout:
-            return False
-    return True
\ No newline at end of file
+__all__=["Readiness"]
+
+import threading
+
+
+class Readiness:
+    """
+    事件驱动的就绪通知: 状态改变的事件回调中调用 notify(),
+    wait_till() 的调用方在条件成立时立即返回, 可以有任意多个线程同时等待
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+
+    def notify(self) -> None:
+        """状态可能已改变, 唤醒所有等待方重新检查条件"""
+        with self._condition:
+            self._condition.notify_all()
+
+    def wait_till(self, func, timeout: float = 60) -> bool:
+        """等待 func() 为真, 超时返回 False"""
+        with self._condition:
+            return bool(self._condition.wait_for(func, timeout))
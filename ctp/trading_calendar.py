@@ -0,0 +1,218 @@
+"""
+本地交易日历: 由 config/holidays.txt 中的休市日预先计算交易日及各交易日是否有夜盘,
+按交易所、品种的交易时段(ctp.trading_hours)回答 "时刻所在的交易时段"、"前后 N 根1分钟K线"、
+"区间内的交易日" 等查询, 均为二分查找, 无需请求数据服务
+"""
+__all__ = ["TradingCalendar", "load_holidays", "get_calendar", "HOLIDAYS_FILE"]
+
+import bisect
+import itertools
+import logging
+import os
+import threading
+from collections.abc import Iterable
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+from vnpy.trader.constant import Exchange
+
+from .settings import SETTINGS
+from .trading_hours import Sessions, sessions_of
+
+HOLIDAYS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../config/holidays.txt")
+
+# 早于该时刻的夜盘时间属于前一晚的夜盘, 晚于 NIGHT_START 属于当晚的夜盘
+NIGHT_END = time(3, 0)
+NIGHT_START = time(18, 0)
+
+
+def load_holidays(filepath: str = HOLIDAYS_FILE) -> set[date]:
+    holidays = set()
+    with open(filepath, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                holidays.add(date.fromisoformat(line))
+    return holidays
+
+
+def _as_date(d: date | datetime) -> date:
+    return d.date() if isinstance(d, datetime) else d
+
+
+class TradingCalendar:
+    """[first, last] 内的交易日(工作日且不是休市日), 范围之外只排除周末, 首次查询 last 之后的日期时输出警告"""
+
+    def __init__(self, holidays: Iterable[date], first: date, last: date):
+        self.holidays = frozenset(holidays)
+        self.first = first
+        self.last = last
+        days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+        self._days: list[int] = [d.toordinal() for d in days if d.weekday() < 5 and d not in self.holidays]
+        # 交易日 i 的前一晚是否有夜盘: 与前一个交易日之间只隔着周末时才有
+        self._night: list[bool] = [False] + [
+            not any(date.fromordinal(o).weekday() < 5 for o in range(prev + 1, cur))
+            for prev, cur in zip(self._days, self._days[1:])
+        ]
+        self._cumulative: dict[int, list[int]] = {}
+        self._trading_day_cache: dict[tuple[date, int], date] = {}
+        self._lock = threading.Lock()
+        self._warned = False
+
+    def _covers(self, d: date) -> bool:
+        return self.first <= d <= self.last
+
+    def is_trading_day(self, d: date | datetime) -> bool:
+        d = _as_date(d)
+        if not self._covers(d):
+            if d > self.last and not self._warned:
+                self._warned = True
+                logger = SETTINGS["logger"] or logging.getLogger(__name__)
+                logger.warning(f"{d} 超出休市日数据范围(至 {self.last}), 按工作日计算交易日, 请更新 {os.path.normpath(HOLIDAYS_FILE)}")
+            return d.weekday() < 5
+        i = bisect.bisect_left(self._days, d.toordinal())
+        return i < len(self._days) and self._days[i] == d.toordinal()
+
+    def next_trading_day(self, d: date | datetime, n: int = 1) -> date:
+        """d 之后(不含 d)的第 n 个交易日"""
+        d = _as_date(d)
+        i = bisect.bisect_right(self._days, d.toordinal()) + n - 1
+        if self._covers(d) and i < len(self._days):
+            return date.fromordinal(self._days[i])
+        for _ in range(n):
+            d += timedelta(days=1)
+            while not self.is_trading_day(d):
+                d += timedelta(days=1)
+        return d
+
+    def prev_trading_day(self, d: date | datetime, n: int = 1) -> date:
+        """d 之前(不含 d)的第 n 个交易日"""
+        d = _as_date(d)
+        i = bisect.bisect_left(self._days, d.toordinal()) - n
+        if self._covers(d) and i >= 0:
+            return date.fromordinal(self._days[i])
+        for _ in range(n):
+            d -= timedelta(days=1)
+            while not self.is_trading_day(d):
+                d -= timedelta(days=1)
+        return d
+
+    def trading_days(self, start: date | datetime, end: date | datetime) -> list[date]:
+        """[start, end] 内的交易日"""
+        start, end = _as_date(start), _as_date(end)
+        if not (self._covers(start) and self._covers(end)):
+            return [start + timedelta(days=i) for i in range((end - start).days + 1)
+                    if self.is_trading_day(start + timedelta(days=i))]
+        lo = bisect.bisect_left(self._days, start.toordinal())
+        hi = bisect.bisect_right(self._days, end.toordinal())
+        return [date.fromordinal(o) for o in self._days[lo:hi]]
+
+    def has_night_session(self, day: date) -> bool:
+        """交易日 day 是否包括前一晚的夜盘(长假前最后一个交易日晚上没有夜盘)"""
+        i = bisect.bisect_left(self._days, day.toordinal())
+        if i < len(self._days) and self._days[i] == day.toordinal() and i > 0:
+            return self._night[i]
+        prev = self.prev_trading_day(day)
+        return not any((prev + timedelta(days=k)).weekday() < 5 for k in range(1, (day - prev).days))
+
+    def trading_day_of(self, dt: datetime) -> date:
+        """时刻所属的交易日: 晚上及凌晨的夜盘属于下一个交易日, 非交易日的白天归入下一个交易日"""
+        t = dt.time()
+        key = (dt.date(), 2 if t >= NIGHT_START else 0 if t < NIGHT_END else 1)
+        day = self._trading_day_cache.get(key)
+        if day is None:
+            # 每个 tick 都会调用(如 tick 记录按交易日分文件), 按 (日期, 时段) 缓存
+            d, part = key
+            if part == 2:
+                day = self.next_trading_day(d)
+            elif part == 0:
+                day = self.next_trading_day(d - timedelta(days=1))
+            else:
+                day = d if self.is_trading_day(d) else self.next_trading_day(d)
+            self._trading_day_cache[key] = day
+        return day
+
+    def sessions_on(self, day: date, symbol: str, exchange: Exchange) -> list[tuple[datetime, datetime]]:
+        """交易日 day 的各交易时段 [(开始, 结束)], 按时间排序, 夜盘在前一个交易日晚上"""
+        sessions = sessions_of(symbol, exchange)
+        segments = []
+        if sessions.has_night and self.has_night_session(day):
+            prev = self.prev_trading_day(day)
+            for start, end in sessions.night:
+                segments.append(_segment(prev, start, end))
+        for start, end in sessions.day:
+            segments.append(_segment(day, start, end))
+        return segments
+
+    def session_of(self, dt: datetime, symbol: str, exchange: Exchange) -> tuple[datetime, datetime] | None:
+        """dt 所在的交易时段 [开始, 结束), 不在交易时段内时返回 None; 返回值与 dt 的时区相同"""
+        tz = dt.tzinfo
+        naive = dt.replace(tzinfo=None)
+        for start, end in self.sessions_on(self.trading_day_of(naive), symbol, exchange):
+            if start <= naive < end:
+                return start.replace(tzinfo=tz), end.replace(tzinfo=tz)
+        return None
+
+    def _cumulative_minutes(self, sessions: Sessions) -> list[int]:
+        """各交易日之前(范围内)累计的交易分钟数, 每种交易时段只计算一次"""
+        key = id(sessions)
+        cumulative = self._cumulative.get(key)
+        if cumulative is None:
+            day_minutes = sessions.minutes - sum(_length(s, e) for s, e in sessions.night)
+            night_minutes = sessions.minutes - day_minutes
+            cumulative = [0] + list(itertools.accumulate(day_minutes + (night_minutes if night else 0)
+                                                         for night in self._night))
+            with self._lock:
+                self._cumulative[key] = cumulative
+        return cumulative
+
+    def shift_bars(self, dt: datetime, n: int, symbol: str, exchange: Exchange) -> datetime:
+        """dt 所在(或之后第一根)1分钟K线向后 n 根(n < 0 时向前)的K线开始时间, 跳过非交易时段"""
+        tz = dt.tzinfo
+        naive = dt.replace(tzinfo=None)
+        day = self.trading_day_of(naive)
+        if not self._covers(day):
+            raise ValueError(f"{day} 不在交易日历范围内: {self.first} ~ {self.last}")
+        sessions = sessions_of(symbol, exchange)
+        cumulative = self._cumulative_minutes(sessions)
+        i = bisect.bisect_left(self._days, day.toordinal())
+        elapsed = 0
+        for start, end in self.sessions_on(day, symbol, exchange):
+            elapsed += max(0, min(int((naive - start).total_seconds() // 60), _minutes_between(start, end)))
+        target = cumulative[i] + elapsed + n
+        if not 0 <= target < cumulative[-1]:
+            raise ValueError(f"超出交易日历范围: {dt} 移动 {n} 根K线")
+        i = bisect.bisect_right(cumulative, target) - 1
+        offset = target - cumulative[i]
+        for start, end in self.sessions_on(date.fromordinal(self._days[i]), symbol, exchange):
+            length = _minutes_between(start, end)
+            if offset < length:
+                return (start + timedelta(minutes=offset)).replace(tzinfo=tz)
+            offset -= length
+        raise AssertionError("unreachable")
+
+
+def _segment(day: date, start: time, end: time) -> tuple[datetime, datetime]:
+    begin = datetime.combine(day, start)
+    finish = datetime.combine(day, end)
+    if finish <= begin:
+        finish += timedelta(days=1)
+    return begin, finish
+
+
+def _length(start: time, end: time) -> int:
+    begin, finish = _segment(date(2000, 1, 1), start, end)
+    return _minutes_between(begin, finish)
+
+
+def _minutes_between(start: datetime, end: datetime) -> int:
+    return int((end - start).total_seconds() // 60)
+
+
+@lru_cache(maxsize=1)
+def get_calendar() -> TradingCalendar:
+    """由 config/holidays.txt 构建的交易日历, 覆盖休市日数据的最早一年至最后一年年底"""
+    holidays = load_holidays()
+    first_year = min(d.year for d in holidays) if holidays else date.today().year
+    last_year = max(d.year for d in holidays) if holidays else date.today().year
+    return TradingCalendar(holidays, date(first_year, 1, 1), date(last_year, 12, 31))
@@ -0,0 +1,143 @@
+"""
+期货品种的交易时段: 用于由所需K线数量计算加载历史数据的天数
+
+每个交易日包括日盘及前一晚的夜盘(周一的夜盘在上周五晚上), 未列出的品种按交易所的日盘计算
+"""
+__all__ = ["Sessions", "sessions_of", "daily_end_of", "product_of", "is_weekday", "warmup_days"]
+
+import math
+import re
+from collections.abc import Callable
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+from vnpy.trader.constant import Exchange, Interval
+
+
+class Sessions:
+    """一个交易日内的交易时段 [(开始, 结束)], 结束早于开始表示跨过午夜"""
+
+    def __init__(self, day: list[tuple[time, time]], night: list[tuple[time, time]] = ()):
+        self.day = list(day)
+        self.night = list(night)
+        minutes = [_minutes(start, end) for start, end in self.day + self.night]
+        # 每个交易日的1分钟K线数量, 以及按整点划分的1小时K线数量
+        self.minutes: int = sum(m for m, _ in minutes)
+        self.hours: int = len(set().union(*(h for _, h in minutes)))
+
+    @property
+    def has_night(self) -> bool:
+        return bool(self.night)
+
+    @property
+    def daily_end(self) -> time:
+        """日盘最后一根1分钟K线的时间(K线以开始时刻标记), 如 15:00 收盘为 14:59"""
+        end = self.day[-1][1]
+        return (datetime.combine(date.min, end) - timedelta(minutes=1)).time()
+
+    def bars_per_day(self, interval: Interval) -> float:
+        if interval == Interval.MINUTE:
+            return self.minutes
+        if interval == Interval.HOUR:
+            return self.hours
+        if interval == Interval.DAILY:
+            return 1
+        return 1 / 5
+
+
+def _minutes(start: time, end: time) -> tuple[int, set[int]]:
+    """时段内的分钟数及涉及的整点小时"""
+    begin = start.hour * 60 + start.minute
+    finish = end.hour * 60 + end.minute
+    if finish <= begin:
+        finish += 24 * 60
+    return finish - begin, {(m // 60) % 24 for m in range(begin, finish)}
+
+
+def _t(s: str) -> time:
+    return time.fromisoformat(s)
+
+
+COMMODITY_DAY = [(_t("09:00"), _t("10:15")), (_t("10:30"), _t("11:30")), (_t("13:30"), _t("15:00"))]
+INDEX_DAY = [(_t("09:30"), _t("11:30")), (_t("13:00"), _t("15:00"))]
+BOND_DAY = [(_t("09:30"), _t("11:30")), (_t("13:00"), _t("15:15"))]
+
+NIGHT_2300 = [(_t("21:00"), _t("23:00"))]
+NIGHT_0100 = [(_t("21:00"), _t("01:00"))]
+NIGHT_0230 = [(_t("21:00"), _t("02:30"))]
+
+# 交易所默认只有日盘
+EXCHANGE_SESSIONS: dict[Exchange, Sessions] = {
+    Exchange.SHFE: Sessions(COMMODITY_DAY),
+    Exchange.INE: Sessions(COMMODITY_DAY),
+    Exchange.DCE: Sessions(COMMODITY_DAY),
+    Exchange.CZCE: Sessions(COMMODITY_DAY),
+    Exchange.GFEX: Sessions(COMMODITY_DAY),
+    Exchange.CFFEX: Sessions(INDEX_DAY),
+}
+
+# 品种代码(小写) -> 交易时段
+PRODUCT_SESSIONS: dict[str, Sessions] = {}
+
+
+def _register(products: str, sessions: Sessions) -> None:
+    for product in products.split():
+        PRODUCT_SESSIONS[product] = sessions
+
+
+_register("au ag sc", Sessions(COMMODITY_DAY, NIGHT_0230))
+_register("cu al zn pb ni sn ss ao bc", Sessions(COMMODITY_DAY, NIGHT_0100))
+_register("rb hc bu ru fu sp br lu nr", Sessions(COMMODITY_DAY, NIGHT_2300))
+_register("a b m y p j jm i c cs l v pp eg eb pg rr", Sessions(COMMODITY_DAY, NIGHT_2300))
+_register("sr cf rm ma ta oi fg sa pf cy sh px pr", Sessions(COMMODITY_DAY, NIGHT_2300))
+_register("t tf ts tl", Sessions(BOND_DAY))
+
+
+def product_of(symbol: str) -> str:
+    """合约代码中的品种代码, 如 rb2510 -> rb, SR509 -> sr"""
+    match = re.match(r"[A-Za-z]+", symbol)
+    return match.group().lower() if match else symbol.lower()
+
+
+@lru_cache(maxsize=None)
+def sessions_of(symbol: str, exchange: Exchange) -> Sessions:
+    sessions = PRODUCT_SESSIONS.get(product_of(symbol))
+    if sessions is None:
+        sessions = EXCHANGE_SESSIONS.get(exchange, Sessions(COMMODITY_DAY))
+    return sessions
+
+
+def daily_end_of(symbol: str, exchange: Exchange) -> time:
+    """合成日K线时的每日收盘K线时间, 用作 BarGenerator 的 daily_end"""
+    return sessions_of(symbol, exchange).daily_end
+
+
+def is_weekday(d: date) -> bool:
+    return d.weekday() < 5
+
+
+def warmup_days(symbol: str, exchange: Exchange, window: int, interval: Interval, bars: int,
+                now: datetime | None = None, is_trading_day: Callable[[date], bool] = is_weekday) -> int:
+    """
+    加载 bars 根 window * interval K线所需的自然日天数(即 load_bar 的 days 参数):
+    按品种每个交易日的K线数量换算为交易日数, 再按交易日历向前推算;
+    当日尚未收盘, 多加载一个交易日, 有夜盘的品种还需包括最早交易日前一晚的夜盘
+    """
+    now = now or datetime.now()
+    sessions = sessions_of(symbol, exchange)
+    trading_days = math.ceil(bars * window / sessions.bars_per_day(interval)) + 1
+
+    day = now.date()
+    count = 0
+    while True:
+        if is_trading_day(day):
+            count += 1
+            if count >= trading_days:
+                break
+        day -= timedelta(days=1)
+    if sessions.has_night:
+        day -= timedelta(days=1)
+        while not is_trading_day(day):
+            day -= timedelta(days=1)
+    # load_bar 从 now - days 开始, 多加一天包括最早一天中早于当前时刻的部分
+    return (now.date() - day).days + 1
@@ -1,6 +1,10 @@
+import time
+
+# 启动耗时统计从导入依赖之前开始
+START_TIME = time.perf_counter()
+
 import sys
 import os
-import time
 import traceback
 
 from vnpy.trader.constant import Direction, Offset
@@ -9,7 +13,6 @@ from vnpy.trader.object import OrderRequest, OrderType, CancelRequest
 from ctp.ctp_session import CtpSession
 from ctp.input import *
 from ctp.output import *
-from ctp.time_manager import sleep_till
 
 help_list = {
     "q": "quit 退出程序",
@@ -17,32 +20,42 @@ help_list = {
     # query
     "qa": "query account 查询资金账户",
     "qc": "query contracts 查询合约列表",
+    "sc": "search contracts 按代码前缀搜索合约",
     "qm": "query market data 查询指定合约行情",
     "qp": "query position 查询持仓",
+    "lt": "latency 查看各阶段延迟统计",
     # order
     "so": "send order 下单",
     "co": "cancel order 撤单",
     "lo": "list order 列出历史订单",
+    "dq": "dispatch queue 查看委托流控队列",
     # strategy
     "as": "add strategy 添加策略",
     "ls": "list strategy 列出所有策略",
     "ss": "stop strategy 停止策略",
+    "rl": "reload strategy 重新加载已修改的策略代码",
     # subscribe
     "sub": "subscribe 订阅行情",
     "unsub": "unsubscribe 取消订阅行情"
 }
 
 if __name__ == "__main__":
+    import_time = time.perf_counter()
     session = CtpSession()
     session.read_config()
+    config_time = time.perf_counter()
     session.connect()
-    if sleep_till(session.inited):
+    if session.wait_inited():
         session.logger().info("CTP连接成功!")
     else:
         session.logger().error("连接CTP超时")
+    connect_time = time.perf_counter()
     strategy_record_filepath = os.path.join(os.path.dirname(__file__), "config/strategies.json")
     if os.path.isfile(strategy_record_filepath):
         session.load_strategy(strategy_record_filepath)
+    session.logger().info(f"启动耗时 {time.perf_counter() - START_TIME:.2f}s: 导入 {import_time - START_TIME:.2f}s, "
+                          f"读取配置 {config_time - import_time:.2f}s, 连接 {connect_time - config_time:.2f}s, "
+                          f"加载策略 {time.perf_counter() - connect_time:.2f}s")
     try:
         while True:
             time.sleep(0.5)  # to print input tip after last operation's output
@@ -60,6 +73,10 @@ if __name__ == "__main__":
                         print(to_string(account))
                 elif op == "qc":
                     print(session.get_all_contracts_pretty_str())
+                elif op == "sc":
+                    prefix = input("请输入合约代码前缀:").strip()
+                    for contract in session.search_contracts(prefix):
+                        print(to_string(contract))
                 elif op == "qm":
                     tick_data = session.get_tick(input_vt_symbol())
                     if tick_data is None:
@@ -69,6 +86,11 @@ if __name__ == "__main__":
                 elif op == "qp":
                     for pos_data in session.get_all_positions():
                         print(to_string(pos_data))
+                elif op == "lt":
+                    if session.latency_tracer is None:
+                        print("未启用延迟统计")
+                    else:
+                        print(session.latency_tracer.pretty_str())
                 # order
                 elif op == "so":
                     side = input("请输入方向(0买多,1卖多,2买空,3卖空,q退出):")
@@ -91,6 +113,11 @@ if __name__ == "__main__":
                 elif op == "lo":
                     for order_data in session.get_history_orders():
                         print(to_string(order_data))
+                elif op == "dq":
+                    if session.order_dispatcher is None:
+                        print("未启用委托流控")
+                    else:
+                        print(session.order_dispatcher.pretty_str())
                 # strategy
                 elif op == "as":
                     session.add_strategy(session.input_strategy_class_name(), input_vt_symbol(), input_interval())
@@ -100,6 +127,8 @@ if __name__ == "__main__":
                     strategy_names = input("请输入策略名称(多个策略之间以','间隔)(输入'all'以全部停止):").split(',')
                     strategy_names = [x.strip() for x in strategy_names]
                     session.stop_strategy(strategy_names)
+                elif op == "rl":
+                    session.reload_strategies()
                 # subscribe
                 elif op == "sub":
                     session.subscribe(*input_symbol_exchange())
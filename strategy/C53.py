@@ -1,6 +1,8 @@
 from vnpy_ctastrategy import *
 
 from .base_strategy import BaseStrategy
+from .util.indicator import ATR, RollingMax, RollingMin, WindowedEMA
+from .util.series import RingSeries
 
 class C53(BaseStrategy):
     # 策略参数
@@ -20,8 +22,8 @@ class C53(BaseStrategy):
     lowest_price = 0.0  # 空头持仓期间最低价
     atr_value = 0.0  # ATR值
     mas_value = 0.0  # EMA值
-    upper_levels = []  # 历史CL周期高点队列
-    lower_levels = []  # 历史CL周期低点队列
+    upper_levels: RingSeries = None  # 最近 CD+2 根K线的CL周期高点
+    lower_levels: RingSeries = None  # 最近 CD+2 根K线的CL周期低点
 
     parameters = [
         "fund", "risk_ratio", "atr_length", "ema_length",
@@ -34,26 +36,40 @@ class C53(BaseStrategy):
         "lowest_price", "atr_value", "mas_value",
         "upper_levels", "lower_levels"
     ]
+    checkpoint_attributes = ["atr", "ema", "highest", "lowest"]
 
     def __init__(self, cta_engine, strategy_name: str, vt_symbol: str, setting: dict):
         super().__init__(cta_engine, strategy_name, vt_symbol, setting)
+        self.atr = ATR(self.atr_length)
+        # 与原来由 ArrayManager 数组计算的 EMA 一致: 只用前一根K线及之前的 am.size - 1 个收盘价,
+        # 以窗口开头的简单平均为初值(EMA240 的初值在窗口内仍占约 88% 的权重, 不能用全部历史代替)
+        self.ema = WindowedEMA(self.ema_length, self.num_init_bars() - 1)
+        self.highest = RollingMax(self.cl_period)
+        self.lowest = RollingMin(self.cl_period)
+        # 只需要 CD+1 周期前的极值, 每个实例各自保留定长的历史
+        self.upper_levels = RingSeries(self.cd_period + 2)
+        self.lower_levels = RingSeries(self.cd_period + 2)
 
     def num_init_bars(self) -> int:
         return max(self.atr_length, self.ema_length, self.cl_period) + self.cd_period + 10
 
     def on_window_bar(self, bar: BarData) -> None:
         self.am.update_bar(bar)
+        # 计算EMA（使用前一根K线的EMA值）
+        last_ema = self.ema.value
+        self.ema.update(bar.close_price)
+        # 计算ATR
+        self.atr_value = self.atr.update(bar.high_price, bar.low_price, bar.close_price)
+        # 计算CL周期极值（当前K线）
+        upper_level = self.highest.update(bar.high_price)
+        lower_level = self.lowest.update(bar.low_price)
         if not self.am.inited:
             self._logger.debug(f"策略正在加载数据: {self.strategy_name}, {self.am.count}/{self.am.size}")
             return
 
-        # 计算ATR
-        self.atr_value = self.am.atr(self.atr_length)
-        # 计算EMA（使用前一根K线的收盘价）
-        self.mas_value = self.am.ema(self.ema_length, array=True)[-2]  # 索引-2对应前一根K线
-        # 计算CL周期极值（当前K线）
-        self.upper_levels.append(self.am.high[-self.cl_period:].max())
-        self.lower_levels.append(self.am.low[-self.cl_period:].min())
+        self.mas_value = last_ema
+        self.upper_levels.append(upper_level)
+        self.lower_levels.append(lower_level)
 
         # 获取参考极值（CD+1周期前）
         ref_upper, ref_lower = 0.0, 0.0
@@ -28,7 +28,8 @@ class MACD(BaseStrategy):
             self._logger.debug(f"策略正在加载数据: {self.strategy_name}, {self.am.count}/{self.am.size}")
             return
 
-        # 计算MACD指标
+        # 计算MACD指标: 只用 am 中的 35 根K线, 快慢线以窗口开头的均值为初值且权重很大,
+        # 流式 MACD(按全部历史平滑)会改变交易信号, 因此保留按窗口计算
         macd, signal, hist = self.am.macd(12, 26, 9, array=True)
         self.macd_value = macd[-1]
         self.signal_value = signal[-1]
@@ -1,21 +1,32 @@
+import datetime
 import logging
+import time
 
 from abc import abstractmethod
 
-from vnpy.trader.constant import Interval
+from vnpy.trader.constant import Exchange, Interval
 from vnpy.trader.object import BarData, TickData, OrderData, TradeData
 from vnpy.trader.utility import BarGenerator, ArrayManager
 from vnpy_ctastrategy import CtaTemplate, StopOrder
 
+from ctp.bar_service import BarService, check_window, history_interval
+from ctp.checkpoint import checkpoint_path, read_checkpoint, write_checkpoint
 from ctp.input import split_win_interval
-from ctp.output import to_string
+from ctp.output import LazyString
 from ctp.settings import SETTINGS
+from ctp.trading_calendar import get_calendar
+from ctp.trading_hours import daily_end_of, warmup_days
 
 class BaseStrategy(CtaTemplate):
     _logger: logging.Logger = None
     interval: str = "1m"
     bg: BarGenerator = None
     am: ArrayManager = None
+    # 会话的K线合成服务, 实盘K线由其合成后推送; 引擎没有该服务时(如回测)由 bg 合成
+    bar_service: BarService | None = None
+    # 除 variables 外需要写入检查点的属性(如流式指标), 重启后无需重新计算
+    checkpoint_attributes: list[str] = []
+    last_bar_dt: datetime.datetime | None = None
 
     serialize_variables = dict()
 
@@ -34,18 +45,27 @@ class BaseStrategy(CtaTemplate):
 
     def on_init(self):
         self._logger.info(f"策略初始化中: {self.strategy_name}")
+        window, interval = split_win_interval(self.interval)
+        check_window(window, interval)
+        symbol, exchange = self.vt_symbol.rsplit(".", 1)
+        # 由1分钟K线合成 window * interval K线, 用于历史数据及没有K线合成服务时的实盘行情
         self.bg = BarGenerator(on_bar=self.on_bar,
-                               window=1,
+                               window=window,
                                on_window_bar=self.on_window_bar,
-                               interval=Interval.MINUTE,
-                               daily_end=None)
+                               interval=interval,
+                               daily_end=daily_end_of(symbol, Exchange(exchange)))
 
         assert self.num_init_bars() >= 0, "加载历史k线数必须 >= 0"
         self.am = ArrayManager(size=self.num_init_bars())
 
         try:
-            window, interval = split_win_interval(self.interval)
-            self.load_bar(days=10, interval=interval, callback=self.on_bar) # TODO: calculate days
+            # 历史数据为1分钟K线时经 bg 合成, 否则已是目标周期, 直接推送
+            self._history_interval = history_interval(window, interval)
+            callback = self.on_bar if self._history_interval == Interval.MINUTE else self._on_history_bar
+            self._warmup_days = self.init_history_days()
+            if not self._restore_checkpoint(self._history_interval, callback):
+                self.load_bar(days=self._warmup_days, interval=self._history_interval, callback=callback)
+            self._subscribe_bars(window, interval)
             if self.am.inited:
                 self._logger.info(f"策略加载历史数据完成: {self.strategy_name}")
             else:
@@ -54,6 +74,118 @@ class BaseStrategy(CtaTemplate):
             self._logger.error(f"策略加载历史数据出错: {self.strategy_name}, 错误:{e}")
             raise e
 
+    def init_history_days(self) -> int:
+        """按品种交易时段与交易日计算加载 num_init_bars() 根K线所需的自然日天数"""
+        window, interval = split_win_interval(self.interval)
+        symbol, exchange = self.vt_symbol.rsplit(".", 1)
+        return warmup_days(symbol, Exchange(exchange), window, interval, self.num_init_bars(),
+                           is_trading_day=get_calendar().is_trading_day)
+
+    def _subscribe_bars(self, window: int, interval: Interval) -> None:
+        """向引擎的K线合成服务订阅实盘K线, 同一合约、周期的策略共用一次合成"""
+        if self.bar_service is not None:
+            self.bar_service.unsubscribe(self.vt_symbol, self._service_callback)
+        self.bar_service = getattr(self.cta_engine, "bar_service", None)
+        if self.bar_service is None:
+            return
+        # 与其他回调一样经引擎调用, 策略出错时只停止该策略;
+        # 每次调用时按名称查找方法, 重新加载策略代码后自动使用新方法
+        self._service_callback = lambda bar: self.cta_engine.call_strategy_func(self, self._on_service_bar, bar)
+        self.bar_service.subscribe(self.vt_symbol, window, interval, self._service_callback, seed=self.bg)
+
+    def _on_service_bar(self, bar: BarData) -> None:
+        # 与 CtaEngine 推送 tick 的条件一致, 初始化完成前的实盘K线不处理
+        if not self.inited:
+            return
+        if self._history_interval == Interval.MINUTE:
+            # 检查点之后从该分钟起补齐1分钟K线重新合成
+            self.last_bar_dt = self.bar_service.last_minute(self.vt_symbol)
+        else:
+            self.last_bar_dt = bar.datetime
+        tracer = getattr(self.cta_engine, "latency_tracer", None)
+        if tracer is None:
+            self.on_window_bar(bar)
+            return
+        start = time.monotonic_ns()
+        self.on_window_bar(bar)
+        tracer.trace_bar(self.strategy_name, self.vt_symbol, start, time.monotonic_ns())
+
+    def _on_history_bar(self, bar: BarData) -> None:
+        self.last_bar_dt = bar.datetime
+        self.on_window_bar(bar)
+
+    def _restore_checkpoint(self, interval: Interval, callback) -> bool:
+        """从检查点恢复状态, 只加载检查点之后的K线; 没有可用的检查点时返回 False"""
+        directory = SETTINGS.get("checkpoint.dir")
+        if not directory:
+            return False
+        checkpoint = read_checkpoint(checkpoint_path(directory, self.strategy_name))
+        if checkpoint is None or checkpoint.last_bar is None or not checkpoint.matches(
+                self.__class__.__name__, self.vt_symbol, self.interval, self.am.size):
+            return False
+        last_bar = checkpoint.last_bar
+        days = (datetime.datetime.now(last_bar.tzinfo) - last_bar).days + 1
+        if days > self._warmup_days:
+            self._logger.info(f"策略检查点已过期, 重新加载历史数据: {self.strategy_name}, 最后一根K线: {last_bar}")
+            return False
+
+        checkpoint.restore_am(self.am)
+        state = checkpoint.state
+        for name, value in {**state["variables"], **state["attributes"]}.items():
+            setattr(self, name, value)
+        self.last_bar_dt = last_bar
+        count = self.am.count
+
+        if interval == Interval.MINUTE:
+            for name, value in state.get("generator", {}).items():
+                setattr(self.bg, name, value)
+
+        def on_bar_since(bar: BarData) -> None:
+            if bar.datetime > self.last_bar_dt:
+                callback(bar)
+
+        self.load_bar(days=days, interval=interval, callback=on_bar_since)
+        # 未完成的K线已包含在补齐的K线中时丢弃
+        if state["bar"] is not None and state["bar"].datetime > self.last_bar_dt:
+            self.bg.bar, self.bg.last_tick = state["bar"], state["last_tick"]
+        self._logger.info(f"策略从检查点恢复: {self.strategy_name}, 检查点K线: {last_bar}, "
+                          f"补齐K线数: {self.am.count - count}")
+        return True
+
+    def save_checkpoint(self) -> bool:
+        """写入检查点(有 CheckpointWriter 时在后台写入), 未初始化或未收到过K线时不写入"""
+        directory = SETTINGS.get("checkpoint.dir")
+        if not directory or not self.inited or self.am is None or self.last_bar_dt is None:
+            return False
+        meta = {
+            "class_name": self.__class__.__name__,
+            "vt_symbol": self.vt_symbol,
+            "interval": self.interval,
+            "last_bar": self.last_bar_dt.isoformat(),
+        }
+        state = {
+            "variables": {name: getattr(self, name) for name in self.variables
+                          if name not in ("inited", "trading", "pos")},
+            "attributes": {name: getattr(self, name) for name in self.checkpoint_attributes},
+            "bar": self.bg.bar,
+            "last_tick": self.bg.last_tick,
+            # 由 bg 合成实盘K线时保存未完成的多周期K线; 使用K线合成服务时检查点位于完成一根K线的分钟
+            "generator": {} if self.bar_service is not None else
+            {name: getattr(self.bg, name) for name in ("window_bar", "hour_bar", "daily_bar", "interval_count")},
+        }
+        filepath = checkpoint_path(directory, self.strategy_name)
+        writer = SETTINGS.get("checkpoint.writer")
+        if writer is not None:
+            # 事件线程中只取快照, 写盘由后台线程完成
+            writer.submit(filepath, meta, self.am, state)
+        else:
+            write_checkpoint(filepath, meta, self.am, state)
+        return True
+
+    def on_reload(self, old_class: type):
+        """策略代码重新加载后调用, 实例属性已保留; 新版本增加了需要历史数据的状态时可在此补齐"""
+        self._logger.info(f"策略代码已重新加载: {self.strategy_name}, {old_class.__module__}.{old_class.__name__}")
+
     def on_start(self):
         self._logger.info(f"策略启动: {self.strategy_name}")
 
@@ -62,18 +194,20 @@ class BaseStrategy(CtaTemplate):
         self.cancel_all()
 
     def on_order(self, order: OrderData) -> None:
-        self._logger.info(f"策略订单状态改变: {self.strategy_name} - {to_string(order)}")
+        self._logger.info("策略订单状态改变: %s - %s", self.strategy_name, LazyString(order))
 
     def on_trade(self, trade: TradeData) -> None:
-        self._logger.info(f"策略订单成交: {self.strategy_name} - {to_string(trade)}")
+        self._logger.info("策略订单成交: %s - %s", self.strategy_name, LazyString(trade))
 
     def on_stop_order(self, stop_order: StopOrder) -> None:
         self._logger.error("on_stop_order(): Unexpected calling")
 
     def on_tick(self, tick: TickData) -> None:
-        self.bg.update_tick(tick)
+        if self.bar_service is None:
+            self.bg.update_tick(tick)
 
     def on_bar(self, bar: BarData) -> None:
+        self.last_bar_dt = bar.datetime
         self.bg.update_bar(bar)
 
     @abstractmethod
@@ -87,6 +221,12 @@ class BaseStrategy(CtaTemplate):
         raise RuntimeError(f"num_init_bars(): abstractmethod called in {self.__class__.__name__},"
                            f"please make sure you're using a derived class and overrides this function")
 
+    @property
+    def order_delay(self) -> float:
+        """委托流控下新委托预计排队的秒数, 较大时策略可以放弃开仓或改为更激进的价格; 未启用流控时为 0"""
+        dispatcher = getattr(self.cta_engine, "order_dispatcher", None)
+        return dispatcher.estimated_delay() if dispatcher is not None else 0.0
+
     @property
     def margin_ratio(self):
         return 0.2  # TODO: Implement this
@@ -1,8 +1,10 @@
-import numpy as np
+import math
+from collections import deque
 
 from vnpy_ctastrategy import *
 
 from .base_strategy import BaseStrategy
+from .util.indicator import ATR, MACD, RollingMax, RollingMin
 
 
 class HaiYing6(BaseStrategy):
@@ -36,6 +38,11 @@ class HaiYing6(BaseStrategy):
         "lowest_price", "atr_value", "diff", "dea", "macd",
         "len_value", "dd_k", "trading_size"
     ]
+    checkpoint_attributes = [
+        "last_golden_cross", "last_golden_cross_value", "last_death_cross", "last_death_cross_value",
+        "last_ddai", "last_kdai", "atr", "macd_line", "highest", "lowest",
+        "diff_llv", "diff_hhv", "diff_at_llv", "diff_at_hhv"
+    ]
 
     def __init__(self, cta_engine, strategy_name, vt_symbol, setting):
         super().__init__(cta_engine, strategy_name, vt_symbol, setting)
@@ -48,50 +55,43 @@ class HaiYing6(BaseStrategy):
         self.last_ddai = -1  # 上次多带鱼位置
         self.last_kdai = -1  # 上次空带鱼位置
 
-    def llv(self, period: int, array: np.ndarray) -> np.ndarray:
-        """计算指定周期内的最低价数组"""
-        if len(array) < period:
-            return np.full_like(array, np.nan)
-
-        result = np.zeros_like(array)
-        for i in range(len(array)):
-            if i < period - 1:
-                result[i] = np.nan  # 不足period周期时返回nan
-            else:
-                result[i] = np.min(array[i - period + 1:i + 1])
-        return result
-
-    def hhv(self, period: int, array: np.ndarray) -> np.ndarray:
-        """计算指定周期内的最高价数组"""
-        if len(array) < period:
-            return np.full_like(array, np.nan)
-
-        result = np.zeros_like(array)
-        for i in range(len(array)):
-            if i < period - 1:
-                result[i] = np.nan  # 不足period周期时返回nan
-            else:
-                result[i] = np.max(array[i - period + 1:i + 1])
-        return result
+        # 流式指标, 每根k线更新一次
+        self.atr = ATR(self.atr_length)
+        self.macd_line = MACD(12, 26, 9)
+        self.highest = RollingMax(self.len_period)
+        self.lowest = RollingMin(self.len_period)
+        self.diff_llv = RollingMin(120)
+        self.diff_hhv = RollingMax(120)
+        # 最近3根k线的DIFF是否为120周期内最低/最高
+        self.diff_at_llv: deque[bool] = deque(maxlen=3)
+        self.diff_at_hhv: deque[bool] = deque(maxlen=3)
 
     def num_init_bars(self) -> int:
         return self.len_period * 2 + 10
 
     def on_window_bar(self, bar: BarData) -> None:
         self.am.update_bar(bar)
-        if not self.am.inited:
-            self._logger.debug(f"策略正在加载数据: {self.strategy_name}, {self.am.count}/{self.am.size}")
-            return
-
         # 计算ATR
-        self.atr_value = self.am.atr(self.atr_length)
+        self.atr_value = self.atr.update(bar.high_price, bar.low_price, bar.close_price)
 
         # 计算MACD
-        self.diff, self.dea, self.macd = self.am.macd(12, 26, 9, array=True)
+        last_diff, last_dea = self.diff, self.dea
+        self.diff, self.dea, self.macd = self.macd_line.update(bar.close_price)
+        if not math.isnan(self.diff):
+            self.diff_at_llv.append(self.diff == self.diff_llv.update(self.diff))
+            self.diff_at_hhv.append(self.diff == self.diff_hhv.update(self.diff))
+
+        # 计算N周期极值
+        highest = self.highest.update(bar.high_price)
+        lowest = self.lowest.update(bar.low_price)
+
+        if not self.am.inited:
+            self._logger.debug(f"策略正在加载数据: {self.strategy_name}, {self.am.count}/{self.am.size}")
+            return
 
         # 计算金叉死叉
-        cross_up = self.diff[-2] <= self.dea[-2] and self.diff[-1] > self.dea[-1]  # 金叉
-        cross_down = self.diff[-2] >= self.dea[-2] and self.diff[-1] < self.dea[-1]  # 死叉
+        cross_up = last_diff <= last_dea and self.diff > self.dea  # 金叉
+        cross_down = last_diff >= last_dea and self.diff < self.dea  # 死叉
 
         # 更新金叉死叉位置
         if cross_down:
@@ -122,8 +122,8 @@ class HaiYing6(BaseStrategy):
         self.trading_size = int(risk_capital / denominator)
 
         # 计算额外条件
-        dbp = any(self.diff[i] == self.llv(120, self.diff)[i] for i in range(-3, 0))
-        cmsp = any(self.diff[i] == self.hhv(120, self.diff)[i] for i in range(-3, 0))
+        dbp = any(self.diff_at_llv)
+        cmsp = any(self.diff_at_hhv)
 
         # 策略逻辑
         current_pos = self.pos
@@ -131,8 +131,8 @@ class HaiYing6(BaseStrategy):
         # 开仓条件
         bky67 = cross_up and self.dd_k == 1  # 金叉且多带鱼次数大于空带鱼
         sky67 = cross_down and self.dd_k == -1  # 死叉且空带鱼次数大于多带鱼
-        bkh15 = bar.close_price == self.am.high[-self.len_period:].max()  # 当前K线是N周期最高价
-        skh15 = bar.close_price == self.am.low[-self.len_period:].min()  # 当前K线是N周期最低价
+        bkh15 = bar.close_price == highest  # 当前K线是N周期最高价
+        skh15 = bar.close_price == lowest  # 当前K线是N周期最低价
 
         # 平仓条件
         bpy67 = cross_up and self.dd_k == -1  # 金叉但空带鱼次数大于多带鱼
@@ -0,0 +1,220 @@
+"""
+流式指标: 每根k线调用一次 update, 单次更新为 O(1), 结果与 TA-Lib 对整段序列的计算结果一致
+"""
+import math
+from collections import deque
+
+__all__ = ["RollingMax", "RollingMin", "EMA", "WindowedEMA", "MACD", "ATR"]
+
+NAN = float("nan")
+
+
+class RollingMax:
+    """最近 window 个值的最大值(HHV, 对应 TA-Lib MAX), 使用单调队列"""
+
+    def __init__(self, window: int):
+        assert window > 0
+        self.window = window
+        self.count = 0
+        self.value = NAN
+        self._queue: deque[tuple[int, float]] = deque()  # (序号, 值), 值单调递减
+
+    @property
+    def inited(self) -> bool:
+        return self.count >= self.window
+
+    def update(self, x: float) -> float:
+        queue = self._queue
+        while queue and queue[-1][1] <= x:
+            queue.pop()
+        queue.append((self.count, x))
+        if queue[0][0] <= self.count - self.window:
+            queue.popleft()
+        self.count += 1
+        self.value = queue[0][1] if self.count >= self.window else NAN
+        return self.value
+
+
+class RollingMin:
+    """最近 window 个值的最小值(LLV, 对应 TA-Lib MIN), 使用单调队列"""
+
+    def __init__(self, window: int):
+        assert window > 0
+        self.window = window
+        self.count = 0
+        self.value = NAN
+        self._queue: deque[tuple[int, float]] = deque()  # (序号, 值), 值单调递增
+
+    @property
+    def inited(self) -> bool:
+        return self.count >= self.window
+
+    def update(self, x: float) -> float:
+        queue = self._queue
+        while queue and queue[-1][1] >= x:
+            queue.pop()
+        queue.append((self.count, x))
+        if queue[0][0] <= self.count - self.window:
+            queue.popleft()
+        self.count += 1
+        self.value = queue[0][1] if self.count >= self.window else NAN
+        return self.value
+
+
+class EMA:
+    """指数移动平均(对应 TA-Lib EMA): 以前 n 个值的简单平均作为初值"""
+
+    def __init__(self, n: int):
+        assert n > 0
+        self.n = n
+        self.k = 2 / (n + 1)
+        self.count = 0
+        self.value = NAN
+        self._sum = 0.0
+
+    @property
+    def inited(self) -> bool:
+        return self.count >= self.n
+
+    def update(self, x: float) -> float:
+        self.count += 1
+        if self.count < self.n:
+            self._sum += x
+        elif self.count == self.n:
+            self.value = (self._sum + x) / self.n
+        else:
+            self.value += (x - self.value) * self.k
+        return self.value
+
+
+class WindowedEMA:
+    """
+    只用最近 length 个值计算的 EMA(n), 与 TA-Lib EMA 对最近 length 个值(如 ArrayManager 的数组)的计算结果一致:
+    以窗口开头 n 个值的简单平均作为初值, 之后的 length - n 个值按指数平滑; 窗口移动时初值随之改变
+    """
+
+    def __init__(self, n: int, length: int):
+        assert 0 < n <= length
+        self.n = n
+        self.length = length
+        self.k = 2 / (n + 1)
+        self.count = 0
+        self.value = NAN
+        self._values: deque[float] = deque(maxlen=length)
+        self._seed_sum = 0.0  # 窗口开头 n 个值之和
+        self._tail = 0.0  # 其余值的指数加权和
+        self._decay = 1.0  # (1 - k) ^ 其余值的个数
+        # 窗口已满时, 其余值中最早一个的权重
+        self._oldest_weight = self.k * (1 - self.k) ** (length - n - 1) if length > n else 0.0
+
+    @property
+    def inited(self) -> bool:
+        return self.count >= self.n
+
+    def update(self, x: float) -> float:
+        values = self._values
+        k = self.k
+        if len(values) == self.length:
+            dropped = values[0]
+            if self.length > self.n:
+                # 窗口开头的值移出, 原来最早按指数平滑的值并入初值
+                promoted = values[self.n]
+                self._seed_sum += promoted - dropped
+                self._tail = (self._tail - self._oldest_weight * promoted) * (1 - k) + k * x
+            else:
+                self._seed_sum += x - dropped
+        elif len(values) < self.n:
+            self._seed_sum += x
+        else:
+            self._decay *= 1 - k
+            self._tail = self._tail * (1 - k) + k * x
+        values.append(x)
+        self.count += 1
+        if self.count % self.length == 0:
+            self._recompute()
+        if len(values) >= self.n:
+            self.value = self._decay * self._seed_sum / self.n + self._tail
+        return self.value
+
+    def _recompute(self) -> None:
+        """每 length 次更新按窗口重新计算一次, 消除增量更新累积的浮点误差"""
+        values = list(self._values)
+        self._seed_sum = sum(values[:self.n])
+        tail = 0.0
+        for x in values[self.n:]:
+            tail = tail * (1 - self.k) + self.k * x
+        self._tail = tail
+
+
+class MACD:
+    """
+    MACD(对应 TA-Lib MACD): 快线与慢线在第 slow 根k线同时以简单平均初始化,
+    信号线以前 signal 个 MACD 值的简单平均初始化, 第 slow + signal - 1 根k线起输出
+    """
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        assert 0 < fast < slow and signal > 0
+        self.fast = fast
+        self.slow = slow
+        self.k_fast = 2 / (fast + 1)
+        self.k_slow = 2 / (slow + 1)
+        self.signal_ema = EMA(signal)
+        self.count = 0
+        self.macd = self.signal = self.hist = NAN
+        self._seed: deque[float] = deque(maxlen=slow)
+        self._fast_value = NAN
+        self._slow_value = NAN
+
+    @property
+    def inited(self) -> bool:
+        return self.signal_ema.inited
+
+    def update(self, close: float) -> tuple[float, float, float]:
+        self.count += 1
+        if self.count < self.slow:
+            self._seed.append(close)
+            return self.macd, self.signal, self.hist
+        if self.count == self.slow:
+            self._seed.append(close)
+            self._slow_value = sum(self._seed) / self.slow
+            self._fast_value = sum(list(self._seed)[-self.fast:]) / self.fast
+            self._seed.clear()
+        else:
+            self._fast_value += (close - self._fast_value) * self.k_fast
+            self._slow_value += (close - self._slow_value) * self.k_slow
+
+        line = self._fast_value - self._slow_value
+        signal = self.signal_ema.update(line)
+        if not math.isnan(signal):
+            self.macd, self.signal, self.hist = line, signal, line - signal
+        return self.macd, self.signal, self.hist
+
+
+class ATR:
+    """平均真实波幅(对应 TA-Lib ATR): 首个值为前 n 个真实波幅的简单平均, 之后按 Wilder 平滑"""
+
+    def __init__(self, n: int):
+        assert n > 0
+        self.n = n
+        self.count = 0
+        self.value = NAN
+        self._prev_close = NAN
+        self._sum = 0.0
+
+    @property
+    def inited(self) -> bool:
+        return self.count > self.n
+
+    def update(self, high: float, low: float, close: float) -> float:
+        self.count += 1
+        if self.count > 1:
+            prev_close = self._prev_close
+            tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            if self.count <= self.n:
+                self._sum += tr
+            elif self.count == self.n + 1:
+                self.value = (self._sum + tr) / self.n
+            else:
+                self.value = (self.value * (self.n - 1) + tr) / self.n
+        self._prev_close = close
+        return self.value
@@ -1,12 +1,5 @@
-import json
-
-from dataclasses import dataclass
 from vnpy_ctastrategy import CtaTemplate
 
-from strategy.C53 import C53
-from strategy.MACD import MACD
-from strategy.simple_test import SimpleTest
-
 class StrategyJsonSerializer:
     def __init__(self):
         raise Exception("StrategyJsonSerializer should not be instantiated")
@@ -14,7 +7,8 @@ class StrategyJsonSerializer:
     @staticmethod
     def to_dict(strategy: CtaTemplate):
         dct={
-            "class_name": strategy.__class__.__name__,
+            # 多进程模式下为主进程中的 StrategyProxy, 策略类名记录在 class_name 中
+            "class_name": getattr(strategy, "class_name", strategy.__class__.__name__),
             "vt_symbol": strategy.vt_symbol,
             "interval": strategy.interval if hasattr(strategy, "interval") else None,
             "position": strategy.pos,
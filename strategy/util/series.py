@@ -0,0 +1,76 @@
+"""
+定长序列: 只保留最近 capacity 个数值, 内存固定, 用于策略中随k线滚动的历史状态
+"""
+import numpy as np
+
+__all__ = ["RingSeries"]
+
+
+class RingSeries:
+    """
+    numpy 数组实现的定长序列, 超过 capacity 后丢弃最早的值, 支持负数下标与 len();
+    底层数组长度为 2 * capacity, 写到末尾时把最近的 capacity - 1 个值移到开头(均摊 O(1)),
+    因此最近的任意 n 个值总是连续存放, window(n) 返回视图而不复制
+    """
+
+    def __init__(self, capacity: int, dtype=np.float64):
+        assert capacity > 0
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=dtype)
+        self._start = 0
+        self._end = 0
+
+    def append(self, value: float) -> None:
+        data = self._data
+        if self._end == len(data):
+            keep = self.capacity - 1
+            data[:keep] = data[self._end - keep:self._end]
+            self._start, self._end = 0, keep
+        data[self._end] = value
+        self._end += 1
+        if self._end - self._start > self.capacity:
+            self._start += 1
+
+    def clear(self) -> None:
+        self._start = self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.values[index]
+        size = self._end - self._start
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("RingSeries index out of range")
+        return self._data[self._start + index].item()
+
+    def __iter__(self):
+        return iter(self.values.tolist())
+
+    @property
+    def values(self) -> np.ndarray:
+        """当前所有值(由旧到新)的视图, 之后的 append 可能改变其内容"""
+        return self._data[self._start:self._end]
+
+    def window(self, n: int) -> np.ndarray:
+        """最近 n 个值的视图, 不足 n 个时返回全部"""
+        return self._data[max(self._start, self._end - n):self._end]
+
+    def tolist(self) -> list:
+        return self.values.tolist()
+
+    def __repr__(self) -> str:
+        return f"RingSeries({self.tolist()}, capacity={self.capacity})"
+
+    def __getstate__(self) -> dict:
+        # 只序列化有效的值, 与 capacity 无关
+        return {"capacity": self.capacity, "dtype": self._data.dtype.str, "values": self.values.copy()}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["capacity"], np.dtype(state["dtype"]))
+        values = state["values"][-self.capacity:]
+        self._data[:len(values)] = values
+        self._end = len(values)
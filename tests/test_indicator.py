@@ -0,0 +1,53 @@
+"""
+流式指标与 TA-Lib 的对照: 同一段固定价格序列逐根 update, 与 TA-Lib 对相同数据(WindowedEMA 为相同窗口)的计算结果比较
+"""
+import pytest
+
+talib = pytest.importorskip("talib")
+np = pytest.importorskip("numpy")
+
+from strategy.util.indicator import ATR, MACD, WindowedEMA  # noqa: E402
+
+ROWS = 1000
+
+
+@pytest.fixture(scope="module")
+def prices() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    close = 3500 + rng.standard_normal(ROWS).cumsum()
+    high = close + rng.uniform(0, 5, ROWS)
+    low = close - rng.uniform(0, 5, ROWS)
+    return high, low, close
+
+
+def assert_same(streaming: list[float], expected: np.ndarray) -> None:
+    """NaN 的位置相同, 其余值的相对误差在 1e-9 内"""
+    np.testing.assert_allclose(np.array(streaming), expected, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("n, length", [(12, 12), (12, 13), (26, 35), (240, 254)])
+def test_windowed_ema(prices, n: int, length: int) -> None:
+    close = prices[2]
+    ema = WindowedEMA(n, length)
+    streaming = [ema.update(x) for x in close]
+    # 第 i 根k线的值为 TA-Lib EMA 对截至第 i 根的最近 length 个收盘价的计算结果
+    expected = [
+        talib.EMA(close[max(0, i + 1 - length):i + 1], n)[-1] if i + 1 >= n else np.nan
+        for i in range(len(close))
+    ]
+    assert_same(streaming, np.array(expected))
+
+
+def test_atr(prices) -> None:
+    high, low, close = prices
+    atr = ATR(26)
+    streaming = [atr.update(h, l, c) for h, l, c in zip(high, low, close)]
+    assert_same(streaming, talib.ATR(high, low, close, 26))
+
+
+def test_macd(prices) -> None:
+    close = prices[2]
+    macd = MACD(12, 26, 9)
+    streaming = [macd.update(x) for x in close]
+    for i, expected in enumerate(talib.MACD(close, 12, 26, 9)):
+        assert_same([v[i] for v in streaming], expected)
@@ -0,0 +1,92 @@
+"""
+tick 记录按区间读取: 每个交易日写入多于 INDEX_STEP 条记录, 区间起止落在稀疏索引项上、索引项之前一条及两个索引项之间时,
+read_records / iter_ticks 的结果与逐条过滤全部记录的结果一致
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("vnpy")
+
+from vnpy.trader.constant import Exchange  # noqa: E402
+from vnpy.trader.object import TickData  # noqa: E402
+
+from ctp.bar_batch import CHINA_TZ  # noqa: E402
+from ctp.tick_journal import INDEX_STEP, TickJournal, iter_ticks, read_records  # noqa: E402
+
+VT_SYMBOL = "rb2510.SHFE"
+DAYS = [datetime(2025, 1, 2, 9, tzinfo=CHINA_TZ), datetime(2025, 1, 3, 9, tzinfo=CHINA_TZ)]
+ROWS = 3 * INDEX_STEP + 500
+# 这些位置区间内的 tick 时间相同, 跨过第 1、2 个索引项
+SAME_TIME = [(INDEX_STEP - 4, INDEX_STEP + 6), (2 * INDEX_STEP - 8, 2 * INDEX_STEP + 12)]
+
+
+def tick_time(start: datetime, position: int) -> datetime:
+    for first, last in SAME_TIME:
+        if first <= position <= last:
+            position = first
+    return start + timedelta(milliseconds=100 * position)
+
+
+def make_ticks() -> list[TickData]:
+    ticks = []
+    for d, start in enumerate(DAYS):
+        for i in range(ROWS):
+            ticks.append(TickData(symbol="rb2510", exchange=Exchange.SHFE, datetime=tick_time(start, i),
+                                  last_price=d * ROWS + i, volume=i, gateway_name="TEST"))
+    return ticks
+
+
+@pytest.fixture(scope="module")
+def journal(tmp_path_factory) -> tuple[str, list[TickData]]:
+    root_dir = str(tmp_path_factory.mktemp("tick"))
+    ticks = make_ticks()
+    journal = TickJournal(root_dir)
+    for tick in ticks:
+        journal.record(tick)
+    journal.close()
+    return root_dir, ticks
+
+
+# 索引项位于 0, INDEX_STEP, 2 * INDEX_STEP, 3 * INDEX_STEP
+POSITIONS = {
+    "on_index": 3 * INDEX_STEP,
+    "on_index_same_time": 2 * INDEX_STEP,
+    "before_index": 3 * INDEX_STEP - 1,
+    "before_index_same_time": INDEX_STEP - 1,
+    "between_index": INDEX_STEP + 300,
+    "first": 0,
+}
+
+
+def expected(ticks: list[TickData], start: datetime | None, end: datetime | None) -> list[float]:
+    return [tick.last_price for tick in ticks
+            if (start is None or tick.datetime >= start) and (end is None or tick.datetime < end)]
+
+
+@pytest.mark.parametrize("day", [0, 1])
+@pytest.mark.parametrize("start_at", POSITIONS)
+def test_read_from(journal, day: int, start_at: str) -> None:
+    root_dir, ticks = journal
+    start = tick_time(DAYS[day], POSITIONS[start_at])
+    records = read_records(root_dir, VT_SYMBOL, start)
+    assert records["last_price"].tolist() == expected(ticks, start, None)
+
+
+@pytest.mark.parametrize("end_at", POSITIONS)
+@pytest.mark.parametrize("start_at", POSITIONS)
+def test_read_range(journal, start_at: str, end_at: str) -> None:
+    root_dir, ticks = journal
+    start = tick_time(DAYS[0], POSITIONS[start_at])
+    for end in (tick_time(DAYS[0], POSITIONS[end_at]), tick_time(DAYS[1], POSITIONS[end_at])):
+        records = read_records(root_dir, VT_SYMBOL, start, end)
+        assert records["last_price"].tolist() == expected(ticks, start, end)
+
+
+def test_iter_ticks(journal) -> None:
+    root_dir, ticks = journal
+    start = tick_time(DAYS[0], POSITIONS["before_index"])
+    end = tick_time(DAYS[1], POSITIONS["between_index"])
+    result = list(iter_ticks(root_dir, VT_SYMBOL, start, end))
+    wanted = [tick for tick in ticks if start <= tick.datetime < end]
+    assert [(tick.datetime, tick.last_price) for tick in result] == [(tick.datetime, tick.last_price) for tick in wanted]
@@ -1,20 +1,25 @@
-from datetime import datetime, timedelta
-from typing import cast
-from collections.abc import Callable
-
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from collections.abc import Callable, Container, Iterator
+
+import numpy as np
 from numpy import ndarray
-from pandas import DataFrame, Timestamp
+from pandas import DataFrame, DatetimeIndex
 from rqdatac import init
 from rqdatac.services.get_price import get_price
 from rqdatac.services.future import get_dominant_price
 from rqdatac.services.basic import all_instruments
-from rqdatac.services.calendar import get_next_trading_date
+from rqdatac.services.calendar import get_next_trading_date, get_trading_dates
 from rqdatac.share.errors import RQDataError
 
 from vnpy.trader.setting import SETTINGS
 from vnpy.trader.constant import Exchange, Interval
 from vnpy.trader.object import BarData, TickData, HistoryRequest
-from vnpy.trader.utility import round_to, ZoneInfo
+from vnpy.trader.utility import ZoneInfo, get_file_path
 from vnpy.trader.datafeed import BaseDatafeed
 
 
@@ -41,9 +46,97 @@ FUTURES_EXCHANGES: set[Exchange] = {
 
 CHINA_TZ = ZoneInfo("Asia/Shanghai")
 
+# 本地缓存的合约列表, 可通过 SETTINGS["datafeed.universe_cache"] 指定路径
+UNIVERSE_FILENAME = "rqdata_universe.json"
+UNIVERSE_TTL = timedelta(hours=24)
+
+# 批量查询时每次 get_price 请求的最大合约数量
+BATCH_SIZE = 100
+
+# 米筐字段名 -> VeighNa字段名
+BAR_FIELD_RQ2VT: dict[str, str] = {
+    "open": "open_price",
+    "high": "high_price",
+    "low": "low_price",
+    "close": "close_price",
+    "volume": "volume",
+    "total_turnover": "turnover",
+    "open_interest": "open_interest",
+}
+
+# 需要取整到 0.000001 的价格字段
+BAR_PRICE_FIELDS: set[str] = {"open", "high", "low", "close"}
+
+TICK_FIELD_RQ2VT: dict[str, str] = {
+    "open": "open_price",
+    "high": "high_price",
+    "low": "low_price",
+    "prev_close": "pre_close",
+    "last": "last_price",
+    "volume": "volume",
+    "total_turnover": "turnover",
+    "open_interest": "open_interest",
+    "limit_up": "limit_up",
+    "limit_down": "limit_down",
+    "b1": "bid_price_1",
+    "b2": "bid_price_2",
+    "b3": "bid_price_3",
+    "b4": "bid_price_4",
+    "b5": "bid_price_5",
+    "a1": "ask_price_1",
+    "a2": "ask_price_2",
+    "a3": "ask_price_3",
+    "a4": "ask_price_4",
+    "a5": "ask_price_5",
+    "b1_v": "bid_volume_1",
+    "b2_v": "bid_volume_2",
+    "b3_v": "bid_volume_3",
+    "b4_v": "bid_volume_4",
+    "b5_v": "bid_volume_5",
+    "a1_v": "ask_volume_1",
+    "a2_v": "ask_volume_2",
+    "a3_v": "ask_volume_3",
+    "a4_v": "ask_volume_4",
+    "a5_v": "ask_volume_5",
+}
+
 
-def to_rq_symbol(symbol: str, exchange: Exchange, all_symbols: ndarray) -> str:
-    """将交易所代码转换为米筐代码"""
+# 查询Tick时请求的米筐字段, 衍生品合约另外查询持仓量
+TICK_QUERY_FIELDS: list[str] = [
+    "open",
+    "high",
+    "low",
+    "last",
+    "prev_close",
+    "volume",
+    "total_turnover",
+    "limit_up",
+    "limit_down",
+    "b1",
+    "b2",
+    "b3",
+    "b4",
+    "b5",
+    "a1",
+    "a2",
+    "a3",
+    "a4",
+    "a5",
+    "b1_v",
+    "b2_v",
+    "b3_v",
+    "b4_v",
+    "b5_v",
+    "a1_v",
+    "a2_v",
+    "a3_v",
+    "a4_v",
+    "a5_v",
+]
+
+
+def to_rq_symbol(symbol: str, exchange: Exchange, all_symbols: Container[str]) -> str:
+    """将交易所代码转换为米筐代码, all_symbols 应为 set 以保证查找为 O(1)"""
     # 股票
     if exchange in {Exchange.SSE, Exchange.SZSE}:
         if exchange == Exchange.SSE:
@@ -125,6 +218,156 @@ def to_rq_symbol(symbol: str, exchange: Exchange, all_symbols: ndarray) -> str:
     return rq_symbol
 
 
+def next_trading_date(dt: date | datetime) -> date:
+    """下一个交易日; SETTINGS["datafeed.trading_calendar"] 提供本地交易日历时不请求 RQData"""
+    calendar = SETTINGS.get("datafeed.trading_calendar")
+    if calendar is not None:
+        return calendar.next_trading_day(dt)
+    return get_next_trading_date(dt)
+
+
+def trading_dates(start: date, end: date) -> list[date]:
+    """[start, end] 内的交易日, 与 next_trading_date 一样优先使用本地交易日历"""
+    calendar = SETTINGS.get("datafeed.trading_calendar")
+    if calendar is not None:
+        return calendar.trading_days(start, end)
+    return get_trading_dates(start, end)
+
+
+def load_universe(path: str, ttl: timedelta) -> set[str] | None:
+    """读取本地缓存的合约列表, 文件不存在、损坏或已超过 ttl 时返回 None"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data: dict = json.load(f)
+        if datetime.now() - datetime.fromisoformat(data["time"]) > ttl:
+            return None
+        return set(data["symbols"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_universe(path: str, symbols: set[str]) -> None:
+    """保存合约列表及下载时间; 先写入同目录下的临时文件再替换, 读取方不会读到写了一半的文件"""
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", prefix=os.path.basename(path) + ".",
+                                    dir=os.path.dirname(path) or None)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"time": datetime.now().isoformat(timespec="seconds"), "symbols": sorted(symbols)}, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def to_bar_columns(df: DataFrame, adjustment: timedelta, end: datetime,
+                   start: datetime | None = None) -> dict[str, ndarray]:
+    """将米筐K线DataFrame整列转换为列式数据, datetime列为K线开始时点的纳秒时间戳"""
+    # 填充NaN为0
+    df = df.fillna(0)
+
+    # 米筐时间戳为K线结束时点, 整列转换为VeighNa的K线开始时点
+    index: DatetimeIndex = df.index.get_level_values(1) - adjustment
+    timestamps: ndarray = index.tz_localize(CHINA_TZ).as_unit("ns").asi8
+
+    # 数据按时间排序, 截掉 start 之前及 end 及之后的部分
+    m: int = int(np.searchsorted(timestamps, to_timestamp(start), side="left")) if start else 0
+    n: int = int(np.searchsorted(timestamps, to_timestamp(end), side="left"))
+
+    columns: dict[str, ndarray] = {"datetime": timestamps[m:n]}
+    for rq_field, vt_field in BAR_FIELD_RQ2VT.items():
+        if rq_field in df.columns:
+            array: ndarray = df[rq_field].to_numpy(dtype=np.float64)[m:n]
+            if rq_field in BAR_PRICE_FIELDS:
+                array = np.round(array, 6)
+        else:
+            array = np.zeros(max(n - m, 0))
+        columns[vt_field] = array
+    return columns
+
+
+def empty_bar_columns() -> dict[str, ndarray]:
+    """区间内没有K线时的列式数据, 与查询失败时返回的 None 区分"""
+    columns: dict[str, ndarray] = {"datetime": np.empty(0, dtype=np.int64)}
+    for vt_field in BAR_FIELD_RQ2VT.values():
+        columns[vt_field] = np.empty(0, dtype=np.float64)
+    return columns
+
+
+def split_by_symbol(df: DataFrame) -> dict[str, DataFrame]:
+    """将多个合约的 get_price 结果按 order_book_id 拆分, 保留 (order_book_id, datetime) 索引"""
+    return {rq_symbol: sub for rq_symbol, sub in df.groupby(level=0, sort=False)}
+
+
+def to_tick_columns(df: DataFrame, end: datetime, start: datetime | None = None) -> dict[str, ndarray]:
+    """将米筐Tick DataFrame整列转换为列式数据, datetime列为纳秒时间戳"""
+    df = df.fillna(0)
+
+    index: DatetimeIndex = df.index.get_level_values(1)
+    timestamps: ndarray = index.tz_localize(CHINA_TZ).as_unit("ns").asi8
+    m: int = int(np.searchsorted(timestamps, to_timestamp(start), side="left")) if start else 0
+    n: int = int(np.searchsorted(timestamps, to_timestamp(end), side="left"))
+
+    columns: dict[str, ndarray] = {"datetime": timestamps[m:n]}
+    for rq_field, vt_field in TICK_FIELD_RQ2VT.items():
+        if rq_field in df.columns:
+            columns[vt_field] = df[rq_field].to_numpy(dtype=np.float64)[m:n]
+        else:
+            columns[vt_field] = np.zeros(max(n - m, 0))
+    return columns
+
+
+def to_timestamp(dt: datetime) -> int:
+    """datetime 转纳秒时间戳, 不带时区的视为北京时间"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=CHINA_TZ)
+    return int(dt.timestamp()) * 1_000_000_000 + dt.microsecond * 1000
+
+
+def columns_to_bars(columns: dict[str, ndarray], symbol: str, exchange: Exchange, interval: Interval) -> list[BarData]:
+    """列式数据转为 BarData 列表"""
+    timestamps: list[int] = columns["datetime"].tolist()
+    values: dict[str, list] = {f: columns[f].tolist() for f in BAR_FIELD_RQ2VT.values()}
+
+    return [
+        BarData(
+            symbol=symbol,
+            exchange=exchange,
+            interval=interval,
+            datetime=datetime.fromtimestamp(ts // 1_000_000_000, CHINA_TZ),
+            open_price=values["open_price"][i],
+            high_price=values["high_price"][i],
+            low_price=values["low_price"][i],
+            close_price=values["close_price"][i],
+            volume=values["volume"][i],
+            turnover=values["turnover"][i],
+            open_interest=values["open_interest"][i],
+            gateway_name="RQ"
+        )
+        for i, ts in enumerate(timestamps)
+    ]
+
+
+def columns_to_ticks(columns: dict[str, ndarray], symbol: str, exchange: Exchange) -> list[TickData]:
+    """列式数据转为 TickData 列表"""
+    timestamps: list[int] = columns["datetime"].tolist()
+    fields: list[str] = list(TICK_FIELD_RQ2VT.values())
+    values: list[list] = [columns[f].tolist() for f in fields]
+
+    ticks: list[TickData] = []
+    for i, ts in enumerate(timestamps):
+        seconds, nanos = divmod(ts, 1_000_000_000)
+        dt: datetime = datetime.fromtimestamp(seconds, CHINA_TZ).replace(microsecond=nanos // 1000)
+        tick: TickData = TickData(
+            symbol=symbol,
+            exchange=exchange,
+            datetime=dt,
+            gateway_name="RQ",
+            **{f: v[i] for f, v in zip(fields, values)}
+        )
+        ticks.append(tick)
+    return ticks
+
+
 class RqdataDatafeed(BaseDatafeed):
     """米筐RQData数据服务接口"""
 
@@ -135,6 +378,13 @@ class RqdataDatafeed(BaseDatafeed):
 
         self.inited: bool = False
 
+        self.universe_path: str = SETTINGS.get("datafeed.universe_cache") or str(get_file_path(UNIVERSE_FILENAME))
+        self.symbols: set[str] = set()
+        self.universe_from_cache: bool = False
+        self.rq_symbols: dict[tuple[str, Exchange], str] = {}
+        # 分段下载、批量查询的多个线程可能同时需要刷新合约列表, 只由其中一个线程下载
+        self.universe_lock: threading.Lock = threading.Lock()
+
     def init(self, output: Callable = print) -> bool:
         """初始化"""
         if self.inited:
@@ -154,12 +404,12 @@ class RqdataDatafeed(BaseDatafeed):
                 self.password,
                 ("rqdatad-pro.ricequant.com", 16011),
                 use_pool=True,
-                max_pool_size=1,
+                # 分段并发下载K线时每个线程各用一个连接
+                max_pool_size=SETTINGS.get("datafeed.download_workers") or 1,
                 auto_load_plugins=False
             )
 
-            df: DataFrame = all_instruments()
-            self.symbols: ndarray = df["order_book_id"].to_numpy()
+            self.load_universe(output)
         except RQDataError as ex:
             output(f"RQData数据服务初始化失败：{ex}")
             return False
@@ -173,20 +423,88 @@ class RqdataDatafeed(BaseDatafeed):
         self.inited = True
         return True
 
+    def set_universe(self, symbols: set[str], from_cache: bool = False) -> None:
+        """设置合约列表, 并清空代码转换的缓存"""
+        self.symbols = symbols
+        self.universe_from_cache = from_cache
+        self.rq_symbols = {}
+
+    def load_universe(self, output: Callable = print) -> None:
+        """读取本地缓存的合约列表, 已过期时重新下载; 其他线程已加载时直接返回"""
+        with self.universe_lock:
+            if self.symbols:
+                return
+            symbols: set[str] | None = load_universe(self.universe_path, UNIVERSE_TTL)
+            if symbols is None:
+                self.download_universe(output)
+            else:
+                self.set_universe(symbols, from_cache=True)
+
+    def refresh_universe(self, stale: set[str], output: Callable = print) -> None:
+        """重新下载合约列表; 等待锁期间其他线程已替换了 stale 时不再下载"""
+        with self.universe_lock:
+            if self.symbols is stale:
+                self.download_universe(output)
+
+    def download_universe(self, output: Callable = print) -> None:
+        """从米筐下载全部合约列表并保存到本地"""
+        df: DataFrame = all_instruments()
+        self.set_universe(set(df["order_book_id"].tolist()))
+        try:
+            save_universe(self.universe_path, self.symbols)
+        except OSError as ex:
+            output(f"RQData合约列表保存失败：{ex}")
+
+    def resolve_symbol(self, symbol: str, exchange: Exchange, output: Callable = print) -> str | None:
+        """交易所代码转换为米筐代码, 结果会被缓存; 不在合约列表中时返回 None"""
+        key: tuple[str, Exchange] = (symbol, exchange)
+        rq_symbol: str | None = self.rq_symbols.get(key)
+        if rq_symbol is not None:
+            return rq_symbol
+
+        symbols: set[str] = self.symbols
+        # 股票期权不添加交易所后缀
+        if exchange in [Exchange.SSE, Exchange.SZSE] and symbol in symbols:
+            rq_symbol = symbol
+        else:
+            rq_symbol = to_rq_symbol(symbol, exchange, symbols)
+
+        if rq_symbol not in symbols:
+            # 本地缓存的合约列表可能不包含新上市的合约, 重新下载后再试一次; 其他线程已刷新时直接重试
+            if self.symbols is symbols:
+                if not self.universe_from_cache:
+                    return None
+                try:
+                    self.refresh_universe(symbols, output)
+                except Exception as ex:
+                    output(f"RQData合约列表下载失败：{ex}")
+                    return None
+            return self.resolve_symbol(symbol, exchange, output)
+
+        self.rq_symbols[key] = rq_symbol
+        return rq_symbol
+
     def query_bar_history(self, req: HistoryRequest, output: Callable = print) -> list[BarData] | None:
         """查询K线数据"""
+        columns: dict[str, ndarray] | None = self.query_bar_columns(req, output)
+        if columns is None:
+            return []
+        return columns_to_bars(columns, req.symbol, req.exchange, req.interval)
+
+    def query_bar_columns(self, req: HistoryRequest, output: Callable = print) -> dict[str, ndarray] | None:
+        """查询K线数据, 返回以BarData字段名为键的列式数据"""
         # 期货品种且代码中没有数字（非具体合约），则查询主力连续
         if req.exchange in FUTURES_EXCHANGES and req.symbol.isalpha():
             return self._query_dominant_history(req, output)
         else:
             return self._query_bar_history(req, output)
 
-    def _query_bar_history(self, req: HistoryRequest, output: Callable = print) -> list[BarData] | None:
+    def _query_bar_history(self, req: HistoryRequest, output: Callable = print) -> dict[str, ndarray] | None:
         """查询K线数据"""
         if not self.inited:
             n: bool = self.init(output)
             if not n:
-                return []
+                return None
 
         symbol: str = req.symbol
         exchange: Exchange = req.exchange
@@ -194,21 +512,16 @@ class RqdataDatafeed(BaseDatafeed):
         start: datetime = req.start
         end: datetime = req.end
 
-        # 股票期权不添加交易所后缀
-        if exchange in [Exchange.SSE, Exchange.SZSE] and symbol in self.symbols:
-            rq_symbol: str = symbol
-        else:
-            rq_symbol = to_rq_symbol(symbol, exchange, self.symbols)
-
         # 检查查询的代码在范围内
-        if rq_symbol not in self.symbols:
+        rq_symbol: str | None = self.resolve_symbol(symbol, exchange, output)
+        if rq_symbol is None:
             output(f"RQData查询K线数据失败：不支持的合约代码{req.vt_symbol}")
-            return []
+            return None
 
         rq_interval: str | None = INTERVAL_VT2RQ.get(interval, None)
         if not rq_interval:
             output(f"RQData查询K线数据失败：不支持的时间周期{req.interval.value}")
-            return []
+            return None
 
         # 为了将米筐时间戳（K线结束时点）转换为VeighNa时间戳（K线开始时点）
         adjustment: timedelta = INTERVAL_ADJUSTMENT_MAP[interval]
@@ -229,97 +542,115 @@ class RqdataDatafeed(BaseDatafeed):
             frequency=rq_interval,
             fields=fields,
             start_date=start,
-            end_date=get_next_trading_date(end),        # 为了查询夜盘数据
+            end_date=next_trading_date(end),        # 为了查询夜盘数据
             adjust_type=adjust_type
         )
 
-        data: list[BarData] = []
-
-        if df is not None:
-            # 填充NaN为0
-            df.fillna(0, inplace=True)
-
-            for row in df.itertuples():
-                row_index: tuple[str, Timestamp] = cast(tuple[str, Timestamp], row.Index)
-                dt: datetime = row_index[1].to_pydatetime() - adjustment
-                dt = dt.replace(tzinfo=CHINA_TZ)
-
-                if dt >= end:
-                    break
-
-                bar: BarData = BarData(
-                    symbol=symbol,
-                    exchange=exchange,
-                    interval=interval,
-                    datetime=dt,
-                    open_price=round_to(row.open, 0.000001),
-                    high_price=round_to(row.high, 0.000001),
-                    low_price=round_to(row.low, 0.000001),
-                    close_price=round_to(row.close, 0.000001),
-                    volume=row.volume,
-                    turnover=row.total_turnover,
-                    open_interest=getattr(row, "open_interest", 0),
-                    gateway_name="RQ"
-                )
-
-                data.append(bar)
-
-        return data
+        # 区间内没有数据时米筐返回 None, 查询出错时抛出异常
+        if df is None:
+            return empty_bar_columns()
+        return to_bar_columns(df, adjustment, end)
+
+    def query_bar_columns_batch(self, reqs: list[HistoryRequest],
+                                output: Callable = print) -> list[dict[str, ndarray] | None]:
+        """
+        批量查询K线数据, 返回值与 reqs 一一对应;
+        周期、起止日期与复权方式相同的合约合并为一次 get_price 调用, 主力连续仍逐个查询
+        """
+        results: list[dict[str, ndarray] | None] = [None] * len(reqs)
+        if not self.inited:
+            n: bool = self.init(output)
+            if not n:
+                return results
+
+        # (周期, 开始日期, 结束日期, 复权方式, 是否查询持仓量) -> [(请求序号, 米筐代码)]
+        groups: dict[tuple, list[tuple[int, str]]] = {}
+        for i, req in enumerate(reqs):
+            if req.exchange in FUTURES_EXCHANGES and req.symbol.isalpha():
+                results[i] = self._query_dominant_history(req, output)
+                continue
+
+            if req.interval not in INTERVAL_VT2RQ:
+                output(f"RQData查询K线数据失败：不支持的时间周期{req.interval.value}")
+                continue
+
+            rq_symbol: str | None = self.resolve_symbol(req.symbol, req.exchange, output)
+            if rq_symbol is None:
+                output(f"RQData查询K线数据失败：不支持的合约代码{req.vt_symbol}")
+                continue
+
+            if rq_symbol.endswith(".XSHG") or rq_symbol.endswith(".XSHE"):
+                adjust_type: str = "pre"
+            else:
+                adjust_type = "none"
+
+            key: tuple = (req.interval, req.start.date(), req.end.date(), adjust_type, not req.symbol.isdigit())
+            groups.setdefault(key, []).append((i, rq_symbol))
+
+        for (interval, _, _, adjust_type, with_open_interest), members in groups.items():
+            start: datetime = min(reqs[i].start for i, _ in members)
+            end: datetime = max(reqs[i].end for i, _ in members)
+
+            fields: list = ["open", "high", "low", "close", "volume", "total_turnover"]
+            if with_open_interest:
+                fields.append("open_interest")
+
+            rq_symbols: list[str] = list(dict.fromkeys(rq_symbol for _, rq_symbol in members))
+            frames: dict[str, DataFrame] = {}
+            # 查询成功的合约, 其中不在 frames 中的合约在区间内没有数据
+            fetched: set[str] = set()
+            for offset in range(0, len(rq_symbols), BATCH_SIZE):
+                try:
+                    df: DataFrame = get_price(
+                        rq_symbols[offset:offset + BATCH_SIZE],
+                        frequency=INTERVAL_VT2RQ[interval],
+                        fields=fields,
+                        start_date=start,
+                        end_date=next_trading_date(end),        # 为了查询夜盘数据
+                        adjust_type=adjust_type
+                    )
+                except RQDataError as ex:
+                    output(f"RQData批量查询K线数据失败：{ex}")
+                    continue
+                fetched.update(rq_symbols[offset:offset + BATCH_SIZE])
+                if df is not None:
+                    frames.update(split_by_symbol(df))
+
+            adjustment: timedelta = INTERVAL_ADJUSTMENT_MAP[interval]
+            for i, rq_symbol in members:
+                sub: DataFrame | None = frames.get(rq_symbol)
+                if sub is not None:
+                    results[i] = to_bar_columns(sub, adjustment, reqs[i].end, reqs[i].start)
+                elif rq_symbol in fetched:
+                    results[i] = empty_bar_columns()
+        return results
 
     def query_tick_history(self, req: HistoryRequest, output: Callable = print) -> list[TickData] | None:
         """查询Tick数据"""
+        columns: dict[str, ndarray] | None = self.query_tick_columns(req, output)
+        if columns is None:
+            return []
+        return columns_to_ticks(columns, req.symbol, req.exchange)
+
+    def query_tick_columns(self, req: HistoryRequest, output: Callable = print) -> dict[str, ndarray] | None:
+        """查询Tick数据, 返回以TickData字段名为键的列式数据"""
         if not self.inited:
             n: bool = self.init(output)
             if not n:
-                return []
+                return None
 
         symbol: str = req.symbol
         exchange: Exchange = req.exchange
         start: datetime = req.start
         end: datetime = req.end
 
-        # 股票期权不添加交易所后缀
-        if exchange in [Exchange.SSE, Exchange.SZSE] and symbol in self.symbols:
-            rq_symbol: str = symbol
-        else:
-            rq_symbol = to_rq_symbol(symbol, exchange, self.symbols)
-
-        if rq_symbol not in self.symbols:
+        rq_symbol: str | None = self.resolve_symbol(symbol, exchange, output)
+        if rq_symbol is None:
             output(f"RQData查询Tick数据失败：不支持的合约代码{req.vt_symbol}")
-            return []
+            return None
 
         # 只对衍生品合约才查询持仓量数据
-        fields: list = [
-            "open",
-            "high",
-            "low",
-            "last",
-            "prev_close",
-            "volume",
-            "total_turnover",
-            "limit_up",
-            "limit_down",
-            "b1",
-            "b2",
-            "b3",
-            "b4",
-            "b5",
-            "a1",
-            "a2",
-            "a3",
-            "a4",
-            "a5",
-            "b1_v",
-            "b2_v",
-            "b3_v",
-            "b4_v",
-            "b5_v",
-            "a1_v",
-            "a2_v",
-            "a3_v",
-            "a4_v",
-            "a5_v",
-        ]
+        fields: list = list(TICK_QUERY_FIELDS)
         if not symbol.isdigit():
             fields.append("open_interest")
 
@@ -328,74 +659,64 @@ class RqdataDatafeed(BaseDatafeed):
             frequency="tick",
             fields=fields,
             start_date=start,
-            end_date=get_next_trading_date(end),        # 为了查询夜盘数据
+            end_date=next_trading_date(end),        # 为了查询夜盘数据
             adjust_type="none"
         )
 
-        data: list[TickData] = []
-
-        if df is not None:
-            # 填充NaN为0
-            df.fillna(0, inplace=True)
-
-            for row in df.itertuples():
-                row_index: tuple[str, Timestamp] = cast(tuple[str, Timestamp], row.Index)
-                dt: datetime = row_index[1].to_pydatetime()
-                dt = dt.replace(tzinfo=CHINA_TZ)
-
-                if dt >= end:
-                    break
-
-                tick: TickData = TickData(
-                    symbol=symbol,
-                    exchange=exchange,
-                    datetime=dt,
-                    open_price=row.open,
-                    high_price=row.high,
-                    low_price=row.low,
-                    pre_close=row.prev_close,
-                    last_price=row.last,
-                    volume=row.volume,
-                    turnover=row.total_turnover,
-                    open_interest=getattr(row, "open_interest", 0),
-                    limit_up=row.limit_up,
-                    limit_down=row.limit_down,
-                    bid_price_1=row.b1,
-                    bid_price_2=row.b2,
-                    bid_price_3=row.b3,
-                    bid_price_4=row.b4,
-                    bid_price_5=row.b5,
-                    ask_price_1=row.a1,
-                    ask_price_2=row.a2,
-                    ask_price_3=row.a3,
-                    ask_price_4=row.a4,
-                    ask_price_5=row.a5,
-                    bid_volume_1=row.b1_v,
-                    bid_volume_2=row.b2_v,
-                    bid_volume_3=row.b3_v,
-                    bid_volume_4=row.b4_v,
-                    bid_volume_5=row.b5_v,
-                    ask_volume_1=row.a1_v,
-                    ask_volume_2=row.a2_v,
-                    ask_volume_3=row.a3_v,
-                    ask_volume_4=row.a4_v,
-                    ask_volume_5=row.a5_v,
-                    gateway_name="RQ"
-                )
-
-                data.append(tick)
-
-        return data
-
-    def _query_dominant_history(self, req: HistoryRequest, output: Callable = print) -> list[BarData] | None:
+        if df is None:
+            return None
+        return to_tick_columns(df, end)
+
+    def iter_tick_columns(self, req: HistoryRequest, output: Callable = print) -> Iterator[dict[str, ndarray]]:
+        """
+        按交易日逐块查询Tick数据, 每个交易日(含前一晚夜盘)生成一块列式数据;
+        处理当前块时后台线程已在下载下一块, 内存中最多同时保留两块
+        """
+        if not self.inited:
+            n: bool = self.init(output)
+            if not n:
+                return
+
+        rq_symbol: str | None = self.resolve_symbol(req.symbol, req.exchange, output)
+        if rq_symbol is None:
+            output(f"RQData查询Tick数据失败：不支持的合约代码{req.vt_symbol}")
+            return
+
+        fields: list = list(TICK_QUERY_FIELDS)
+        if not req.symbol.isdigit():
+            fields.append("open_interest")
+
+        def query_day(day: date) -> DataFrame | None:
+            return get_price(rq_symbol, frequency="tick", fields=fields, start_date=day, end_date=day,
+                             adjust_type="none")
+
+        # 夜盘数据属于下一个交易日
+        days: list[date] = trading_dates(req.start.date(), next_trading_date(req.end))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future: Future | None = executor.submit(query_day, days[0]) if days else None
+            for i in range(len(days)):
+                df: DataFrame | None = future.result()
+                future = executor.submit(query_day, days[i + 1]) if i + 1 < len(days) else None
+                if df is None:
+                    continue
+                columns: dict[str, ndarray] = to_tick_columns(df, req.end, req.start)
+                del df
+                if len(columns["datetime"]):
+                    yield columns
+
+    def iter_tick_history(self, req: HistoryRequest, output: Callable = print) -> Iterator[list[TickData]]:
+        """与 iter_tick_columns 相同, 但每块转换为 TickData 列表"""
+        for columns in self.iter_tick_columns(req, output):
+            yield columns_to_ticks(columns, req.symbol, req.exchange)
+
+    def _query_dominant_history(self, req: HistoryRequest, output: Callable = print) -> dict[str, ndarray] | None:
         """查询期货主力K线数据"""
         if not self.inited:
             n: bool = self.init(output)
             if not n:
-                return []
+                return None
 
         symbol: str = req.symbol
-        exchange: Exchange = req.exchange
         interval: Interval = req.interval
         start: datetime = req.start
         end: datetime = req.end
@@ -403,7 +724,7 @@ class RqdataDatafeed(BaseDatafeed):
         rq_interval: str | None = INTERVAL_VT2RQ.get(interval, None)
         if not rq_interval:
             output(f"RQData查询K线数据失败：不支持的时间周期{req.interval.value}")
-            return []
+            return None
 
         # 为了将米筐时间戳（K线结束时点）转换为VeighNa时间戳（K线开始时点）
         adjustment: timedelta = INTERVAL_ADJUSTMENT_MAP[interval]
@@ -418,40 +739,12 @@ class RqdataDatafeed(BaseDatafeed):
             frequency=rq_interval,
             fields=fields,
             start_date=start,
-            end_date=get_next_trading_date(end),    # 为了查询夜盘数据
+            end_date=next_trading_date(end),    # 为了查询夜盘数据
             adjust_type="pre",                      # 前复权
             adjust_method="prev_close_ratio"        # 切换前一日收盘价比例复权
         )
 
-        data: list[BarData] = []
-
-        if df is not None:
-            # 填充NaN为0
-            df.fillna(0, inplace=True)
-
-            for row in df.itertuples():
-                row_index: tuple[str, Timestamp] = cast(tuple[str, Timestamp], row.Index)
-                dt: datetime = row_index[1].to_pydatetime() - adjustment
-                dt = dt.replace(tzinfo=CHINA_TZ)
-
-                if dt >= end:
-                    break
-
-                bar: BarData = BarData(
-                    symbol=symbol,
-                    exchange=exchange,
-                    interval=interval,
-                    datetime=dt,
-                    open_price=round_to(row.open, 0.000001),
-                    high_price=round_to(row.high, 0.000001),
-                    low_price=round_to(row.low, 0.000001),
-                    close_price=round_to(row.close, 0.000001),
-                    volume=row.volume,
-                    turnover=row.total_turnover,
-                    open_interest=getattr(row, "open_interest", 0),
-                    gateway_name="RQ"
-                )
-
-                data.append(bar)
-
-        return data
+        # 区间内没有数据时米筐返回 None, 查询出错时抛出异常
+        if df is None:
+            return empty_bar_columns()
+        return to_bar_columns(df, adjustment, end)
@@ -1,8 +1,14 @@
-from datetime import timedelta
-from typing import Dict, List, Optional, Callable
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from queue import Empty, Queue
+from typing import Dict, List, Optional, Callable, Tuple
+import atexit
+import threading
 import traceback
 
-from pandas import DataFrame, Timestamp
+import numpy as np
+from numpy import ndarray
+from pandas import DataFrame
 from tqsdk import TqApi, TqAuth
 
 from vnpy.trader.datafeed import BaseDatafeed
@@ -20,6 +26,110 @@ INTERVAL_VT2TQ: Dict[Interval, int] = {
 
 CHINA_TZ = ZoneInfo("Asia/Shanghai")
 
+# 同时保持的天勤连接数量, 以及连接空闲多久(秒)后关闭, 可通过 SETTINGS 修改
+POOL_SIZE: int = 2
+IDLE_TIMEOUT: float = 300
+
+# 天勤字段名 -> VeighNa字段名
+BAR_FIELD_TQ2VT: Dict[str, str] = {
+    "open": "open_price",
+    "high": "high_price",
+    "low": "low_price",
+    "close": "close_price",
+    "volume": "volume",
+    "open_oi": "open_interest",
+}
+
+
+def to_bar_columns(df: DataFrame) -> Dict[str, ndarray]:
+    """将天勤K线DataFrame整列转换为列式数据, datetime列为纳秒时间戳"""
+    # 天勤时间为1970年起的UTC纳秒数, 可直接作为时间戳使用
+    columns: Dict[str, ndarray] = {"datetime": df["datetime"].to_numpy(dtype=np.int64)}
+    for tq_field, vt_field in BAR_FIELD_TQ2VT.items():
+        columns[vt_field] = df[tq_field].to_numpy(dtype=np.float64)
+    columns["turnover"] = np.zeros(len(df))
+    return columns
+
+
+def columns_to_bars(columns: Dict[str, ndarray], req: HistoryRequest) -> List[BarData]:
+    """列式数据转为 BarData 列表"""
+    timestamps: list = columns["datetime"].tolist()
+    values: Dict[str, list] = {f: columns[f].tolist() for f in BAR_FIELD_TQ2VT.values()}
+
+    return [
+        BarData(
+            symbol=req.symbol,
+            exchange=req.exchange,
+            interval=req.interval,
+            datetime=datetime.fromtimestamp(ts // 1_000_000_000, CHINA_TZ),
+            open_price=values["open_price"][i],
+            high_price=values["high_price"][i],
+            low_price=values["low_price"][i],
+            close_price=values["close_price"][i],
+            volume=values["volume"][i],
+            open_interest=values["open_interest"][i],
+            gateway_name="TQ",
+        )
+        for i, ts in enumerate(timestamps)
+    ]
+
+
+class _TqWorker(threading.Thread):
+    """
+    持有一个天勤连接的工作线程: TqApi 只能在创建它的线程中使用,
+    因此每个线程独占一个连接, 从共享队列中取请求执行, 空闲超时后关闭连接, 出错时重连一次
+    """
+
+    def __init__(self, datafeed: "TqsdkDatafeed", queue: Queue) -> None:
+        super().__init__(daemon=True, name="TqsdkWorker")
+        self.datafeed: "TqsdkDatafeed" = datafeed
+        self.queue: Queue = queue
+        self.api: Optional[TqApi] = None
+
+    def run(self) -> None:
+        while True:
+            try:
+                item: Optional[Tuple[HistoryRequest, Future]] = self.queue.get(timeout=self.datafeed.idle_timeout)
+            except Empty:
+                self.close_api()
+                continue
+
+            if item is None:
+                self.close_api()
+                return
+
+            req, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            for attempt in range(2):
+                try:
+                    if self.api is None:
+                        self.api = TqApi(auth=TqAuth(self.datafeed.username, self.datafeed.password))
+                    future.set_result(self.query(req))
+                    break
+                except Exception as ex:
+                    # 连接可能已断开, 关闭后用新连接重试
+                    self.close_api()
+                    if attempt:
+                        future.set_exception(ex)
+
+    def query(self, req: HistoryRequest) -> Optional[DataFrame]:
+        return self.api.get_kline_data_series(
+            symbol=f"{req.exchange.value}.{req.symbol}",
+            duration_seconds=INTERVAL_VT2TQ[req.interval],
+            start_dt=req.start,
+            end_dt=(req.end + timedelta(1))
+        )
+
+    def close_api(self) -> None:
+        if self.api is not None:
+            try:
+                self.api.close()
+            except Exception:
+                pass
+            self.api = None
+
 
 class TqsdkDatafeed(BaseDatafeed):
     """天勤TQsdk数据服务接口"""
@@ -29,54 +139,70 @@ class TqsdkDatafeed(BaseDatafeed):
         self.username: str = SETTINGS["datafeed.username"]
         self.password: str = SETTINGS["datafeed.password"]
 
+        self.pool_size: int = SETTINGS.get("datafeed.pool_size") or POOL_SIZE
+        self.idle_timeout: float = SETTINGS.get("datafeed.idle_timeout") or IDLE_TIMEOUT
+        self.queue: Queue = Queue()
+        self.workers: List[_TqWorker] = []
+        self.lock: threading.Lock = threading.Lock()
+        self._atexit_registered: bool = False
+
+    def start_workers(self) -> None:
+        """首次查询时启动工作线程, 连接由各线程在处理请求时建立"""
+        with self.lock:
+            if not self.workers:
+                self.workers = [_TqWorker(self, self.queue) for _ in range(self.pool_size)]
+                for worker in self.workers:
+                    worker.start()
+                # close() 之后可能再次启动工作线程, 只登记一次
+                if not self._atexit_registered:
+                    atexit.register(self.close)
+                    self._atexit_registered = True
+
+    def close(self) -> None:
+        """关闭全部连接"""
+        with self.lock:
+            for _ in self.workers:
+                self.queue.put(None)
+            for worker in self.workers:
+                worker.join(timeout=5)
+            self.workers = []
+
     def query_bar_history(self, req: HistoryRequest, output: Callable = print) -> Optional[List[BarData]]:
         """查询k线数据"""
-        # 初始化API
-        try:
-            api: TqApi = TqApi(auth=TqAuth(self.username, self.password))
-        except Exception:
-            output(traceback.format_exc())
+        columns: Optional[Dict[str, ndarray]] = self.query_bar_columns(req, output)
+        if columns is None:
             return None
-
-        # 查询数据
-        interval: str = INTERVAL_VT2TQ.get(req.interval, None)
-        if not interval:
-            output(f"Tqsdk查询K线数据失败：不支持的时间周期{req.interval.value}")
-            return []
-
-        tq_symbol: str = f"{req.exchange.value}.{req.symbol}"
-
-        df: DataFrame = api.get_kline_data_series(
-            symbol=tq_symbol,
-            duration_seconds=interval,
-            start_dt=req.start,
-            end_dt=(req.end + timedelta(1))
-        )
-
-        # 关闭API
-        api.close()
-
-        # 解析数据
-        bars: List[BarData] = []
-
-        if df is not None:
-            for tp in df.itertuples():
-                # 天勤时间为与1970年北京时间相差的秒数，需要加上8小时差
-                dt: Timestamp = Timestamp(tp.datetime).to_pydatetime() + timedelta(hours=8)
-
-                bar: BarData = BarData(
-                    symbol=req.symbol,
-                    exchange=req.exchange,
-                    interval=req.interval,
-                    datetime=dt.replace(tzinfo=CHINA_TZ),
-                    open_price=tp.open,
-                    high_price=tp.high,
-                    low_price=tp.low,
-                    close_price=tp.close,
-                    volume=tp.volume,
-                    open_interest=tp.open_oi,
-                    gateway_name="TQ",
-                )
-                bars.append(bar)
-
-        return bars
+        return columns_to_bars(columns, req)
+
+    def query_bar_columns(self, req: HistoryRequest, output: Callable = print) -> Optional[Dict[str, ndarray]]:
+        """查询k线数据, 返回以BarData字段名为键的列式数据"""
+        return self.query_bar_columns_batch([req], output)[0]
+
+    def query_bar_columns_batch(
+        self, reqs: List[HistoryRequest], output: Callable = print
+    ) -> List[Optional[Dict[str, ndarray]]]:
+        """批量查询k线数据, 返回值与 reqs 一一对应; 请求由连接池中的线程并发执行"""
+        self.start_workers()
+
+        futures: List[Optional[Future]] = []
+        for req in reqs:
+            if req.interval not in INTERVAL_VT2TQ:
+                output(f"Tqsdk查询K线数据失败：不支持的时间周期{req.interval.value}")
+                futures.append(None)
+                continue
+            future: Future = Future()
+            self.queue.put((req, future))
+            futures.append(future)
+
+        results: List[Optional[Dict[str, ndarray]]] = []
+        for future in futures:
+            df: Optional[DataFrame] = None
+            if future is not None:
+                try:
+                    df = future.result()
+                except Exception:
+                    output(traceback.format_exc())
+
+            # 解析数据
+            results.append(None if df is None else to_bar_columns(df))
+        return results